@@ -3,11 +3,14 @@ from binance import ThreadedWebsocketManager
 from asgiref.sync import sync_to_async
 from asset.models import Asset
 import asyncio
+import time
 from trade.utils import send_health_check_message
+from ohlc.utils.stream import publish_engine_price, publish_price_tick
+from asset.utils import set_price
 
 
 class Command(BaseCommand):
-    help = 'Start Binance WebSocket and update Asset prices'
+    help = 'Start Binance WebSocket and update Asset prices and the shared price snapshot'
 
     def handle(self, *args, **options):
         loop = asyncio.get_event_loop()
@@ -16,7 +19,11 @@ class Command(BaseCommand):
             try:
                 symbol = msg['s'].lower()
                 price = float(msg['c'])
+                # The matching engine gets every price first, clients a throttled tick last
+                await sync_to_async(publish_engine_price, thread_sensitive=False)(symbol, price)
+                await sync_to_async(set_price, thread_sensitive=False)(symbol, price)
                 await update_asset_price(symbol, price)
+                await sync_to_async(publish_price_tick, thread_sensitive=False)(symbol, price)
             except Exception as e:
                 print(f"Error processing message: {e}")
 
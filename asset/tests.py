@@ -1,3 +1,91 @@
-from django.test import TestCase
+import time
+from unittest import mock
+import requests
+from django.test import SimpleTestCase, override_settings
+from asset import utils
 
-# Create your tests here.
+
+class FakeHashes:
+    """The Redis hash commands the price snapshot uses."""
+
+    def __init__(self):
+        self.hashes = {}
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        fields = self.hashes.setdefault(key, {})
+        for name, item in (mapping or {field: value}).items():
+            fields[name.encode()] = str(item).encode()
+
+    def hmget(self, key, fields):
+        return [self.hashes.get(key, {}).get(field.encode()) for field in fields]
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+@override_settings(PRICE_SNAPSHOT_MAX_AGE=30)
+class PriceSnapshotTests(SimpleTestCase):
+    """Prices come from the snapshot while fresh, from one REST download otherwise."""
+
+    TICKER = {'BTCUSDT': '65000.5', 'ETHUSDT': '3000'}
+
+    def setUp(self):
+        self.redis = FakeHashes()
+        self.requests = []
+        for target, kwargs in (
+            ('asset.utils.get_redis', {'return_value': self.redis}),
+            ('asset.utils.requests.get', {'side_effect': self.ticker}),
+        ):
+            patcher = mock.patch(target, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def ticker(self, url, params=None, headers=None, timeout=None):
+        self.requests.append(params)
+        if params:
+            return FakeResponse({'symbol': params['symbol'], 'price': self.TICKER[params['symbol']]})
+        return FakeResponse([{'symbol': symbol, 'price': price} for symbol, price in self.TICKER.items()])
+
+    def test_fresh_snapshot_needs_no_download(self):
+        utils.set_price('btcusdt', 64000.0)
+        self.assertEqual(utils.get_prices(['BTCUSDT']), {'BTCUSDT': 64000.0})
+        self.assertEqual(self.requests, [])
+
+    def test_missing_symbols_download_once(self):
+        self.assertEqual(utils.get_price('ETHUSDT'), 3000.0)
+        self.assertEqual(self.requests, [{'symbol': 'ETHUSDT'}])
+
+        self.assertEqual(utils.get_prices(['BTCUSDT', 'XRPUSDT', 'ETHUSDT']), {'BTCUSDT': 65000.5, 'ETHUSDT': 3000.0})
+        self.assertEqual(self.requests, [{'symbol': 'ETHUSDT'}, None])
+
+        # The download was written to the snapshot for the next readers
+        self.assertEqual(utils.get_prices(['BTCUSDT', 'ETHUSDT']), {'BTCUSDT': 65000.5, 'ETHUSDT': 3000.0})
+        self.assertEqual(len(self.requests), 2)
+
+    def test_stale_price_is_downloaded(self):
+        utils.set_price('BTCUSDT', 1.0, at=time.time() - 100)
+        self.assertEqual(utils.snapshot_prices(), {})
+        self.assertEqual(utils.get_price('BTCUSDT'), 65000.5)
+        self.assertEqual(self.requests, [{'symbol': 'BTCUSDT'}])
+
+    def test_redis_down_falls_back_to_rest(self):
+        self.redis.hmget = mock.Mock(side_effect=ConnectionError('down'))
+        self.redis.hset = mock.Mock(side_effect=ConnectionError('down'))
+        self.assertEqual(utils.get_prices(['ETHUSDT']), {'ETHUSDT': 3000.0})
+
+    def test_failed_download(self):
+        with mock.patch('asset.utils.requests.get', side_effect=requests.exceptions.ConnectionError('down')):
+            self.assertIsNone(utils.get_price('BTCUSDT'))
+            with self.assertRaises(requests.exceptions.RequestException):
+                utils.get_prices(['BTCUSDT'])
@@ -0,0 +1,126 @@
+"""
+Shared snapshot of the latest price of each symbol.
+
+The update_last_price command writes every streamed price into one Redis
+hash (symbol -> "price|epoch seconds"), so any process reads a price with
+a single HGET or HMGET instead of downloading the whole futures ticker.
+Prices older than PRICE_SNAPSHOT_MAX_AGE count as stale: readers then fall
+back to one REST download, whose prices are written to the snapshot for
+the other readers.
+"""
+import logging
+import time
+import requests
+from decouple import config
+from django.conf import settings
+from ohlc.utils.stream import get_redis
+
+logger = logging.getLogger(__name__)
+
+BINANCE_API_KEY = config('BINANCE_API_KEY')
+TICKER_PRICE_URL = 'https://fapi.binance.com/fapi/v1/ticker/price'
+SNAPSHOT_KEY = 'prices:last'
+
+
+def _encode(price, at):
+    return f"{price}|{at}"
+
+
+def _decode(value, max_age, now):
+    """(price, epoch seconds) of a snapshot value, None when missing or stale."""
+    if value is None:
+        return None
+    price, at = value.decode().split('|')
+    if now - float(at) > max_age:
+        return None
+    return float(price), float(at)
+
+
+def set_price(symbol, price, at=None):
+    """Store the latest price of a symbol."""
+    get_redis().hset(SNAPSHOT_KEY, symbol.upper(), _encode(price, at or time.time()))
+
+
+def set_prices(prices, at=None):
+    """Store the latest prices {symbol: price} at once."""
+    if prices:
+        at = at or time.time()
+        get_redis().hset(SNAPSHOT_KEY, mapping={symbol.upper(): _encode(price, at) for symbol, price in prices.items()})
+
+
+def snapshot_entries(symbols=None, max_age=None):
+    """Fresh snapshot entries {symbol: (price, epoch seconds)} of the symbols (default: all stored)."""
+    max_age = settings.PRICE_SNAPSHOT_MAX_AGE if max_age is None else max_age
+    now = time.time()
+    client = get_redis()
+    if symbols is None:
+        values = {symbol.decode(): value for symbol, value in client.hgetall(SNAPSHOT_KEY).items()}
+    else:
+        symbols = [symbol.upper() for symbol in symbols]
+        values = dict(zip(symbols, client.hmget(SNAPSHOT_KEY, symbols))) if symbols else {}
+
+    entries = {}
+    for symbol, value in values.items():
+        entry = _decode(value, max_age, now)
+        if entry is not None:
+            entries[symbol] = entry
+    return entries
+
+
+def snapshot_prices(symbols=None, max_age=None):
+    """Fresh snapshot prices {symbol: price} of the symbols (default: all stored)."""
+    return {symbol: price for symbol, (price, _) in snapshot_entries(symbols, max_age).items()}
+
+
+def fetch_ticker_prices(symbol=None):
+    """
+    Futures prices from the REST ticker, {symbol: price} of every symbol
+    or of one, written to the snapshot. Raises requests exceptions.
+    """
+    response = requests.get(
+        TICKER_PRICE_URL,
+        params={'symbol': symbol.upper()} if symbol else None,
+        headers={'X-MBX-APIKEY': BINANCE_API_KEY},
+        timeout=10
+    )
+    response.raise_for_status()
+    data = response.json()
+    items = [data] if symbol else data
+    prices = {item['symbol']: float(item['price']) for item in items}
+
+    try:
+        set_prices(prices)
+    except Exception as e:
+        logger.warning(f"Failed to write REST prices to the snapshot: {e}")
+    return prices
+
+
+def get_prices(symbols=None):
+    """
+    Latest prices {symbol: price}: the fresh snapshot prices, with one REST
+    download when a requested symbol (or, without symbols, everything) is
+    missing or stale. Raises requests exceptions when that download fails.
+    """
+    try:
+        prices = snapshot_prices(symbols)
+    except Exception as e:
+        logger.warning(f"Price snapshot unavailable: {e}")
+        prices = {}
+
+    if symbols is None:
+        return prices or fetch_ticker_prices()
+
+    missing = {symbol.upper() for symbol in symbols} - prices.keys()
+    if missing:
+        ticker = fetch_ticker_prices(next(iter(missing))) if len(missing) == 1 else fetch_ticker_prices()
+        prices.update({symbol: ticker[symbol] for symbol in missing if symbol in ticker})
+    return prices
+
+
+def get_price(symbol):
+    """Latest price of a symbol, None when neither the snapshot nor REST has it."""
+    try:
+        return get_prices([symbol]).get(symbol.upper())
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Failed to fetch the price of {symbol}: {e}")
+        return None
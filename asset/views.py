@@ -1,21 +1,38 @@
+from datetime import datetime, timezone
+from asgiref.sync import sync_to_async
 from django.http import JsonResponse
 from .models import Asset
+from .utils import snapshot_entries, get_price
 
 
-def get_symbols_view(request):
-    coins = list(Asset.objects.filter(enable=True).values_list('symbol', flat=True))
+async def get_symbols_view(request):
+    coins = [symbol async for symbol in Asset.objects.filter(enable=True).values_list('symbol', flat=True)]
     return JsonResponse({'coins': coins})
 
 
-def get_last_price_view(request):
+async def get_last_price_view(request):
     symbol = request.GET.get('symbol')
     if not symbol:
         return JsonResponse({'error': 'Symbol parameter is required'}, status=400)
 
     try:
-        asset = Asset.objects.get(symbol=symbol, enable=True)
-        last_price = asset.last_price
-        updated = asset.updated.strftime('%Y-%m-%d %H:%M:%S') if asset.updated else None
-        return JsonResponse({'symbol': symbol, 'last_price': last_price, 'updated': updated})
+        asset = await Asset.objects.aget(symbol=symbol, enable=True)
     except Asset.DoesNotExist:
         return JsonResponse({'error': 'Asset not found or disabled'}, status=404)
+
+    # The shared snapshot, REST when it is stale, and the price stored on the asset last
+    try:
+        entries = await sync_to_async(snapshot_entries, thread_sensitive=False)([symbol])
+    except Exception:
+        entries = {}
+    if symbol.upper() in entries:
+        last_price, at = entries[symbol.upper()]
+        updated = datetime.fromtimestamp(at, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    else:
+        last_price = await sync_to_async(get_price, thread_sensitive=False)(symbol)
+        if last_price is not None:
+            updated = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        else:
+            last_price = asset.last_price
+            updated = asset.updated.strftime('%Y-%m-%d %H:%M:%S') if asset.updated else None
+    return JsonResponse({'symbol': symbol, 'last_price': last_price, 'updated': updated})
@@ -0,0 +1,105 @@
+"""
+Concurrency benchmark for the HTTP API.
+
+Fires many simultaneous requests at one or more endpoints and reports
+throughput and latency percentiles, so the ASGI deployment can be compared
+with the old sync WSGI one on the same machine.
+
+Example:
+    # ASGI (current deployment)
+    uvicorn data.asgi:application --workers 3 --port 8000
+    # WSGI (previous deployment)
+    gunicorn --workers 3 --bind 0.0.0.0:8001 data.wsgi:application
+
+    python benchmarks/concurrency.py \\
+        --target asgi=http://localhost:8000 --target wsgi=http://localhost:8001 \\
+        --path /balance/ --path "/15m/?symbol=BTCUSDT&timestamp=2025-12-10T00:00:00Z" \\
+        --concurrency 200 --requests 2000
+"""
+import argparse
+import asyncio
+import time
+import aiohttp
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run_load(url, concurrency, total_requests, timeout):
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for _ in range(total_requests):
+        queue.put_nowait(None)
+
+    async def worker(session):
+        nonlocal errors
+        while True:
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            try:
+                async with session.get(url) as response:
+                    await response.read()
+                    if response.status >= 500:
+                        errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': total_requests,
+        'errors': errors,
+        'elapsed': elapsed,
+        'rps': total_requests / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 50) * 1000,
+        'p95': percentile(latencies, 95) * 1000,
+        'p99': percentile(latencies, 99) * 1000,
+        'max': (latencies[-1] if latencies else 0.0) * 1000,
+    }
+
+
+async def main(args):
+    targets = []
+    for target in args.target:
+        name, _, base_url = target.partition('=')
+        targets.append((name, base_url.rstrip('/')) if base_url else (target, target.rstrip('/')))
+
+    header = f"{'target':<10} {'path':<45} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'errors':>7}"
+    print(f"concurrency={args.concurrency} requests={args.requests}")
+    print(header)
+    print('-' * len(header))
+
+    for path in args.path:
+        for name, base_url in targets:
+            stats = await run_load(base_url + path, args.concurrency, args.requests, args.timeout)
+            print(
+                f"{name:<10} {path[:45]:<45} {stats['rps']:>9.1f} {stats['p50']:>9.1f} {stats['p95']:>9.1f} "
+                f"{stats['p99']:>9.1f} {stats['max']:>9.1f} {stats['errors']:>7}"
+            )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare API concurrency between deployments.')
+    parser.add_argument('--target', action='append', required=True,
+                        help='name=base_url, e.g. asgi=http://localhost:8000 (repeatable)')
+    parser.add_argument('--path', action='append', required=True,
+                        help='Request path including query string (repeatable)')
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--timeout', type=float, default=60.0)
+    asyncio.run(main(parser.parse_args()))
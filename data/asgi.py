@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'data.settings')
 
 application = get_asgi_application()
+
+from ohlc.utils.hot_window import warm_on_startup  # noqa: E402
+
+warm_on_startup()
@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -148,6 +148,76 @@ CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
 CELERY_TIMEZONE = 'UTC'  # Or your preferred timezone
 
 
+# Shared response cache (candles / indicators)
+REDIS_CACHE_URL = config('REDIS_CACHE_URL', default='redis://localhost:6379/1')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_CACHE_URL,
+        'KEY_PREFIX': 'ohlcv',
+    }
+}
+
+# How long a request waits for another worker computing the same cache entry
+RESPONSE_CACHE_LOCK_TIMEOUT = config('RESPONSE_CACHE_LOCK_TIMEOUT', default=30, cast=int)
+# Lifetime of cached ranges whose candles are all closed (seconds)
+RESPONSE_CACHE_CLOSED_TIMEOUT = config('RESPONSE_CACHE_CLOSED_TIMEOUT', default=86400, cast=int)
+
+# In-process hot window of recent candles (per web worker)
+HOT_WINDOW_ENABLED = config('HOT_WINDOW_ENABLED', default=True, cast=bool)
+HOT_WINDOW_SIZE = config('HOT_WINDOW_SIZE', default=1000, cast=int)  # candles per (symbol, timeframe)
+HOT_WINDOW_MAX_SERIES = config('HOT_WINDOW_MAX_SERIES', default=800, cast=int)  # (symbol, timeframe) pairs
+HOT_WINDOW_WARM_ON_STARTUP = config('HOT_WINDOW_WARM_ON_STARTUP', default=True, cast=bool)
+
+# Real-time push of closed candles and price ticks (Redis pub/sub)
+REDIS_STREAM_URL = config('REDIS_STREAM_URL', default='redis://localhost:6379/2')
+PRICE_TICK_MIN_INTERVAL = config('PRICE_TICK_MIN_INTERVAL', default=1.0, cast=float)  # seconds per symbol
+PRICE_SNAPSHOT_MAX_AGE = config('PRICE_SNAPSHOT_MAX_AGE', default=10.0, cast=float)  # seconds before REST fallback
+STREAM_HEARTBEAT_INTERVAL = config('STREAM_HEARTBEAT_INTERVAL', default=15, cast=int)  # seconds
+
+# Incremental indicators advanced on every candle close, as 'indicator:period' items,
+# optionally limited to timeframes with '@1h|4h'. Their values are stored and served
+# by the indicator API (except obv/vwap, which are cumulative from the request start)
+INDICATOR_STATE_ENABLED = config('INDICATOR_STATE_ENABLED', default=True, cast=bool)
+TRACKED_INDICATORS = config(
+    'TRACKED_INDICATORS',
+    default='rsi:14,ema:14,ema:20,ema:50,ema:200,sma:14,macd:34,atr:14,bollinger_bands:20,stochastic:14,adx:14,cci:20',
+    cast=Csv()
+)
+
+# Native compilation of the recursive indicator loops when numba is installed
+INDICATOR_JIT_ENABLED = config('INDICATOR_JIT_ENABLED', default=True, cast=bool)
+
+# Screener over all enabled assets
+SCREENER_BARS = config('SCREENER_BARS', default=300, cast=int)  # minimum candles loaded per symbol and timeframe
+SCREENER_WORKERS = config('SCREENER_WORKERS', default=4, cast=int)  # processes evaluating symbols
+SCREENER_CHUNK_SIZE = config('SCREENER_CHUNK_SIZE', default=50, cast=int)  # symbols per pool task
+
+# Backtest parameter sweeps; Celery workers evaluating sweeps must share SWEEP_DIR
+SWEEP_DIR = config('SWEEP_DIR', default='')  # memory-mapped candle files, system temp dir when empty
+SWEEP_WORKERS = config('SWEEP_WORKERS', default=4, cast=int)  # pool processes
+SWEEP_CHUNK_SIZE = config('SWEEP_CHUNK_SIZE', default=10, cast=int)  # parameter points per pool or Celery task
+
+# Demo matching engine (run_matching_engine); when enabled the per-minute demo tasks do nothing
+DEMO_ENGINE_ENABLED = config('DEMO_ENGINE_ENABLED', default=False, cast=bool)
+DEMO_ENGINE_FLUSH_INTERVAL = config('DEMO_ENGINE_FLUSH_INTERVAL', default=0.5, cast=float)  # seconds between batched DB writes
+DEMO_ENGINE_SYNC_INTERVAL = config('DEMO_ENGINE_SYNC_INTERVAL', default=2.0, cast=float)  # seconds between reloads of new positions
+DEMO_ENGINE_PRICE_INTERVAL = config('DEMO_ENGINE_PRICE_INTERVAL', default=10.0, cast=float)  # seconds between safety-net price refreshes of every tracked symbol
+DEMO_EQUITY_POINTS = config('DEMO_EQUITY_POINTS', default=500, cast=int)  # default buckets of the demo equity API
+DEMO_EQUITY_MAX_POINTS = config('DEMO_EQUITY_MAX_POINTS', default=5000, cast=int)
+
+# Monte Carlo risk analysis of closed trades (trade.risk)
+RISK_BALANCE = config('RISK_BALANCE', default=10000.0, cast=float)  # default starting equity of the paths
+RISK_SIMULATIONS = config('RISK_SIMULATIONS', default=20000, cast=int)  # default bootstrap paths
+RISK_MAX_SIMULATIONS = config('RISK_MAX_SIMULATIONS', default=200000, cast=int)
+RISK_MAX_HORIZON = config('RISK_MAX_HORIZON', default=5000, cast=int)  # trades per path
+RISK_CACHE_TIMEOUT = config('RISK_CACHE_TIMEOUT', default=86400, cast=int)  # seconds, entries also go stale with new trades
+
+# Commission reconciliation (trade.tasks.update_order_commission)
+COMMISSION_INDEX_RETENTION = config('COMMISSION_INDEX_RETENTION', default=7 * 86400, cast=int)  # seconds of trades kept per symbol
+
+
 # settings.py
 from celery.schedules import crontab
 
@@ -200,6 +270,10 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'fake_trade.tasks.close_open_positions',
         'schedule': crontab(minute='*/1'),  # Every 1 minute
     },
+    'save_equity_records_demo':{
+        'task': 'fake_trade.tasks.save_equity_records',
+        'schedule': crontab(minute='*/5'),  # Every 5 minutes
+    },
 }
 
 LOGGING = {
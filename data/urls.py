@@ -18,10 +18,10 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from ohlc.views import get_1d_view, get_4h_view, get_1h_view, get_15m_view
+from ohlc.views import get_1d_view, get_4h_view, get_1h_view, get_15m_view, get_candles_batch_view, stream_view
 from asset.views import get_symbols_view, get_last_price_view
-from trade.views import get_positions_view, place_futures_order_view, get_balance_view, get_trade_history_view, open_position_view, get_position_history_view, get_open_positions_view, get_balance_history_view, balance_history_view
-from fake_trade.views import place_fake_order, reset_demo_config, get_open_positions
+from trade.views import get_positions_view, place_futures_order_view, get_balance_view, get_trade_history_view, open_position_view, get_position_history_view, get_open_positions_view, get_balance_history_view, balance_history_view, get_risk_view
+from fake_trade.views import place_fake_order, reset_demo_config, get_open_positions, backtest_signals, get_equity_history
 
 
 urlpatterns = [
@@ -30,6 +30,8 @@ urlpatterns = [
     path('4h/', get_4h_view, name='get_4h'),
     path('1h/', get_1h_view, name='get_1h'),
     path('15m/', get_15m_view, name='get_15m'),
+    path('candles/', get_candles_batch_view, name='get_candles_batch'),
+    path('stream/', stream_view, name='stream'),
     path('symbols/', get_symbols_view, name='get_symbols'),
     path('positions/', get_positions_view, name='get_positions'),
     path('place_order/', place_futures_order_view, name='place_futures_order'),
@@ -40,12 +42,15 @@ urlpatterns = [
     path('position_history/', get_position_history_view, name='get_position_history'),
     path('open_positions/', get_open_positions_view, name='get_open_positions'),
     path('balance_history/', get_balance_history_view, name='get_balance_history'),
+    path('risk/', get_risk_view, name='get_risk'),
     path('', balance_history_view, name='balance_history'),
     path('api/articles/', include('news.urls')),
     path('api/indicators/', include('indicators.urls')),
     path('api/demo/place-order/', place_fake_order, name='place_fake_order'),
     path('api/demo/reset-config/', reset_demo_config, name='reset_demo_config'),
     path('api/demo/open-positions/', get_open_positions, name='get_open_positions'),
+    path('api/demo/backtest/', backtest_signals, name='backtest_signals'),
+    path('api/demo/equity/', get_equity_history, name='get_equity_history'),
 
 ]
 
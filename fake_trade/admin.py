@@ -1,20 +1,26 @@
 from django.contrib import admin
-from .models import DemoConfig, DemoPosition
+from .models import DemoConfig, DemoPosition, DemoEquityRecord
 
 @admin.register(DemoConfig)
 class DemoConfigAdmin(admin.ModelAdmin):
-    list_display = ('balance', 'available_balance','leverage', 'max_open_positions', 'created_at', 'updated_at')
+    list_display = ('name', 'notify', 'balance', 'available_balance','leverage', 'max_open_positions', 'created_at', 'updated_at')
     readonly_fields = ('created_at', 'updated_at')
     ordering = ('-created_at',)
-    search_fields = ('balance',)
+    search_fields = ('name', 'balance',)
 
 @admin.register(DemoPosition)
 class DemoPositionAdmin(admin.ModelAdmin):
     list_display = (
-        'id', 'asset', 'side', 'quantity', 'entry_price', 'stop_loss', 'take_profit',
+        'id', 'account', 'asset', 'side', 'quantity', 'entry_price', 'stop_loss', 'take_profit',
         'margin_balance', 'pnl', 'status', 'create_time', 'entry_time', 'exit_price', 'exit_time'
     )
-    list_filter = ('side', 'status', 'asset')
+    list_filter = ('account', 'side', 'status', 'asset')
     search_fields = ('asset__symbol', 'entry_price', 'exit_price')
     readonly_fields = ('create_time', 'entry_time', 'exit_time', 'pnl')
     ordering = ('-create_time',)
+
+@admin.register(DemoEquityRecord)
+class DemoEquityRecordAdmin(admin.ModelAdmin):
+    list_display = ('account', 'timestamp', 'balance', 'unrealized_pnl', 'equity', 'open_positions')
+    list_filter = ('account',)
+    ordering = ('-timestamp',)
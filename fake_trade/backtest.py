@@ -0,0 +1,340 @@
+"""
+Backtesting of demo order signals over stored 15m candles.
+
+A signal is what place_fake_order receives plus a time: symbol, time, side,
+entry_price (None for a market order), tp, sl and quantity. Each one is
+resolved against the Candle15M high/low series of its symbol like the demo
+tasks would: a limit order fills at its entry price on the first candle
+from `time` whose range reaches it, then closes at TP or SL on the first
+candle that touches one of them, with the PnL and commission of
+close_open_positions (fake_trade.utils.close_pnl).
+
+Candles only give each bar's range, not the order of prices inside it, so
+the resolution is pessimistic: a candle touching both levels closes at SL,
+and the fill candle can hit SL but not TP.
+
+First touches are found for all trades of a symbol at once with a sparse
+table of block minima/maxima (binary lifting), O(log n) NumPy steps per
+search instead of a Python loop over candles.
+"""
+import logging
+from datetime import datetime, timezone
+import numpy as np
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+from ohlc.models import Candle15M
+from ohlc.utils.timeframes import TIMEFRAME_DELTA_MAP
+from indicators.utils import FIELDS
+from .utils import close_pnl
+
+logger = logging.getLogger(__name__)
+
+SIDES = ('BUY', 'SELL')
+CANDLE_SECONDS = int(TIMEFRAME_DELTA_MAP['15m'].total_seconds())
+
+# Parsed signal columns and their dtypes; NaN marks a missing price or level
+SIGNAL_COLUMNS = {
+    'symbol': object,
+    'time': np.int64,
+    'side': object,
+    'entry_price': np.float64,
+    'tp': np.float64,
+    'sl': np.float64,
+    'tp_pct': np.float64,
+    'sl_pct': np.float64,
+    'quantity': np.float64,
+    'probability': np.float64,
+}
+
+
+class BacktestError(ValueError):
+    pass
+
+
+def epoch_seconds(value):
+    """Epoch seconds of a datetime or ISO string, naive times taken as UTC."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def parse_signals(signals):
+    """Validate signal dicts into column arrays. Raises BacktestError."""
+    columns = {name: [] for name in SIGNAL_COLUMNS}
+    for i, signal in enumerate(signals):
+        try:
+            side = str(signal['side']).upper()
+            if side not in SIDES:
+                raise ValueError(f"side must be BUY or SELL, not {signal['side']}")
+
+            columns['symbol'].append(str(signal['symbol']).upper())
+            columns['time'].append(epoch_seconds(signal['time']))
+            columns['side'].append(side)
+            entry_price = signal.get('entry_price')
+            columns['entry_price'].append(np.nan if entry_price is None else float(entry_price))
+            # Levels are prices, or distances from the fill price with tp_pct/sl_pct;
+            # a missing level is never touched
+            for name in ('tp', 'sl', 'tp_pct', 'sl_pct', 'probability'):
+                columns[name].append(np.nan if signal.get(name) is None else float(signal[name]))
+            columns['quantity'].append(float(signal['quantity']))
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            raise BacktestError(f'Invalid signal {i}: {e}')
+
+    return {name: np.array(values, dtype=SIGNAL_COLUMNS[name]) for name, values in columns.items()}
+
+
+def load_candles(symbols, start, end=None):
+    """
+    15m candles of each symbol from `start` (epoch seconds) to `end` in one
+    query: {symbol: (epoch open times, open, high, low, close, volume arrays)}.
+    """
+    candles = Candle15M.objects.filter(
+        symbol__symbol__in=symbols,
+        timestamp__gte=datetime.fromtimestamp(start, tz=timezone.utc)
+    )
+    if end is not None:
+        candles = candles.filter(timestamp__lte=datetime.fromtimestamp(end, tz=timezone.utc))
+
+    rows = list(candles.order_by('symbol__symbol', 'timestamp').values_list(
+        'symbol__symbol', 'timestamp', *(Cast(field, FloatField()) for field in FIELDS)
+    ))
+    if not rows:
+        return {}
+
+    # Column-wise conversion, rows are grouped by symbol
+    symbol_column, timestamps, *values = zip(*rows)
+    timestamps = np.array([timestamp.timestamp() for timestamp in timestamps]).astype(np.int64)
+    values = [np.array(column, dtype=np.float64) for column in values]
+    symbol_column = np.array(symbol_column, dtype=object)
+    bounds = [0, *(np.flatnonzero(symbol_column[1:] != symbol_column[:-1]) + 1).tolist(), len(rows)]
+
+    return {
+        symbol_column[lo]: (timestamps[lo:hi], *(column[lo:hi] for column in values))
+        for lo, hi in zip(bounds[:-1], bounds[1:])
+    }
+
+
+def _sparse_table(values, reduce):
+    """Level k holds reduce(values[i:i + 2**k]) (truncated at the end)."""
+    table = [values]
+    width = 1
+    while width < len(values):
+        previous = table[-1]
+        level = previous.copy()
+        level[:-width] = reduce(previous[:-width], previous[width:])
+        table.append(level)
+        width *= 2
+    return table
+
+
+def first_touch(table, start, level, touches):
+    """
+    First index i >= start with touches(values[i], level), len(values) where
+    there is none. `table` is the sparse table of values under the reduction
+    that keeps the most touching value (min for <=, max for >=); start and
+    level are arrays, one entry per search. NaN levels never touch.
+    """
+    n = len(table[0])
+    position = np.minimum(start, n).astype(np.int64)
+    # Jump over every block without a touch, largest blocks first
+    for k in range(len(table) - 1, -1, -1):
+        inside = position < n
+        block = table[k][np.minimum(position, n - 1)]
+        skip = inside & ~touches(block, level)
+        position = np.where(skip, position + (1 << k), position)
+    return np.minimum(position, n)
+
+
+def sparse_tables(candles):
+    """(lows, highs) sparse tables of a symbol's candles for first_touch."""
+    return _sparse_table(candles[3], np.minimum), _sparse_table(candles[2], np.maximum)
+
+
+def resolve(signals, candles, tables=None):
+    """
+    Resolve parsed signals of one symbol against its candles. Returns arrays
+    of fill index and exit index (the candle count when not reached), exit
+    price and entry price (the fill candle open for market orders).
+    """
+    timestamps, opens = candles[0], candles[1]
+    n = len(timestamps)
+    lows_table, highs_table = tables or sparse_tables(candles)
+    at_or_below = np.less_equal
+    at_or_above = np.greater_equal
+
+    buy = signals['side'] == 'BUY'
+    start = np.searchsorted(timestamps, signals['time'], side='left')
+
+    # Limit orders fill where the price reaches the entry, market orders at the next open
+    entry_price = signals['entry_price']
+    market = np.isnan(entry_price)
+    fill = np.where(
+        buy,
+        first_touch(lows_table, start, entry_price, at_or_below),
+        first_touch(highs_table, start, entry_price, at_or_above),
+    )
+    fill = np.where(market, np.minimum(start, n), fill)
+    entry_price = np.where(market, opens[np.minimum(fill, n - 1)], entry_price)
+
+    filled = fill < n
+    direction = np.where(buy, 1.0, -1.0)
+    tp = np.where(np.isnan(signals['tp_pct']), signals['tp'], entry_price * (1 + direction * signals['tp_pct']))
+    sl = np.where(np.isnan(signals['sl_pct']), signals['sl'], entry_price * (1 - direction * signals['sl_pct']))
+    tp_hit = np.where(
+        buy,
+        first_touch(highs_table, fill + 1, tp, at_or_above),
+        first_touch(lows_table, fill + 1, tp, at_or_below),
+    )
+    sl_hit = np.where(
+        buy,
+        first_touch(lows_table, fill, sl, at_or_below),
+        first_touch(highs_table, fill, sl, at_or_above),
+    )
+
+    # Stop loss wins a candle that touches both levels
+    exit_index = np.where(filled, np.minimum(tp_hit, sl_hit), n)
+    exit_price = np.where(sl_hit <= tp_hit, sl, tp)
+    return fill, exit_index, exit_price, entry_price
+
+
+def simulate(parsed, data, tables=None):
+    """
+    Resolve parsed signals against loaded candles ({symbol: load_candles
+    tuple}). Returns per-signal arrays: status, entry/exit time (epoch
+    seconds, -1 when none), entry/exit price, commission and net pnl.
+    `tables` caches the sparse tables of each symbol across calls.
+    """
+    count = len(parsed['time'])
+    status = np.full(count, 'PENDING', dtype=object)
+    entry_time = np.full(count, -1, dtype=np.int64)
+    exit_time = np.full(count, -1, dtype=np.int64)
+    entry_price = parsed['entry_price'].copy()
+    exit_price = np.full(count, np.nan)
+
+    for symbol in np.unique(parsed['symbol']).tolist():
+        selected = np.flatnonzero(parsed['symbol'] == symbol)
+        candles = data.get(symbol)
+        if candles is None:
+            logger.warning(f"No 15m candles for {symbol}, {len(selected)} signals left pending")
+            continue
+
+        timestamps, closes = candles[0], candles[4]
+        n = len(timestamps)
+        if tables is not None and symbol not in tables:
+            tables[symbol] = sparse_tables(candles)
+        fill, exit_index, exit_at, entry_at = resolve(
+            {k: v[selected] for k, v in parsed.items()}, candles, None if tables is None else tables[symbol]
+        )
+
+        filled = fill < n
+        closed = exit_index < n
+        entry_price[selected] = entry_at
+        entry_time[selected[filled]] = timestamps[fill[filled]]
+        status[selected[filled]] = 'OPEN'
+        status[selected[closed]] = 'CLOSED'
+        # Exits happen within the candle, recorded at its close
+        exit_time[selected[closed]] = timestamps[exit_index[closed]] + CANDLE_SECONDS
+        exit_price[selected[closed]] = exit_at[closed]
+        # Open trades are marked to the last close
+        still_open = filled & ~closed
+        exit_price[selected[still_open]] = closes[-1]
+
+    _, commission, net_pnl = close_pnl(parsed['side'], parsed['quantity'], entry_price, exit_price)
+    pending = status == 'PENDING'
+    commission[pending] = net_pnl[pending] = 0.0
+
+    return {
+        'status': status,
+        'entry_time': entry_time,
+        'exit_time': exit_time,
+        'entry_price': entry_price,
+        'exit_price': exit_price,
+        'commission': commission,
+        'pnl': net_pnl,
+    }
+
+
+def summarize(outcome, balance):
+    """
+    Summary metrics of a simulate() outcome, plus the closed trades in exit
+    order and the balance after each of them (the equity curve).
+    """
+    status = outcome['status']
+    net_pnl = outcome['pnl']
+
+    # Realised PnL in exit order
+    closed = np.flatnonzero(status == 'CLOSED')
+    closed = closed[np.argsort(outcome['exit_time'][closed], kind='stable')]
+    equity = balance + np.cumsum(net_pnl[closed])
+    peak = np.maximum.accumulate(np.concatenate(([balance], equity)))
+    drawdown = (peak[1:] - equity) / peak[1:]
+
+    wins = int((net_pnl[closed] > 0).sum())
+    summary = {
+        'signals': len(status),
+        'closed': len(closed),
+        'open': int((status == 'OPEN').sum()),
+        'pending': int((status == 'PENDING').sum()),
+        'win_rate': round(wins / len(closed), 4) if len(closed) else None,
+        'net_pnl': round(float(net_pnl[closed].sum()), 2),
+        'commission': round(float(outcome['commission'][closed].sum()), 2),
+        'final_balance': round(float(equity[-1]) if len(equity) else balance, 2),
+        'max_drawdown': round(float(drawdown.max()), 4) if len(drawdown) else 0.0,
+    }
+    return summary, closed, equity
+
+
+def run_backtest(signals, balance=10000.0, end=None):
+    """
+    Backtest demo order signals.
+
+    Args:
+        signals: List of dicts with symbol, time, side, entry_price (None for
+                 market), tp and sl (or tp_pct and sl_pct) and quantity
+        balance: Starting balance of the equity curve
+        end: Last candle time used (datetime or ISO string, default: all stored candles)
+
+    Returns:
+        {'summary', 'trades', 'equity_curve'}. Trades still open at the end
+        are marked to the last close; pending ones never filled.
+    """
+    parsed = parse_signals(signals)
+    if not len(parsed['time']):
+        raise BacktestError('At least one signal is required')
+
+    symbols = sorted(set(parsed['symbol']))
+    data = load_candles(symbols, int(parsed['time'].min()), epoch_seconds(end) if end else None)
+    outcome = simulate(parsed, data)
+    summary, closed, equity = summarize(outcome, balance)
+
+    def iso(epoch):
+        return None if epoch < 0 else datetime.fromtimestamp(int(epoch), tz=timezone.utc).isoformat()
+
+    status, entry_price, exit_price = outcome['status'], outcome['entry_price'], outcome['exit_price']
+    trades = [
+        {
+            'symbol': parsed['symbol'][i],
+            'side': parsed['side'][i],
+            'quantity': float(parsed['quantity'][i]),
+            'status': status[i],
+            'signal_time': iso(parsed['time'][i]),
+            'entry_time': iso(outcome['entry_time'][i]),
+            'entry_price': None if np.isnan(entry_price[i]) else float(entry_price[i]),
+            'exit_time': iso(outcome['exit_time'][i]),
+            'exit_price': None if np.isnan(exit_price[i]) or status[i] == 'PENDING' else float(exit_price[i]),
+            'commission': round(float(outcome['commission'][i]), 8),
+            'pnl': round(float(outcome['pnl'][i]), 8),
+        }
+        for i in range(len(status))
+    ]
+
+    return {
+        'summary': summary,
+        'trades': trades,
+        'equity_curve': [
+            {'time': iso(outcome['exit_time'][i]), 'balance': round(float(value), 2)}
+            for i, value in zip(closed.tolist(), equity.tolist())
+        ],
+    }
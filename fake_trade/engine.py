@@ -0,0 +1,264 @@
+"""
+Event-driven matching engine for demo positions.
+
+Instead of polling all prices once a minute (fill_pending_positions,
+close_open_positions), the engine keeps every PENDING and OPEN position in
+memory and reacts to every price update_last_price receives, published
+unthrottled on the engine:prices channel (ohlc.utils.stream). Per symbol,
+the entry, TP and SL levels sit in a TriggerBook sorted by price, so a
+price pops only the levels it crossed: a bisect plus the fills and closes
+it causes, whatever the number of positions. Fill and close decisions are those of the tasks
+(fake_trade.utils).
+
+Changed positions are written in batches by flush(): one bulk update of
+the positions still in the state the engine last saw (rows locked), and
+one bulk update of the locked balances of their accounts, then the Telegram
+messages of the accounts that want them are sent from a background thread. A batch is kept until it is
+committed, so a failed flush is retried by the next one. sync() picks up
+positions placed since the last sync and drops those closed elsewhere.
+
+refresh_prices() is only a safety net: it matches every tracked symbol
+against its latest snapshot price (REST when missing or stale) at startup
+and every DEMO_ENGINE_PRICE_INTERVAL, for symbols without a websocket feed
+(disabled assets) and prices published while the engine was disconnected.
+"""
+import bisect
+import logging
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+import requests
+from django.db import transaction
+from django.utils import timezone
+from asset.utils import get_prices
+from .models import DemoConfig, DemoPosition
+from .utils import (
+    send_telegram_message, fill_triggered, exit_trigger, fill_position, close_position, fill_message, close_message
+)
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('PENDING', 'OPEN')
+WRITE_FIELDS = ['status', 'entry_time', 'exit_time', 'exit_price', 'commission', 'pnl']
+
+
+class TriggerBook:
+    """
+    Trigger levels of one symbol. `rising` entries fire once the price is at
+    or above their level, `falling` entries once it is at or below; both
+    are kept sorted by level in parallel lists.
+    """
+
+    def __init__(self):
+        self.rising_levels, self.rising = [], []
+        self.falling_levels, self.falling = [], []
+
+    def add(self, level, rising, entry):
+        levels, entries = (self.rising_levels, self.rising) if rising else (self.falling_levels, self.falling)
+        i = bisect.bisect_right(levels, level)
+        levels.insert(i, level)
+        entries.insert(i, entry)
+
+    def pop_crossed(self, price):
+        """Remove and return the entries a price crosses."""
+        i = bisect.bisect_right(self.rising_levels, price)
+        crossed = self.rising[:i]
+        del self.rising_levels[:i], self.rising[:i]
+
+        j = bisect.bisect_left(self.falling_levels, price)
+        crossed += self.falling[j:]
+        del self.falling_levels[j:], self.falling[j:]
+        return crossed
+
+    def __len__(self):
+        return len(self.rising) + len(self.falling)
+
+
+class MatchingEngine:
+    """
+    In-memory PENDING and OPEN positions indexed by trigger level.
+    Entries of positions closed or dropped are left in the books and
+    skipped when popped; sync() rebuilds the books once they pile up.
+    """
+
+    def __init__(self):
+        self.positions = {}
+        self.symbols = {}
+        self.stored_status = {}
+        self.books = defaultdict(TriggerBook)
+        self.changed = {}
+        self.bookings = {}
+        self.messages = []
+        self.notifier = ThreadPoolExecutor(max_workers=1)
+        self.stats = {'ticks': 0, 'fills': 0, 'closes': 0, 'busy': 0.0, 'max_latency': 0.0}
+
+    def track(self, position):
+        """Start matching a PENDING or OPEN position (asset and account selected)."""
+        self.positions[position.id] = position
+        self.symbols[position.id] = position.asset.symbol.upper()
+        self.stored_status[position.id] = position.status
+        self._index(position)
+
+    def drop(self, position_id):
+        self.positions.pop(position_id, None)
+        self.symbols.pop(position_id, None)
+        self.stored_status.pop(position_id, None)
+
+    def _index(self, position):
+        book = self.books[self.symbols[position.id]]
+        if position.status == 'PENDING':
+            # Buy limits fill on the way down, sell limits on the way up
+            book.add(float(position.entry_price), position.side == 'SELL', position.id)
+        elif position.status == 'OPEN':
+            buy = position.side == 'BUY'
+            if position.take_profit is not None:
+                book.add(float(position.take_profit), buy, position.id)
+            if position.stop_loss is not None:
+                book.add(float(position.stop_loss), not buy, position.id)
+
+    def on_price(self, symbol, price, now=None):
+        """Fill and close the positions of a symbol whose levels a price tick crossed."""
+        started = time.perf_counter()
+        self.stats['ticks'] += 1
+        book = self.books.get(symbol)
+        crossed = book.pop_crossed(price) if book else None
+        if crossed:
+            now = now or timezone.now()
+            self._match(book, crossed, price, now)
+
+        elapsed = time.perf_counter() - started
+        self.stats['busy'] += elapsed
+        self.stats['max_latency'] = max(self.stats['max_latency'], elapsed)
+
+    def _match(self, book, crossed, price, now):
+        filled = False
+        for position_id in crossed:
+            position = self.positions.get(position_id)
+            if position is None or position.status != 'PENDING':
+                continue
+            if fill_triggered(position.side, float(position.entry_price), price):
+                fill_position(position, now)
+                self._index(position)
+                self.changed[position_id] = position
+                self.messages.append(('fill', position_id, None))
+                self.stats['fills'] += 1
+                filled = True
+
+        # Exits of positions just filled may be crossed by the same price
+        if filled:
+            crossed = crossed + book.pop_crossed(price)
+
+        for position_id in crossed:
+            position = self.positions.get(position_id)
+            if position is None or position.status != 'OPEN':
+                continue
+            trigger = exit_trigger(position.side, position.take_profit, position.stop_loss, price)
+            if trigger:
+                # Balance changes of this close alone, applied when it is written
+                booking = DemoConfig(balance=Decimal(0), available_balance=Decimal(0))
+                result = close_position(position, booking, trigger[1], now)
+                self.positions.pop(position_id)
+                self.changed[position_id] = position
+                self.bookings[position_id] = booking
+                self.messages.append(('close', position_id, (trigger[0], *result)))
+                self.stats['closes'] += 1
+
+    def flush(self):
+        """Write the positions changed since the last flush, then send their messages."""
+        if not self.changed:
+            return
+
+        changed, bookings, messages = self.changed, self.bookings, self.messages
+        with transaction.atomic():
+            # Accounts first, by id, in the lock order of the demo tasks and place_fake_order
+            account_ids = {position.account_id for position in changed.values()}
+            configs = {
+                config.id: config
+                for config in DemoConfig.objects.select_for_update().filter(id__in=account_ids).order_by('id')
+            }
+            current = dict(
+                DemoPosition.objects.select_for_update().filter(id__in=list(changed)).values_list('id', 'status')
+            )
+            # Positions changed elsewhere since they were loaded (a reset) are not overwritten
+            written = {
+                position_id: position for position_id, position in changed.items()
+                if current.get(position_id) == self.stored_status.get(position_id)
+            }
+            DemoPosition.objects.bulk_update(list(written.values()), WRITE_FIELDS)
+
+            booked = {}
+            for position_id, booking in bookings.items():
+                if position_id not in written:
+                    continue
+                config = configs[written[position_id].account_id]
+                config.available_balance += booking.available_balance
+                config.balance += booking.balance
+                config.updated_at = timezone.now()
+                booked[config.id] = config
+            DemoConfig.objects.bulk_update(list(booked.values()), ['available_balance', 'balance', 'updated_at'])
+
+        # Cleared only once committed, a failed flush leaves the batch to the next one
+        self.changed, self.bookings, self.messages = {}, {}, []
+        for position_id in changed:
+            if position_id not in written:
+                logger.warning(f"Position {position_id} changed outside the matching engine, dropped")
+                self.drop(position_id)
+            elif written[position_id].status == 'CLOSED':
+                self.symbols.pop(position_id, None)
+                self.stored_status.pop(position_id, None)
+            else:
+                self.stored_status[position_id] = written[position_id].status
+        logger.info(f"Matching engine wrote {len(written)} positions")
+
+        self._notify(messages, changed, written, configs)
+
+    def _notify(self, messages, changed, written, configs):
+        # Balances in the messages are the ones of the account after the whole batch
+        for kind, position_id, result in messages:
+            if position_id not in written:
+                continue
+            position = changed[position_id]
+            config = configs[position.account_id]
+            if not config.notify:
+                continue
+            symbol = position.asset.symbol.upper()
+            if kind == 'fill':
+                msg = fill_message(position, symbol, config.available_balance, config.name)
+            else:
+                msg = close_message(position, symbol, *result, config.available_balance, config.name)
+            self.notifier.submit(send_telegram_message, msg)
+
+    def refresh_prices(self):
+        """Match every symbol with tracked positions against its latest price."""
+        symbols = set(self.symbols.values())
+        if not symbols:
+            return
+        try:
+            prices = get_prices(symbols)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Matching engine could not refresh prices: {e}")
+            return
+        for symbol, price in prices.items():
+            self.on_price(symbol, float(price))
+
+    def sync(self):
+        """Flush, then load positions placed since the last sync and drop those no longer active."""
+        self.flush()
+        active = dict(DemoPosition.objects.filter(status__in=ACTIVE_STATUSES).values_list('id', 'status'))
+
+        for position_id in list(self.positions):
+            if active.get(position_id) != self.stored_status.get(position_id):
+                self.drop(position_id)
+
+        new = [position_id for position_id in active if position_id not in self.positions]
+        if new:
+            for position in DemoPosition.objects.filter(id__in=new).select_related('asset', 'account'):
+                self.track(position)
+
+        # Rebuild the books once skipped entries outnumber the live ones
+        entries = sum(len(book) for book in self.books.values())
+        if entries > 2 * len(self.positions) + 1000:
+            self.books = defaultdict(TriggerBook)
+            for position in self.positions.values():
+                self._index(position)
@@ -0,0 +1,124 @@
+"""
+Mark-to-market equity of the demo accounts.
+
+equity_records() values every OPEN position of every account with one query
+(the accounts left-joined to their open positions) and one array
+computation: an account's equity is its realised balance plus the net PnL
+its open positions would book if closed at the latest prices (close_pnl,
+commissions included), so the stored curve shows the drawdowns of open
+trades, not only the realised ones.
+
+downsample() reduces a stored series to at most a given number of equal time
+buckets for the equity API, keeping the lowest and highest equity of each
+bucket so drawdowns survive the reduction.
+"""
+import logging
+import numpy as np
+from django.db.models import FilteredRelation, Q
+from django.utils import timezone
+from .models import DemoConfig, DemoEquityRecord
+from .utils import close_pnl, fetch_last_prices
+
+logger = logging.getLogger(__name__)
+
+
+def _open_exposure():
+    """
+    One row per open position, plus one per account without any:
+    (account id, balance, symbol, side, quantity, entry price), the
+    position columns None for accounts without open positions.
+    """
+    return list(
+        DemoConfig.objects.annotate(
+            open=FilteredRelation('positions', condition=Q(positions__status='OPEN'))
+        ).values_list(
+            'id', 'balance', 'open__asset__symbol', 'open__side', 'open__quantity', 'open__entry_price'
+        ).order_by('id')
+    )
+
+
+def mark_to_market(rows, prices):
+    """
+    Per account arrays of a snapshot of _open_exposure() rows, with open
+    positions whose symbol has no price marked at their entry price.
+
+    Returns (account ids, balances, unrealized PnL, open position counts).
+    """
+    account_ids, balances, symbols, sides, quantities, entry_prices = zip(*rows)
+    ids, account = np.unique(np.array(account_ids), return_inverse=True)
+    balance = np.zeros(len(ids))
+    balance[account] = np.array(balances, dtype=float)
+
+    is_open = np.array([symbol is not None for symbol in symbols])
+    quantity = np.nan_to_num(np.array(quantities, dtype=float))
+    entry = np.nan_to_num(np.array(entry_prices, dtype=float))
+
+    # One price lookup per symbol, not per position
+    names, symbol = np.unique(np.array([(s or '').upper() for s in symbols]), return_inverse=True)
+    price = np.array([prices.get(name, np.nan) for name in names])[symbol]
+    missing = is_open & np.isnan(price)
+    if missing.any():
+        logger.warning(f"No price for {int(missing.sum())} open positions, marked at their entry price")
+    price = np.where(np.isnan(price), entry, price)
+
+    _, _, net_pnl = close_pnl(np.array(sides, dtype=object), quantity, entry, price)
+    unrealized = np.bincount(account, weights=np.where(is_open, net_pnl, 0.0), minlength=len(ids))
+    open_positions = np.bincount(account, weights=is_open, minlength=len(ids)).astype(int)
+    return ids, balance, unrealized, open_positions
+
+
+def equity_records(now=None):
+    """
+    Unsaved DemoEquityRecords of every account at the latest prices, None
+    when the prices of open positions could not be fetched.
+    """
+    rows = _open_exposure()
+    if not rows:
+        return []
+
+    symbols = {row[2] for row in rows if row[2] is not None}
+    prices = fetch_last_prices(symbols) if symbols else {}
+    if prices is None:
+        return None
+
+    now = now or timezone.now()
+    ids, balance, unrealized, open_positions = mark_to_market(rows, prices)
+    equity = balance + unrealized
+    return [
+        DemoEquityRecord(
+            account_id=int(ids[i]),
+            timestamp=now,
+            balance=round(float(balance[i]), 2),
+            unrealized_pnl=round(float(unrealized[i]), 2),
+            equity=round(float(equity[i]), 2),
+            open_positions=int(open_positions[i]),
+        )
+        for i in range(len(ids))
+    ]
+
+
+def downsample(epochs, equity, points):
+    """
+    Reduce an equity series (ascending epoch seconds) to at most `points`
+    equal time buckets.
+
+    Returns (index of the last record of each bucket, lowest equity, highest
+    equity per bucket).
+    """
+    if len(epochs) <= points:
+        return np.arange(len(epochs)), equity, equity
+
+    width = (epochs[-1] - epochs[0]) // points + 1
+    bucket = (epochs - epochs[0]) // width
+    first = np.concatenate(([0], np.flatnonzero(np.diff(bucket)) + 1))
+    last = np.append(first[1:], len(epochs)) - 1
+    return last, np.minimum.reduceat(equity, first), np.maximum.reduceat(equity, first)
+
+
+def max_drawdown(equity):
+    """Largest fall of an equity series from its running peak, as a fraction of the peak."""
+    if not len(equity):
+        return 0.0
+    peak = np.maximum.accumulate(equity)
+    drawdown = np.where(peak > 0, (peak - equity) / np.where(peak > 0, peak, 1), 0.0)
+    return float(drawdown.max())
@@ -0,0 +1,87 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from fake_trade.backtest import BacktestError
+from fake_trade.models import DemoPosition, DEFAULT_ACCOUNT
+from fake_trade.replay import CLOCK_STEP, read_ticks, replay
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay demo orders through the demo-trading fill and close logic on a simulated clock, '
+        'over recorded price ticks or stored 15m candles'
+    )
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument('--orders', help='Orders as JSON or @file: symbol, time, side, entry_price, tp, sl, quantity')
+        source.add_argument(
+            '--positions', action='store_true',
+            help='Replay the stored demo positions created in the clock range from their create time'
+        )
+        parser.add_argument('--account', help="Demo account to replay, default: 'default'")
+        parser.add_argument('--ticks', help='Recorded prices, a .csv (time,symbol,price) or .json file')
+        parser.add_argument('--start', help='Clock start (ISO), default: the first order')
+        parser.add_argument('--end', help='Clock end (ISO), default: the last price')
+        parser.add_argument('--step', type=int, default=CLOCK_STEP, help='Clock tick in seconds')
+        parser.add_argument('--balance', type=float, help="Starting balance, default: the demo configuration's balance")
+        parser.add_argument('--max-open-positions', type=int)
+        parser.add_argument('--output', help='Write the full result as JSON to this file')
+
+    def handle(self, *args, **options):
+        try:
+            if options['orders']:
+                value = options['orders']
+                if value.startswith('@'):
+                    with open(value[1:]) as f:
+                        orders = json.load(f)
+                else:
+                    orders = json.loads(value)
+            else:
+                orders = self._stored_orders(options['start'], options['end'], options['account'])
+            ticks = read_ticks(options['ticks']) if options['ticks'] else None
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Invalid input: {e}')
+
+        try:
+            result = replay(
+                orders,
+                ticks=ticks,
+                start=options['start'],
+                end=options['end'],
+                step=options['step'],
+                balance=options['balance'],
+                max_open_positions=options['max_open_positions'],
+                account=options['account'],
+            )
+        except BacktestError as e:
+            raise CommandError(str(e))
+
+        for key, value in result['summary'].items():
+            self.stdout.write(f'{key:>20}: {value}')
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(result, f, indent=2)
+            self.stdout.write(f"Wrote {len(result['positions'])} positions to {options['output']}")
+
+    @staticmethod
+    def _stored_orders(start, end, account):
+        positions = DemoPosition.objects.select_related('asset').filter(
+            account__name=account or DEFAULT_ACCOUNT
+        ).order_by('create_time')
+        if start:
+            positions = positions.filter(create_time__gte=start)
+        if end:
+            positions = positions.filter(create_time__lte=end)
+        return [
+            {
+                'symbol': position.asset.symbol,
+                'time': position.create_time.isoformat(),
+                'side': position.side,
+                'entry_price': position.entry_price,
+                'tp': position.take_profit,
+                'sl': position.stop_loss,
+                'quantity': position.quantity,
+            }
+            for position in positions
+        ]
@@ -0,0 +1,72 @@
+import json
+import time
+import redis
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.core.management.base import BaseCommand, CommandError
+from fake_trade.engine import MatchingEngine
+from ohlc.utils.stream import ENGINE_CHANNEL, get_redis
+
+STATS_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = 'Match demo positions against every live price update_last_price receives (replaces the per-minute demo tasks)'
+
+    def handle(self, *args, **options):
+        if not settings.DEMO_ENGINE_ENABLED:
+            raise CommandError('Set DEMO_ENGINE_ENABLED so the per-minute demo tasks stop matching the same positions')
+
+        engine = MatchingEngine()
+        engine.sync()
+        self.stdout.write(self.style.SUCCESS(f"Matching engine started with {len(engine.positions)} positions"))
+
+        next_flush = next_sync = next_prices = next_stats = time.monotonic()
+        try:
+            while True:
+                try:
+                    pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(ENGINE_CHANNEL)
+                    while True:
+                        message = pubsub.get_message(timeout=settings.DEMO_ENGINE_FLUSH_INTERVAL)
+                        if message:
+                            price = json.loads(message['data'])
+                            engine.on_price(price['symbol'], float(price['price']))
+
+                        now = time.monotonic()
+                        if now >= next_sync:
+                            engine.sync()
+                            next_sync = next_flush = now + settings.DEMO_ENGINE_SYNC_INTERVAL
+                        elif now >= next_flush:
+                            engine.flush()
+                            next_flush = now + settings.DEMO_ENGINE_FLUSH_INTERVAL
+                        if now >= next_prices:
+                            # Safety net for symbols the price feed does not cover and prices lost while disconnected
+                            engine.refresh_prices()
+                            next_prices = now + settings.DEMO_ENGINE_PRICE_INTERVAL
+                        if now >= next_stats:
+                            self._write_stats(engine)
+                            next_stats = now + STATS_INTERVAL
+                except redis.ConnectionError as e:
+                    self.stderr.write(f"Price stream error: {e}. Reconnecting in 5 seconds...")
+                    time.sleep(5)
+                    # Prices published while disconnected are lost, catch up from the snapshot
+                    next_prices = time.monotonic()
+                except DatabaseError as e:
+                    # The unwritten batch stays in the engine and is flushed once the DB is back
+                    self.stderr.write(f"Database error: {e}. Retrying in 5 seconds...")
+                    connection.close()
+                    time.sleep(5)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            engine.flush()
+            engine.notifier.shutdown(wait=True)
+
+    def _write_stats(self, engine):
+        stats = engine.stats
+        mean = stats['busy'] / stats['ticks'] * 1e6 if stats['ticks'] else 0.0
+        self.stdout.write(
+            f"{len(engine.positions)} positions, {stats['ticks']} ticks, {stats['fills']} fills, "
+            f"{stats['closes']} closes, {mean:.1f} us mean and {stats['max_latency'] * 1e3:.2f} ms max per tick"
+        )
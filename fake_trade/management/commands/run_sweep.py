@@ -0,0 +1,90 @@
+import csv
+import json
+from django.core.management.base import BaseCommand, CommandError
+from fake_trade.backtest import BacktestError
+from fake_trade.sweep import run_sweep, SweepError, STRATEGIES
+
+SUMMARY_COLUMNS = ('closed', 'win_rate', 'net_pnl', 'commission', 'final_balance', 'max_drawdown', 'error')
+
+
+def _load_json(value):
+    """JSON given inline or as @path."""
+    if value.startswith('@'):
+        with open(value[1:]) as f:
+            return json.load(f)
+    return json.loads(value)
+
+
+class Command(BaseCommand):
+    help = 'Run a backtest parameter sweep over stored 15m candles and print the results ranked by a metric'
+
+    def add_arguments(self, parser):
+        parser.add_argument('strategy', choices=list(STRATEGIES))
+        parser.add_argument(
+            '--space', required=True,
+            help='Search space as JSON or @file, e.g. {"tp_pct": [0.01, 0.02], "sl_pct": {"min": 0.005, "max": 0.03}}'
+        )
+        parser.add_argument('--search', choices=['grid', 'random'], default='grid')
+        parser.add_argument('--samples', type=int, default=50, help='Points drawn by a random search')
+        parser.add_argument('--seed', type=int)
+        parser.add_argument('--signals', help='Signals as JSON or @file, for the signals strategy')
+        parser.add_argument('--symbols', help='Comma separated symbols for the indicator strategy')
+        parser.add_argument('--start', help='First candle time (ISO)')
+        parser.add_argument('--end', help='Last candle time (ISO)')
+        parser.add_argument('--balance', type=float, default=10000.0)
+        parser.add_argument('--metric', default='net_pnl', help='Summary metric to rank by')
+        parser.add_argument('--order', choices=['asc', 'desc'], default='desc')
+        parser.add_argument('--backend', choices=['pool', 'celery'], default='pool')
+        parser.add_argument('--limit', type=int, default=20, help='Rows printed')
+        parser.add_argument('--output', help='Write all rows to a .csv or .json file')
+
+    def handle(self, *args, **options):
+        try:
+            space = _load_json(options['space'])
+            signals = _load_json(options['signals']) if options['signals'] else None
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Invalid JSON: {e}')
+
+        try:
+            result = run_sweep(
+                options['strategy'],
+                space,
+                search=options['search'],
+                samples=options['samples'],
+                seed=options['seed'],
+                signals=signals,
+                symbols=[s.strip().upper() for s in options['symbols'].split(',')] if options['symbols'] else None,
+                start=options['start'],
+                end=options['end'],
+                balance=options['balance'],
+                metric=options['metric'],
+                descending=options['order'] == 'desc',
+                backend=options['backend'],
+            )
+        except (BacktestError, SweepError) as e:
+            raise CommandError(str(e))
+
+        rows = result['results']
+        columns = list(space) + [c for c in SUMMARY_COLUMNS if any(c in row for row in rows)]
+        self.stdout.write(self.style.SUCCESS(f"{result['points']} points in {result['elapsed']}s"))
+        self.stdout.write('  '.join(f'{column:>14}' for column in columns))
+        for row in rows[:options['limit']]:
+            self.stdout.write('  '.join(f'{self._cell(row.get(column)):>14}' for column in columns))
+
+        if options['output']:
+            with open(options['output'], 'w', newline='') as f:
+                if options['output'].endswith('.json'):
+                    json.dump(result, f, indent=2)
+                else:
+                    writer = csv.DictWriter(f, fieldnames=list(dict.fromkeys(k for row in rows for k in row)))
+                    writer.writeheader()
+                    writer.writerows(rows)
+            self.stdout.write(f"Wrote {len(rows)} rows to {options['output']}")
+
+    @staticmethod
+    def _cell(value):
+        if value is None:
+            return '-'
+        if isinstance(value, float):
+            return f'{value:.6g}'
+        return str(value)[:14]
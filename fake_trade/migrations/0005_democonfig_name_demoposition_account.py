@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-19 00:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fake_trade', '0004_demoposition_create_time_and_more'),
+    ]
+
+    # Nullable first: the accounts are filled in by 0006 and constrained by
+    # 0007, each in its own transaction (Postgres refuses to ALTER a table
+    # with pending trigger events left by an UPDATE in the same transaction)
+    operations = [
+        migrations.AddField(
+            model_name='democonfig',
+            name='name',
+            field=models.CharField(max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='democonfig',
+            name='notify',
+            field=models.BooleanField(default=True, help_text="Send Telegram messages for this account's orders, fills and closes"),
+        ),
+        migrations.AddField(
+            model_name='demoposition',
+            name='account',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='positions', to='fake_trade.democonfig'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-19 00:50
+
+from django.db import migrations
+
+
+def name_accounts(apps, schema_editor):
+    """The first configuration becomes the default account, the others get their id in the name."""
+    DemoConfig = apps.get_model('fake_trade', 'DemoConfig')
+    for i, config in enumerate(DemoConfig.objects.order_by('id')):
+        config.name = 'default' if i == 0 else f'account-{config.id}'
+        config.save(update_fields=['name'])
+
+
+def assign_positions(apps, schema_editor):
+    """Existing positions belong to the default account."""
+    DemoConfig = apps.get_model('fake_trade', 'DemoConfig')
+    DemoPosition = apps.get_model('fake_trade', 'DemoPosition')
+    if not DemoPosition.objects.exists():
+        return
+    config, _ = DemoConfig.objects.get_or_create(name='default')
+    DemoPosition.objects.update(account=config)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fake_trade', '0005_democonfig_name_demoposition_account'),
+    ]
+
+    operations = [
+        migrations.RunPython(name_accounts, migrations.RunPython.noop),
+        migrations.RunPython(assign_positions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-19 00:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fake_trade', '0006_name_demo_accounts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='democonfig',
+            name='name',
+            field=models.CharField(default='default', help_text='Demo account (or strategy) name, positions and limits are scoped to it', max_length=64, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='demoposition',
+            name='account',
+            field=models.ForeignKey(help_text='Demo account the position belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='positions', to='fake_trade.democonfig', verbose_name='Account'),
+        ),
+        migrations.AddIndex(
+            model_name='demoposition',
+            index=models.Index(fields=['account', 'status'], name='fake_trade__account_4e2b70_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='demoposition',
+            index=models.Index(fields=['status'], name='fake_trade__status_50830e_idx'),
+        ),
+    ]
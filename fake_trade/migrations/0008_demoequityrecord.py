@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-19 00:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fake_trade', '0007_democonfig_name_unique_demoposition_account_required'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemoEquityRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField(verbose_name='Timestamp')),
+                ('balance', models.FloatField(help_text='Realised balance of the account', verbose_name='Balance')),
+                ('unrealized_pnl', models.FloatField(help_text='Net PnL of the open positions if closed at the latest prices, commissions included', verbose_name='Unrealized PnL')),
+                ('equity', models.FloatField(help_text='Balance plus unrealized PnL', verbose_name='Equity')),
+                ('open_positions', models.IntegerField(default=0, verbose_name='Open Positions')),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='equity_records', to='fake_trade.democonfig', verbose_name='Account')),
+            ],
+            options={
+                'verbose_name': 'Demo Equity Record',
+                'verbose_name_plural': 'Demo Equity Records',
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['account', 'timestamp'], name='fake_trade__account_ab9f66_idx')],
+            },
+        ),
+    ]
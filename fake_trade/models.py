@@ -1,8 +1,14 @@
 from django.db import models
 from asset.models import Asset
 
+DEFAULT_ACCOUNT = 'default'
+
 
 class DemoConfig(models.Model):
+    name = models.CharField(
+        max_length=64, unique=True, default=DEFAULT_ACCOUNT,
+        help_text="Demo account (or strategy) name, positions and limits are scoped to it"
+    )
     balance = models.DecimalField(
         max_digits=20, decimal_places=2, default=10000.00,
         help_text="Starting balance for demo account"
@@ -19,7 +25,11 @@ class DemoConfig(models.Model):
         max_digits=5, decimal_places=2, default=1.0,
         help_text="Leverage multiplier for trades"
     )
-    
+    notify = models.BooleanField(
+        default=True,
+        help_text="Send Telegram messages for this account's orders, fills and closes"
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -28,7 +38,7 @@ class DemoConfig(models.Model):
         verbose_name_plural = "Demo Configurations"
 
     def __str__(self):
-        return f"DemoConfig (Balance: {self.balance}, Leverage: {self.leverage}x)"
+        return f"DemoConfig {self.name} (Balance: {self.balance}, Leverage: {self.leverage}x)"
 
 
 class DemoPosition(models.Model):
@@ -43,6 +53,13 @@ class DemoPosition(models.Model):
         ('CLOSED', 'Closed'),
     )
 
+    account = models.ForeignKey(
+        DemoConfig,
+        on_delete=models.CASCADE,
+        related_name='positions',
+        verbose_name="Account",
+        help_text="Demo account the position belongs to"
+    )
     asset = models.ForeignKey(
         Asset,
         on_delete=models.CASCADE,
@@ -128,6 +145,48 @@ class DemoPosition(models.Model):
         verbose_name = "Demo Position"
         verbose_name_plural = "Demo Positions"
         ordering = ['-entry_time']
+        indexes = [
+            models.Index(fields=['account', 'status']),
+            models.Index(fields=['status']),
+        ]
 
     def __str__(self):
         return f"{self.asset.symbol} ({self.side}) - Qty: {self.quantity} - Status: {self.status}"
+
+
+class DemoEquityRecord(models.Model):
+    """Mark-to-market equity of a demo account, saved periodically by save_equity_records."""
+    account = models.ForeignKey(
+        DemoConfig,
+        on_delete=models.CASCADE,
+        related_name='equity_records',
+        verbose_name="Account"
+    )
+    timestamp = models.DateTimeField(verbose_name="Timestamp")
+    balance = models.FloatField(
+        verbose_name="Balance",
+        help_text="Realised balance of the account"
+    )
+    unrealized_pnl = models.FloatField(
+        verbose_name="Unrealized PnL",
+        help_text="Net PnL of the open positions if closed at the latest prices, commissions included"
+    )
+    equity = models.FloatField(
+        verbose_name="Equity",
+        help_text="Balance plus unrealized PnL"
+    )
+    open_positions = models.IntegerField(
+        default=0,
+        verbose_name="Open Positions"
+    )
+
+    class Meta:
+        verbose_name = "Demo Equity Record"
+        verbose_name_plural = "Demo Equity Records"
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['account', 'timestamp']),
+        ]
+
+    def __str__(self):
+        return f"{self.account.name} @ {self.timestamp}: {self.equity}"
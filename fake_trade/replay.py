@@ -0,0 +1,321 @@
+"""
+Replay of the demo-trading engine over recorded prices.
+
+fill_pending_positions and close_open_positions run once a minute against
+the latest Binance prices. A replay feeds recorded prices through the same
+functions (fake_trade.utils fill_triggered, exit_trigger, fill_position and
+close_position) on a simulated clock that ticks every `step` seconds like
+the beat schedule. At each tick a symbol's price is the last one recorded
+at or before it; pending positions are filled first, then open positions
+closed, as the two tasks would do at that minute. Orders go through the
+checks of place_fake_order (max open positions, available balance) at their
+time and are first seen by the next tick.
+
+Positions only change when a price does, so the clock jumps between the
+ticks where a sampled price changed, or an order arrived, instead of
+visiting every minute.
+
+Prices are recorded ticks (time, symbol, price) or stored 15m candles. A
+candle gives four prices: its open at the open time, high and low at +5 and
++10 minutes (low first on a rising candle, high first on a falling one) and
+its close at +14 minutes.
+"""
+import csv
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from decimal import Decimal, ROUND_HALF_UP
+import numpy as np
+from .backtest import BacktestError, CANDLE_SECONDS, epoch_seconds, load_candles, parse_signals
+from .models import DemoConfig, DemoPosition, DEFAULT_ACCOUNT
+from .utils import fill_triggered, exit_trigger, fill_position, close_position
+
+logger = logging.getLogger(__name__)
+
+CLOCK_STEP = 60
+CENT = Decimal('0.01')
+
+# Offsets of the open, first extreme, second extreme and close inside a 15m candle
+CANDLE_PATH = np.array([0, 300, 600, 840])
+
+
+def _stored(value):
+    """A money value as its numeric(20, 2) column stores it."""
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def candle_ticks(data):
+    """Price ticks {symbol: (epoch times, prices)} along the path of load_candles candles."""
+    ticks = {}
+    for symbol, (timestamps, opens, highs, lows, closes, _) in data.items():
+        rising = closes >= opens
+        path = np.column_stack((
+            opens,
+            np.where(rising, lows, highs),
+            np.where(rising, highs, lows),
+            closes,
+        ))
+        ticks[symbol] = ((timestamps[:, None] + CANDLE_PATH).ravel(), path.ravel())
+    return ticks
+
+
+def parse_ticks(records):
+    """Recorded price dicts (time, symbol, price) as {symbol: (epoch times, prices)} in time order."""
+    columns = {}
+    for i, record in enumerate(records):
+        try:
+            times, prices = columns.setdefault(str(record['symbol']).upper(), ([], []))
+            times.append(epoch_seconds(record['time']) if isinstance(record['time'], str) else int(record['time']))
+            prices.append(float(record['price']))
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            raise BacktestError(f'Invalid tick {i}: {e}')
+
+    ticks = {}
+    for symbol, (times, prices) in columns.items():
+        times = np.array(times, dtype=np.int64)
+        order = np.argsort(times, kind='stable')
+        ticks[symbol] = (times[order], np.array(prices)[order])
+    return ticks
+
+
+def read_ticks(path):
+    """Recorded ticks from a .csv file with time, symbol and price columns, or a .json list."""
+    with open(path, newline='') as f:
+        if path.endswith('.json'):
+            return parse_ticks(json.load(f))
+        return parse_ticks(csv.DictReader(f))
+
+
+def sample_prices(times, prices, start, end, step=CLOCK_STEP):
+    """
+    The clock ticks in [start, end] at which the last price recorded at or
+    before the tick changes, and that price: (tick epochs, prices).
+    """
+    first = -(-start // step) * step
+    # The tick at which each price is first seen, earlier prices all at the first one
+    ticks = np.maximum(-(-times // step) * step, first)
+    keep = ticks <= end
+    ticks, prices = ticks[keep], prices[keep]
+
+    # Several prices seen at one tick: the last one counts
+    last = np.append(ticks[1:] != ticks[:-1], True)
+    ticks, prices = ticks[last], prices[last]
+    changed = np.concatenate(([True], prices[1:] != prices[:-1]))
+    return ticks[changed], prices[changed]
+
+
+def _config(balance=None, max_open_positions=None, account=None):
+    """
+    An unsaved demo configuration with no positions: the stored account's
+    balance (all of it available) and limits unless overridden.
+    """
+    current = DemoConfig.objects.filter(name=account or DEFAULT_ACCOUNT).first() or DemoConfig()
+    balance = _stored(current.balance if balance is None else balance)
+    return DemoConfig(
+        balance=balance,
+        available_balance=balance,
+        max_open_positions=max_open_positions or current.max_open_positions,
+        leverage=current.leverage,
+    )
+
+
+def replay(orders, ticks=None, start=None, end=None, step=CLOCK_STEP, balance=None, max_open_positions=None,
+           account=None):
+    """
+    Replay demo orders through the demo-trading engine.
+
+    Args:
+        orders: Order dicts as for place_fake_order plus a time: symbol, time,
+                side, entry_price, tp and sl (or tp_pct and sl_pct), quantity
+        ticks: {symbol: (epoch times, prices)} (default: stored 15m candles)
+        start, end: Simulated clock range (datetime or ISO string, default:
+                    from the first order to the last price)
+        step: Clock tick in seconds
+        balance, max_open_positions: Override the demo account's
+        account: Demo account whose configuration is replayed (default: 'default')
+
+    Returns:
+        {'summary', 'positions', 'rejected'}. Nothing is saved.
+    """
+    started = time.monotonic()
+    parsed = parse_signals(orders)
+    if not len(parsed['time']):
+        raise BacktestError('At least one order is required')
+    if np.isnan(parsed['entry_price']).any():
+        raise BacktestError('Every order needs an entry_price, the demo engine only has limit orders')
+
+    direction = np.where(parsed['side'] == 'BUY', 1.0, -1.0)
+    tp = np.where(np.isnan(parsed['tp_pct']), parsed['tp'], parsed['entry_price'] * (1 + direction * parsed['tp_pct']))
+    sl = np.where(np.isnan(parsed['sl_pct']), parsed['sl'], parsed['entry_price'] * (1 - direction * parsed['sl_pct']))
+
+    start = epoch_seconds(start) if start else int(parsed['time'].min())
+    end = epoch_seconds(end) if end else None
+    symbols = sorted(set(parsed['symbol']))
+    if ticks is None:
+        ticks = candle_ticks(load_candles(symbols, start - CANDLE_SECONDS, end))
+    if end is None:
+        end = max((int(times[-1]) for times, _ in ticks.values() if len(times)), default=start)
+
+    # Orders in time order, those outside the clock range are never placed
+    order_index = np.argsort(parsed['time'], kind='stable')
+    order_index = order_index[(parsed['time'][order_index] >= start) & (parsed['time'][order_index] <= end)]
+    order_times = parsed['time'][order_index]
+
+    # Price events from each symbol's first order, plus a check at the first tick after every order
+    event_times, event_symbols, event_prices = [], [], []
+    for symbol_id, symbol in enumerate(symbols):
+        times_of_symbol = order_times[parsed['symbol'][order_index] == symbol]
+        if symbol not in ticks or not len(times_of_symbol):
+            continue
+        tick_times, prices = sample_prices(*ticks[symbol], int(times_of_symbol[0]), end, step)
+        checks = -(-times_of_symbol // step) * step
+        event_times += [tick_times, checks]
+        event_symbols += [np.full(len(tick_times) + len(checks), symbol_id)]
+        event_prices += [prices, np.full(len(checks), np.nan)]
+
+    if event_times:
+        event_times = np.concatenate(event_times)
+        event_symbols = np.concatenate(event_symbols)
+        event_prices = np.concatenate(event_prices)
+        event_order = np.lexsort((event_symbols, event_times))
+        event_times, event_symbols, event_prices = (
+            event_times[event_order], event_symbols[event_order], event_prices[event_order]
+        )
+    else:
+        event_times = event_symbols = event_prices = np.zeros(0, dtype=np.int64)
+
+    config = _config(balance, max_open_positions, account)
+    positions = {}
+    pending = {symbol_id: [] for symbol_id in range(len(symbols))}
+    open_ = {symbol_id: [] for symbol_id in range(len(symbols))}
+    symbol_ids = {symbol: symbol_id for symbol_id, symbol in enumerate(symbols)}
+    rejected = []
+    prices = {}
+    active = 0
+    next_order = 0
+
+    def place(i):
+        """place_fake_order's checks and balance update for order i."""
+        nonlocal active
+        now = datetime.fromtimestamp(int(parsed['time'][i]), tz=timezone.utc)
+        quantity, entry_price = float(parsed['quantity'][i]), float(parsed['entry_price'][i])
+        required_margin = quantity * entry_price
+        if active >= config.max_open_positions:
+            rejected.append((i, now, 'Max open positions reached'))
+            return
+        if required_margin > float(config.available_balance):
+            rejected.append((i, now, 'Not enough balance'))
+            return
+
+        position = DemoPosition(
+            side=parsed['side'][i],
+            quantity=quantity,
+            entry_price=entry_price,
+            take_profit=None if np.isnan(tp[i]) else float(tp[i]),
+            stop_loss=None if np.isnan(sl[i]) else float(sl[i]),
+            margin_balance=_stored(required_margin),
+            create_time=now,
+        )
+        config.available_balance = _stored(config.available_balance - Decimal(required_margin))
+        positions[i] = position
+        pending[symbol_ids[parsed['symbol'][i]]].append(position)
+        active += 1
+
+    # Ticks: groups of events at one time
+    bounds = (np.flatnonzero(np.diff(event_times)) + 1).tolist() if len(event_times) else []
+    for lo, hi in zip([0, *bounds], [*bounds, len(event_times)]):
+        tick = int(event_times[lo])
+        while next_order < len(order_index) and order_times[next_order] <= tick:
+            place(order_index[next_order])
+            next_order += 1
+
+        touched = []
+        for symbol_id, price in zip(event_symbols[lo:hi].tolist(), event_prices[lo:hi].tolist()):
+            if price == price:
+                prices[symbol_id] = price
+            if pending[symbol_id] or open_[symbol_id]:
+                touched.append(symbol_id)
+        if not touched:
+            continue
+
+        now = datetime.fromtimestamp(tick, tz=timezone.utc)
+        # fill_pending_positions, then close_open_positions
+        for symbol_id in touched:
+            price = prices.get(symbol_id)
+            if price is None:
+                continue
+            for position in list(pending[symbol_id]):
+                if fill_triggered(position.side, position.entry_price, price):
+                    fill_position(position, now)
+                    pending[symbol_id].remove(position)
+                    open_[symbol_id].append(position)
+        for symbol_id in touched:
+            price = prices.get(symbol_id)
+            if price is None:
+                continue
+            for position in list(open_[symbol_id]):
+                trigger = exit_trigger(position.side, position.take_profit, position.stop_loss, price)
+                if trigger:
+                    close_position(position, config, trigger[1], now)
+                    open_[symbol_id].remove(position)
+                    active -= 1
+
+    # Orders after the last price change
+    while next_order < len(order_index):
+        place(order_index[next_order])
+        next_order += 1
+
+    elapsed = time.monotonic() - started
+    minutes = max(end - start, 0) / 60
+    records = [_record(i, parsed['symbol'][i], position) for i, position in sorted(positions.items())]
+    closed = [record for record in records if record['status'] == 'CLOSED']
+    summary = {
+        'orders': len(parsed['time']),
+        'placed': len(positions),
+        'rejected': len(rejected),
+        'closed': len(closed),
+        'open': sum(record['status'] == 'OPEN' for record in records),
+        'pending': sum(record['status'] == 'PENDING' for record in records),
+        'net_pnl': round(sum(record['pnl'] for record in closed), 2),
+        'commission': round(sum(record['commission'] for record in closed), 2),
+        'balance': str(config.balance),
+        'available_balance': str(config.available_balance),
+        'start': datetime.fromtimestamp(start, tz=timezone.utc).isoformat(),
+        'end': datetime.fromtimestamp(end, tz=timezone.utc).isoformat(),
+        'simulated_minutes': round(minutes),
+        'elapsed': round(elapsed, 3),
+        'minutes_per_second': round(minutes / elapsed) if elapsed else None,
+    }
+    logger.info(f"Replayed {summary['simulated_minutes']} minutes of {len(positions)} positions in {elapsed:.2f}s")
+    return {
+        'summary': summary,
+        'positions': records,
+        'rejected': [
+            {'order': int(i), 'symbol': parsed['symbol'][i], 'time': now.isoformat(), 'reason': reason}
+            for i, now, reason in rejected
+        ],
+    }
+
+
+def _record(i, symbol, position):
+    def iso(value):
+        return value.isoformat() if value else None
+
+    return {
+        'order': int(i),
+        'symbol': symbol,
+        'side': position.side,
+        'quantity': position.quantity,
+        'entry_price': position.entry_price,
+        'take_profit': position.take_profit,
+        'stop_loss': position.stop_loss,
+        'margin': str(position.margin_balance),
+        'status': position.status,
+        'create_time': iso(position.create_time),
+        'entry_time': iso(position.entry_time),
+        'exit_time': iso(position.exit_time),
+        'exit_price': position.exit_price,
+        'commission': position.commission,
+        'pnl': position.pnl,
+    }
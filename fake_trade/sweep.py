@@ -0,0 +1,283 @@
+"""
+Parameter sweeps over backtests.
+
+A sweep evaluates a strategy at every point of a parameter grid, or at
+random samples of a search space, and ranks the points by a summary metric
+of fake_trade.backtest. The 15m candles are loaded once and written as
+memory-mapped .npy column files under SWEEP_DIR; pool processes and Celery
+workers map those files instead of querying candles again. Points are
+evaluated in chunks on a process pool (backend 'pool') or as Celery tasks
+(backend 'celery', the workers must see the same SWEEP_DIR).
+
+Strategies and their parameters:
+
+    signals    the given signals, with tp_pct and sl_pct replacing their
+               levels and min_probability dropping signals below it
+    indicator  market orders on the candle after an indicator crosses a
+               threshold: indicator, period, column, operator ('<' or '>'),
+               threshold, side, tp_pct, sl_pct and quantity
+
+A search space maps each parameter to a value or a list of values (grid and
+random search), or to {"min": .., "max": ..} (random search only, integers
+when both bounds are).
+"""
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from django.conf import settings
+from asset.models import Asset
+from indicators import utils
+from indicators.registry import get_indicator
+from indicators.screener import OPERATORS
+from .backtest import (
+    BacktestError, CANDLE_SECONDS, SIGNAL_COLUMNS, epoch_seconds, load_candles, parse_signals, simulate, summarize
+)
+
+logger = logging.getLogger(__name__)
+
+CANDLE_COLUMNS = ('timestamp', *utils.FIELDS)
+
+# Per-process caches of mapped candle files, sparse tables and indicator columns
+_mapped = {}
+
+
+class SweepError(ValueError):
+    pass
+
+
+def expand_grid(space):
+    """Every combination of the listed values: a list of parameter dicts."""
+    names = list(space)
+    values = [value if isinstance(value, list) else [value] for value in space.values()]
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+def sample_space(space, samples, seed=None):
+    """`samples` random parameter dicts drawn from the space."""
+    rng = random.Random(seed)
+
+    def draw(value):
+        if isinstance(value, list):
+            return rng.choice(value)
+        if isinstance(value, dict):
+            low, high = value['min'], value['max']
+            if isinstance(low, int) and isinstance(high, int):
+                return rng.randint(low, high)
+            return rng.uniform(low, high)
+        return value
+
+    return [{name: draw(value) for name, value in space.items()} for _ in range(samples)]
+
+
+def write_candles(data, directory):
+    """Write load_candles output as one .npy file per column plus a symbol index."""
+    symbols = sorted(data)
+    index = {}
+    offset = 0
+    for symbol in symbols:
+        index[symbol] = [offset, offset + len(data[symbol][0])]
+        offset += len(data[symbol][0])
+
+    for i, column in enumerate(CANDLE_COLUMNS):
+        np.save(os.path.join(directory, f'{column}.npy'), np.concatenate([data[symbol][i] for symbol in symbols]))
+    with open(os.path.join(directory, 'index.json'), 'w') as f:
+        json.dump(index, f)
+
+
+def open_candles(directory):
+    """
+    Candles written by write_candles as {symbol: load_candles tuple} of
+    read-only memory-mapped slices, mapped once per process.
+    """
+    if directory not in _mapped:
+        _mapped.clear()
+        with open(os.path.join(directory, 'index.json')) as f:
+            index = json.load(f)
+        columns = [np.load(os.path.join(directory, f'{column}.npy'), mmap_mode='r') for column in CANDLE_COLUMNS]
+        data = {symbol: tuple(column[lo:hi] for column in columns) for symbol, (lo, hi) in index.items()}
+        _mapped[directory] = (data, {}, {})
+    return _mapped[directory]
+
+
+def _signals_strategy(base, params, data, computed):
+    selected = np.ones(len(base['time']), dtype=bool)
+    if params.get('min_probability') is not None:
+        # Signals without a probability never pass a threshold
+        selected = base['probability'] >= float(params['min_probability'])
+
+    parsed = {name: values[selected] for name, values in base.items()}
+    for name in ('tp_pct', 'sl_pct'):
+        if params.get(name) is not None:
+            parsed[name] = np.full(selected.sum(), float(params[name]))
+    return parsed
+
+
+def _indicator_strategy(base, params, data, computed):
+    indicator = get_indicator(params.get('indicator'))
+    if indicator is None:
+        raise SweepError(f"No indicator with name: {params.get('indicator')}")
+    period = indicator.resolve_period(params.get('period'))
+    column = params.get('column') or indicator.columns[0]
+    operator = OPERATORS.get(params.get('operator', '<'))
+    if column not in indicator.columns or operator is None:
+        raise SweepError(f"Invalid column or operator in {params}")
+    side = str(params.get('side', 'BUY')).upper()
+    threshold = float(params['threshold'])
+
+    symbols, times = [], []
+    for symbol, candles in data.items():
+        key = (symbol, indicator.name, period)
+        if key not in computed:
+            output = indicator.compute(utils.to_arrays(np.column_stack(candles[1:])), period)
+            computed[key] = None if 'error' in output else output
+        if computed[key] is None:
+            continue
+
+        values = computed[key][column]
+        with np.errstate(invalid='ignore'):
+            condition = operator(values, threshold)
+        # Only the candle where the condition becomes true, entered after its close
+        crossed = np.flatnonzero(condition[1:] & ~condition[:-1]) + 1
+        symbols.extend([symbol] * len(crossed))
+        times.append(candles[0][crossed] + CANDLE_SECONDS)
+
+    count = len(symbols)
+    parsed = {
+        name: np.full(count, np.nan) for name, dtype in SIGNAL_COLUMNS.items() if dtype is np.float64
+    }
+    parsed.update({
+        'symbol': np.array(symbols, dtype=object),
+        'time': np.concatenate(times) if times else np.zeros(0, dtype=np.int64),
+        'side': np.full(count, side, dtype=object),
+        'quantity': np.full(count, float(params.get('quantity', 1.0))),
+    })
+    for name in ('tp_pct', 'sl_pct'):
+        if params.get(name) is not None:
+            parsed[name][:] = float(params[name])
+    return parsed
+
+
+STRATEGIES = {
+    'signals': _signals_strategy,
+    'indicator': _indicator_strategy,
+}
+
+
+def evaluate_chunk(directory, strategy, signals, points, balance):
+    """
+    Backtest a strategy at each parameter point on the mapped candles.
+    Returns one row per point: the parameters plus the backtest summary,
+    or an 'error'. Runs in pool processes and Celery workers.
+    """
+    data, tables, computed = open_candles(directory)
+    base = parse_signals(signals) if signals else None
+
+    rows = []
+    for params in points:
+        try:
+            parsed = STRATEGIES[strategy](base, params, data, computed)
+            summary, _, _ = summarize(simulate(parsed, data, tables), balance)
+            rows.append({**params, **summary})
+        except (BacktestError, SweepError, KeyError, TypeError, ValueError) as e:
+            rows.append({**params, 'error': str(e)})
+    return rows
+
+
+def _chunks(points, size):
+    for i in range(0, len(points), size):
+        yield points[i:i + size]
+
+
+def run_sweep(strategy, space, search='grid', samples=50, seed=None, signals=None, symbols=None,
+              start=None, end=None, balance=10000.0, metric='net_pnl', descending=True, backend='pool'):
+    """
+    Run a parameter sweep.
+
+    Args:
+        strategy: 'signals' or 'indicator'
+        space: Search space {parameter: value, [values] or {'min', 'max'}}
+        search: 'grid' or 'random' (`samples` points drawn with `seed`)
+        signals: Signal dicts for the 'signals' strategy
+        symbols: Symbols for the 'indicator' strategy (default: enabled assets)
+        start, end: Candle range (datetime or ISO string). start defaults to the
+                    first signal, or 30 days ago for the 'indicator' strategy
+        balance: Starting balance of every backtest
+        metric: Summary metric the results are ranked by
+        backend: 'pool' or 'celery'
+
+    Returns:
+        {'points', 'elapsed', 'results': rows sorted by metric}
+    """
+    started = time.monotonic()
+    if strategy not in STRATEGIES:
+        raise SweepError(f"Unknown strategy {strategy}. Must be one of: {', '.join(STRATEGIES)}")
+    if search == 'grid':
+        points = expand_grid(space)
+    elif search == 'random':
+        points = sample_space(space, samples, seed)
+    else:
+        raise SweepError('search must be grid or random')
+
+    if strategy == 'signals':
+        if not signals:
+            raise SweepError('The signals strategy needs signals')
+        parsed = parse_signals(signals)
+        symbols = sorted(set(parsed['symbol']))
+        start = epoch_seconds(start) if start else int(parsed['time'].min())
+    else:
+        symbols = symbols or list(Asset.objects.filter(enable=True).values_list('symbol', flat=True))
+        start = epoch_seconds(start or datetime.now(timezone.utc) - timedelta(days=30))
+
+    data = load_candles(symbols, start, epoch_seconds(end) if end else None)
+    if not data:
+        raise SweepError('No 15m candles for the requested symbols and range')
+
+    directory = tempfile.mkdtemp(prefix='sweep-', dir=settings.SWEEP_DIR or None)
+    try:
+        write_candles(data, directory)
+        del data
+        chunks = list(_chunks(points, settings.SWEEP_CHUNK_SIZE))
+        rows = []
+
+        if backend == 'celery':
+            from celery import group
+            from .tasks import evaluate_sweep_chunk
+            result = group(
+                evaluate_sweep_chunk.s(directory, strategy, signals, chunk, balance) for chunk in chunks
+            ).apply_async()
+            for chunk_rows in result.get():
+                rows.extend(chunk_rows)
+        else:
+            workers = min(settings.SWEEP_WORKERS, len(chunks))
+            # Pool workers cannot be started from daemonic processes (Celery prefork children)
+            if workers > 1 and not multiprocessing.current_process().daemon:
+                with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+                    futures = [
+                        pool.submit(evaluate_chunk, directory, strategy, signals, chunk, balance) for chunk in chunks
+                    ]
+                    for future in futures:
+                        rows.extend(future.result())
+            else:
+                for chunk in chunks:
+                    rows.extend(evaluate_chunk(directory, strategy, signals, chunk, balance))
+    finally:
+        _mapped.pop(directory, None)
+        shutil.rmtree(directory, ignore_errors=True)
+
+    # Points without the metric (errors, no closed trades) go last
+    rows.sort(key=lambda row: (
+        row.get(metric) is None, -(row.get(metric) or 0) if descending else (row.get(metric) or 0)
+    ))
+
+    elapsed = time.monotonic() - started
+    logger.info(f"Swept {len(points)} points of {strategy} in {elapsed:.2f}s")
+    return {'points': len(points), 'elapsed': round(elapsed, 3), 'results': rows}
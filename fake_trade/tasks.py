@@ -1,77 +1,71 @@
 from celery import shared_task
 import logging
+from django.db import transaction
 from django.utils import timezone
-from .models import DemoConfig, DemoPosition
-from .utils import send_telegram_message, fetch_last_prices
-from decimal import Decimal
+from .models import DemoConfig, DemoPosition, DemoEquityRecord
+from django.conf import settings
+from .utils import (
+    send_telegram_message, fetch_last_prices, fill_triggered, exit_trigger, fill_position, close_position,
+    fill_message, close_message
+)
+from .sweep import evaluate_chunk
+from .equity import equity_records
 
 logger = logging.getLogger(__name__)
 
 @shared_task
 def fill_pending_positions():
     """
-    Fill all pending DemoPositions using the latest price from Binance API.
-    Updates positions to OPEN and sends formatted Telegram message.
+    Fill all pending DemoPositions of every account using the latest prices of the shared snapshot.
+    Updates positions to OPEN in one transaction and sends formatted Telegram messages.
+    Skipped while the matching engine (run_matching_engine) handles fills.
     """
+    if settings.DEMO_ENGINE_ENABLED:
+        return
+
     try:
-        # 1. Fetch Prices
-        prices = fetch_last_prices()
+        # 1. Fetch Prices of the symbols with pending positions
+        symbols = set(DemoPosition.objects.filter(status='PENDING').values_list('asset__symbol', flat=True))
+        if not symbols:
+            return
+        prices = fetch_last_prices(symbols)
         if not prices:
             # fetch_last_prices handles the Telegram alert internally
             return
 
-        # 2. Get Config
-        config = DemoConfig.objects.first()
-        if not config:
-            msg = "❌ *Configuration Error*\nDemoConfig object not found in database."
-            logger.error("DemoConfig not found.")
+        now = timezone.now()
+        messages = []
+        with transaction.atomic():
+            # 2. Get Pending Positions of every account with their assets and
+            # accounts in one query, locked so an overlapping run waits for this one
+            pending_positions = DemoPosition.objects.select_for_update(of=('self',)).select_related(
+                'asset', 'account'
+            ).filter(status='PENDING')
+
+            filled = []
+            for position in pending_positions:
+                symbol = position.asset.symbol.upper()
+                last_price = prices.get(symbol)
+
+                if last_price is None:
+                    # Optional: Alert if a specific symbol is missing from API
+                    logger.warning(f"Price for {symbol} not found in API response.")
+                    continue
+
+                # 3. Fill in memory
+                if fill_triggered(position.side, float(position.entry_price), last_price):
+                    fill_position(position, now)
+                    filled.append(position)
+                    account = position.account
+                    if account.notify:
+                        messages.append(fill_message(position, symbol, account.available_balance, account.name))
+                    logger.info(f"Filled position {position.id} for {symbol}")
+
+            # 4. Apply all fills at once
+            DemoPosition.objects.bulk_update(filled, ['status', 'entry_time'])
+
+        for msg in messages:
             send_telegram_message(msg)
-            return
-
-        # 3. Get Pending Positions
-        pending_positions = DemoPosition.objects.filter(status='PENDING')
-
-        for position in pending_positions:
-            symbol = position.asset.symbol.upper()
-            
-            # Escape underscore for Telegram Markdown (e.g. 1000_SHIB -> 1000\_SHIB)
-            safe_symbol = symbol.replace('_', '\\_')
-            
-            last_price = prices.get(symbol)
-
-            if last_price is None:
-                # Optional: Alert if a specific symbol is missing from API
-                logger.warning(f"Price for {symbol} not found in API response.")
-                continue
-
-
-            should_fill = False
-            if position.side == "BUY" and last_price <= float(position.entry_price):
-                should_fill = True
-            elif position.side == "SELL" and last_price >= float(position.entry_price):
-                should_fill = True
-
-            # 5. Execute Fill
-            if should_fill:
-                position.status = 'OPEN'
-                position.entry_time = timezone.now()
-                position.save()
-
-                side_icon = "🟢" if position.side == "BUY" else "🔴"
-                
-                msg = (
-                    f"{side_icon} *Position Filled*\n"
-                    f"*Position ID:* `{position.id}`\n"
-                    f"*Symbol:* {safe_symbol}\n"
-                    f"*Side:* {position.side.upper()}\n"
-                    f"*Quantity:* {position.quantity}\n"
-                    f"*Fill Price:* {position.entry_price}\n"
-                    f"*Margin:* {position.margin_balance}\n"
-                    f"*Available Balance:* {config.available_balance}"
-                )
-                    
-                logger.info(f"Filled position {position.id} for {symbol}")
-                send_telegram_message(msg)
 
     except Exception as e:
         # Catch unexpected crashes in the loop or DB logic
@@ -90,137 +84,106 @@ def close_open_positions():
     3. Calculate PnL.
     4. Update User Balance.
     5. Send Telegram Alert.
+    All accounts are handled in one pass. Closes are computed in memory and
+    applied in one transaction: bulk updates of the positions and of the
+    locked DemoConfig of each account.
+    Skipped while the matching engine (run_matching_engine) handles closes.
     """
+    if settings.DEMO_ENGINE_ENABLED:
+        return
+
     try:
-        # 1. Fetch Latest Prices
-        prices = fetch_last_prices()
+        # 1. Fetch Latest Prices of the symbols with open positions
+        symbols = set(DemoPosition.objects.filter(status='OPEN').values_list('asset__symbol', flat=True))
+        if not symbols:
+            return
+        prices = fetch_last_prices(symbols)
         if not prices:
             # fetch_last_prices handles the specific Telegram alert
             return
 
-        # 2. Get Config (Needed for balance updates)
-        config = DemoConfig.objects.first()
-        if not config:
-            msg = "❌ *Configuration Error*\nDemoConfig object not found. Cannot close positions."
-            logger.error(msg)
-            send_telegram_message(msg)
-            return
-
-        # 3. Get Open Positions
-        open_positions = DemoPosition.objects.filter(status='OPEN')
-
-        for position in open_positions:
-            symbol = position.asset.symbol.upper()
-            safe_symbol = symbol.replace('_', '\\_') # Escape for Telegram
-            
-            current_price = prices.get(symbol)
-
-            if current_price is None:
-                continue
-
-            # --- Logic to Determine Exit ---
-            exit_triggered = False
-            exit_reason = "" # "TP" or "SL"
-            
-            # Convert DB floats to native python types for comparison
-            entry_price = float(position.entry_price)
-            tp = float(position.take_profit)
-            sl = float(position.stop_loss)
-            qty = float(position.quantity)
-
-            if position.side == "BUY":
-                # Long: Profit if price goes UP, Loss if price goes DOWN
-                if current_price >= tp:
-                    exit_triggered = True
-                    exit_reason = "TP"
-                elif current_price <= sl:
-                    exit_triggered = True
-                    exit_reason = "SL"
-            
-            elif position.side == "SELL":
-                # Short: Profit if price goes DOWN, Loss if price goes UP
-                if current_price <= tp:
-                    exit_triggered = True
-                    exit_reason = "TP"
-                elif current_price >= sl:
-                    exit_triggered = True
-                    exit_reason = "SL"
-
-            # --- Execute Closing Logic ---
-            if exit_triggered:
-                # 1. Calculate Values
-                entry_value = qty * entry_price
-
-                if exit_reason == "TP":
-                    exit_price = tp
-                else:
-                    exit_price = sl
-
-                exit_value = qty * exit_price
-
-                # 2. Calculate Commission (0.05% per side)
-                # 0.05% = 0.0005
-                commission_rate = 0.0005
-                entry_comm = entry_value * commission_rate
-                exit_comm = exit_value * commission_rate
-                total_commission = entry_comm + exit_comm
-
-                # 3. Calculate Gross PnL
-                gross_pnl = exit_value - entry_value
-                
-                # 4. Net PnL (Gross - Commission)
-                net_pnl = gross_pnl - total_commission
-
-                # 5. Update Position Model
-                position.status = 'CLOSED'
-                position.exit_price = exit_price
-                position.exit_time = timezone.now()
-                position.commission = total_commission
-                position.pnl = net_pnl
-                position.save()
-
-                # 6. Update User Balance
-                # Logic: We return the locked margin, then add the Net PnL.
-                # (If PnL is negative, it subtracts from the total).
-                
-                # Convert to Decimal for financial math with Django models
-                margin_release = Decimal(position.margin_balance)
-                pnl_decimal = Decimal(f"{net_pnl:.2f}")
-
-                config.available_balance += margin_release + pnl_decimal
-                config.balance += pnl_decimal # Total equity changes by PnL
-                config.save()
-
-                # 7. Send Telegram Message
-                
-                # Pick Emoji
-                if exit_reason == "TP":
-                    header_icon = "🚀 *Take Profit Hit*"
-                else:
-                    header_icon = "🛑 *Stop Loss Hit*"
-
-                # PnL Icon
-                pnl_icon = "🤑" if net_pnl > 0 else "🔻"
-
-                msg = (
-                    f"{header_icon}\n"
-                    f"*Position ID:* `{position.id}`\n"
-                    f"*Symbol:* {safe_symbol}\n"
-                    f"*Side:* {position.side}\n"
-                    f"*Entry:* {entry_price}\n"
-                    f"*Exit:* {exit_price}\n"
-                    f"*Gross PnL:* {gross_pnl:.2f}\n"
-                    f"*Comm (0.1%):* -{total_commission:.2f}\n"
-                    f"-----------------------------\n"
-                    f"{pnl_icon} *Net PnL:* {net_pnl:.2f}\n"
-                    f"-----------------------------\n"
-                    f"*New Balance:* {config.available_balance}"
+        now = timezone.now()
+        messages = []
+        with transaction.atomic():
+            # 2. Get the accounts with open positions (Needed for balance updates),
+            # locked in id order against lost updates
+            configs = DemoConfig.objects.select_for_update().filter(
+                id__in=DemoPosition.objects.filter(status='OPEN').values('account_id')
+            ).order_by('id')
+            configs = {config.id: config for config in configs}
+
+            # 3. Get Open Positions of every account with their assets in one query
+            open_positions = DemoPosition.objects.select_for_update(of=('self',)).select_related('asset').filter(
+                status='OPEN', account_id__in=list(configs)
+            )
+
+            closed = []
+            for position in open_positions:
+                symbol = position.asset.symbol.upper()
+                current_price = prices.get(symbol)
+
+                if current_price is None:
+                    continue
+
+                # --- Logic to Determine Exit ---
+                trigger = exit_trigger(position.side, position.take_profit, position.stop_loss, current_price)
+
+                # --- Execute Closing Logic in memory ---
+                if trigger:
+                    exit_reason, exit_price = trigger
+                    config = configs[position.account_id]
+
+                    # Commission (0.05% per side), PnL, position update and
+                    # balance update: the locked margin is returned, then the net PnL added
+                    gross_pnl, total_commission, net_pnl = close_position(position, config, exit_price, now)
+                    closed.append(position)
+
+                    if config.notify:
+                        messages.append(close_message(
+                            position, symbol, exit_reason, gross_pnl, total_commission, net_pnl,
+                            config.available_balance, config.name
+                        ))
+                    logger.info(f"Closed position {position.id} ({exit_reason}) for {symbol}. PnL: {net_pnl}")
+
+            # Apply all closes and the balance changes at once
+            if closed:
+                DemoPosition.objects.bulk_update(closed, ['status', 'exit_price', 'exit_time', 'commission', 'pnl'])
+                changed = {position.account_id for position in closed}
+                for account_id in changed:
+                    configs[account_id].updated_at = now
+                DemoConfig.objects.bulk_update(
+                    [configs[account_id] for account_id in changed], ['available_balance', 'balance', 'updated_at']
                 )
-                
-                logger.info(f"Closed position {position.id} ({exit_reason}) for {symbol}. PnL: {net_pnl}")
-                send_telegram_message(msg)
+
+        # Send Telegram Messages once committed
+        for msg in messages:
+            send_telegram_message(msg)
 
     except Exception as e:
         error_msg = f"⚠️ *TASK CRASHED*\nError in `check_and_close_positions`:\n`{str(e)}`"
         logger.error(error_msg)
-        send_telegram_message(error_msg)
\ No newline at end of file
+        send_telegram_message(error_msg)
+
+
+@shared_task
+def save_equity_records():
+    """
+    Save the mark-to-market equity of every demo account (fake_trade.equity):
+    one query for the accounts and their open positions, one price read and
+    one bulk insert, whatever the number of positions.
+    """
+    try:
+        records = equity_records()
+        if records is None:
+            logger.error("Prices unavailable, demo equity records not saved.")
+            return
+        DemoEquityRecord.objects.bulk_create(records)
+        logger.info(f"Saved {len(records)} demo equity records.")
+    except Exception as e:
+        logger.error(f"Error saving demo equity records: {e}")
+
+
+@shared_task
+def evaluate_sweep_chunk(directory, strategy, signals, points, balance):
+    """Evaluate a chunk of sweep points on candles mapped from a shared directory."""
+    return evaluate_chunk(directory, strategy, signals, points, balance)
@@ -1,3 +1,574 @@
-from django.test import TestCase
+import json
+import random
+from datetime import datetime, timedelta, timezone as dt_timezone
+import numpy as np
+from decimal import Decimal
+from unittest import mock
+from django.db import DatabaseError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from asset.models import Asset
+from fake_trade import tasks
+from fake_trade.backtest import BacktestError, run_backtest
+from fake_trade.engine import MatchingEngine
+from fake_trade.replay import parse_ticks, replay
+from fake_trade.sweep import SweepError, run_sweep
+from fake_trade.models import DemoConfig, DemoEquityRecord, DemoPosition
+from fake_trade.utils import close_pnl
+from ohlc.models import Candle15M
+from ohlc.utils.timeframes import open_candle_start
 
-# Create your tests here.
+
+class ClosePnlTests(SimpleTestCase):
+    """close_pnl books what close_open_positions does: exit minus entry value, less commission."""
+
+    def test_both_sides(self):
+        for side in ('BUY', 'SELL'):
+            for exit_price in (90, 110):
+                with self.subTest(side=side, exit_price=exit_price):
+                    gross_pnl, commission, net_pnl = close_pnl(side, 2.0, 100.0, exit_price)
+                    self.assertAlmostEqual(gross_pnl, 2 * exit_price - 200)
+                    self.assertAlmostEqual(commission, (200 + 2 * exit_price) * 0.0005)
+                    self.assertAlmostEqual(net_pnl, gross_pnl - commission)
+
+    def test_arrays(self):
+        gross_pnl, _, _ = close_pnl(
+            np.array(['BUY', 'SELL'], dtype=object), np.array([1.0, 1.0]), np.array([100.0, 100.0]), np.array([105.0, 95.0])
+        )
+        np.testing.assert_allclose(gross_pnl, [5.0, -5.0])
+
+
+class MigrationTestCase(TransactionTestCase):
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+
+class AccountMigrationTests(MigrationTestCase):
+    """Existing configurations and positions end up in named accounts."""
+
+    before = [('fake_trade', '0004_demoposition_create_time_and_more'), ('asset', '0004_asset_leverage')]
+    after = [('fake_trade', '0007_democonfig_name_unique_demoposition_account_required')]
+
+    def test_positions_assigned_to_default_account(self):
+        apps = self.migrate(self.before)
+        asset = apps.get_model('asset', 'Asset').objects.create(symbol='BTCUSDT')
+        DemoConfig = apps.get_model('fake_trade', 'DemoConfig')
+        first, second = DemoConfig.objects.create(), DemoConfig.objects.create()
+        apps.get_model('fake_trade', 'DemoPosition').objects.create(
+            asset=asset, side='BUY', quantity=1, entry_price=100, take_profit=110, stop_loss=90
+        )
+
+        apps = self.migrate(self.after)
+        DemoConfig = apps.get_model('fake_trade', 'DemoConfig')
+        self.assertEqual(DemoConfig.objects.get(id=first.id).name, 'default')
+        self.assertEqual(DemoConfig.objects.get(id=second.id).name, f'account-{second.id}')
+        self.assertEqual(
+            list(apps.get_model('fake_trade', 'DemoPosition').objects.values_list('account_id', flat=True)),
+            [first.id]
+        )
+
+
+@mock.patch('fake_trade.tasks.send_telegram_message')
+class AccountScopingTests(TestCase):
+    """Limits, fills and closes only touch the account a position belongs to."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.asset = Asset.objects.create(symbol='BTCUSDT')
+        cls.default = DemoConfig.objects.create(name='default', balance=1000, available_balance=1000, max_open_positions=2)
+        cls.alpha = DemoConfig.objects.create(name='alpha', balance=500, available_balance=500, max_open_positions=1, notify=False)
+
+    def order(self, account=None, side='BUY'):
+        tp, sl = (110, 90) if side == 'BUY' else (90, 110)
+        body = {'symbol': 'BTCUSDT', 'side': side, 'quantity': 1, 'entry_price': 100, 'tp': tp, 'sl': sl}
+        if account:
+            body['account'] = account
+        with mock.patch('fake_trade.views.send_telegram_message'):
+            return self.client.post('/api/demo/place-order/', json.dumps(body), content_type='application/json')
+
+    def test_limits_per_account(self, send):
+        self.assertEqual(self.order().status_code, 200)
+        self.assertEqual(self.order('alpha').status_code, 200)
+        self.assertEqual(self.order('alpha').status_code, 400)
+        self.assertEqual(self.order().status_code, 200)
+        self.assertEqual(self.order('nope').status_code, 404)
+        self.assertEqual(DemoPosition.objects.filter(account=self.default).count(), 2)
+        self.assertEqual(DemoPosition.objects.filter(account=self.alpha).count(), 1)
+
+    def test_fill_and_close_book_into_own_account(self, send):
+        self.order()
+        self.order('alpha', side='SELL')
+        with mock.patch('fake_trade.tasks.fetch_last_prices', return_value={'BTCUSDT': 100.0}):
+            tasks.fill_pending_positions()
+        with mock.patch('fake_trade.tasks.fetch_last_prices', return_value={'BTCUSDT': 111.0}):
+            tasks.close_open_positions()
+
+        self.default.refresh_from_db()
+        self.alpha.refresh_from_db()
+        # Long closed at TP 110, short at SL 110, both booked as exit minus entry value: +10 gross, 0.105 commission
+        self.assertEqual(self.default.balance, Decimal('1009.89'))
+        self.assertEqual(self.alpha.balance, Decimal('509.89'))
+        self.assertEqual(self.default.available_balance, self.default.balance)
+        self.assertEqual(self.alpha.available_balance, self.alpha.balance)
+        # Only the account with notifications on was messaged
+        self.assertTrue(all('alpha' not in call.args[0] for call in send.call_args_list))
+
+
+@mock.patch('fake_trade.engine.send_telegram_message')
+class MatchingEngineTests(TestCase):
+    """The engine writes each fill and close once, whatever fails in between."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.asset = Asset.objects.create(symbol='BTCUSDT')
+        cls.account = DemoConfig.objects.create(name='default', balance=1000, available_balance=900)
+
+    def setUp(self):
+        self.position = DemoPosition.objects.create(
+            account=self.account, asset=self.asset, side='BUY', quantity=1,
+            entry_price=100, take_profit=110, stop_loss=90, margin_balance=100
+        )
+        self.engine = MatchingEngine()
+        self.addCleanup(self.engine.notifier.shutdown)
+        self.engine.sync()
+
+    def test_failed_flush_is_retried(self, send):
+        self.engine.on_price('BTCUSDT', 99.0)
+        self.engine.on_price('BTCUSDT', 111.0)
+        with mock.patch.object(DemoConfig.objects, 'bulk_update', side_effect=DatabaseError('connection lost')):
+            with self.assertRaises(DatabaseError):
+                self.engine.flush()
+        self.position.refresh_from_db()
+        self.assertEqual(self.position.status, 'PENDING')
+
+        self.engine.flush()
+        self.position.refresh_from_db()
+        self.account.refresh_from_db()
+        self.assertEqual(self.position.status, 'CLOSED')
+        self.assertEqual(self.account.balance, Decimal('1009.89'))
+        self.assertEqual(self.account.available_balance, Decimal('1009.89'))
+
+        # Nothing is booked twice
+        self.engine.flush()
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('1009.89'))
+
+    def test_refresh_prices_matches_symbols_without_ticks(self, send):
+        with mock.patch('fake_trade.engine.get_prices', return_value={'BTCUSDT': 99.0}) as get_prices:
+            self.engine.refresh_prices()
+        get_prices.assert_called_once_with({'BTCUSDT'})
+        self.engine.flush()
+        self.position.refresh_from_db()
+        self.assertEqual(self.position.status, 'OPEN')
+
+
+def create_15m_candles(symbols, bars, seed):
+    """Random-walk closed 15m candles ending before the open one, as {symbol: (epochs, open, high, low, close)}."""
+    rng = np.random.default_rng(seed)
+    first = open_candle_start('15m') - timedelta(minutes=15) * bars
+    data = {}
+    for symbol in symbols:
+        asset = Asset.objects.create(symbol=symbol)
+        close = 100 * np.cumprod(1 + rng.uniform(-0.006, 0.006, bars))
+        open_ = np.concatenate(([100.0], close[:-1]))
+        high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.003, bars))
+        low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.003, bars))
+        candles = [
+            Candle15M(
+                symbol=asset, timestamp=first + timedelta(minutes=15) * i, volume=1,
+                **{field: Decimal(f'{values[i]:.8f}') for field, values in (('open', open_), ('high', high), ('low', low), ('close', close))}
+            )
+            for i in range(bars)
+        ]
+        Candle15M.objects.bulk_create(candles)
+        data[symbol] = (
+            [int(c.timestamp.timestamp()) for c in candles],
+            *([float(getattr(c, field)) for c in candles] for field in ('open', 'high', 'low', 'close'))
+        )
+    return data
+
+
+def random_signals(data, count, seed):
+    rng = random.Random(seed)
+    signals = []
+    for _ in range(count):
+        symbol = rng.choice(sorted(data))
+        epochs, _, _, _, close = data[symbol]
+        i = rng.randrange(len(epochs) - 10)
+        side = rng.choice(['BUY', 'SELL'])
+        sign = 1 if side == 'BUY' else -1
+        entry = None if rng.random() < 0.2 else close[i] * (1 - sign * rng.uniform(0, 0.01))
+        reference_price = entry or close[i]
+        signals.append({
+            'symbol': symbol,
+            'time': datetime.fromtimestamp(epochs[i] + rng.randrange(900), tz=dt_timezone.utc).isoformat(),
+            'side': side,
+            'entry_price': entry,
+            'tp': reference_price * (1 + sign * rng.uniform(0.005, 0.05)),
+            'sl': reference_price * (1 - sign * rng.uniform(0.005, 0.05)),
+            'quantity': rng.uniform(0.1, 2),
+            'probability': rng.random(),
+        })
+    return signals
+
+
+def resolve_loop(signal, candles):
+    """A signal resolved candle by candle: (status, exit price, net PnL)."""
+    epochs, open_, high, low, close = candles
+    buy = signal['side'] == 'BUY'
+    start = datetime.fromisoformat(signal['time']).timestamp()
+    first = next((k for k, epoch in enumerate(epochs) if epoch >= start), len(epochs))
+
+    entry, fill = signal['entry_price'], None
+    for k in range(first, len(epochs)):
+        if entry is None:
+            fill, entry = k, open_[k]
+            break
+        if (buy and low[k] <= entry) or (not buy and high[k] >= entry):
+            fill = k
+            break
+    if fill is None:
+        return 'PENDING', None, 0.0
+
+    status, exit_price = 'OPEN', close[-1]
+    for k in range(fill, len(epochs)):
+        # Pessimistic: SL first, and no TP on the fill candle
+        if (low[k] <= signal['sl']) if buy else (high[k] >= signal['sl']):
+            status, exit_price = 'CLOSED', signal['sl']
+            break
+        if k > fill and ((high[k] >= signal['tp']) if buy else (low[k] <= signal['tp'])):
+            status, exit_price = 'CLOSED', signal['tp']
+            break
+    return status, exit_price, float(close_pnl(signal['side'], signal['quantity'], entry, exit_price)[2])
+
+
+class BacktestTests(TestCase):
+    """The vectorized backtester resolves signals like a candle-by-candle loop."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_15m_candles(['AAAUSDT', 'BBBUSDT', 'CCCUSDT'], 600, seed=5)
+        cls.signals = random_signals(cls.data, 300, seed=5)
+
+    def test_matches_loop(self):
+        result = run_backtest(self.signals)
+        for signal, trade in zip(self.signals, result['trades']):
+            status, exit_price, pnl = resolve_loop(signal, self.data[signal['symbol']])
+            with self.subTest(signal=signal):
+                self.assertEqual(trade['status'], status)
+                if exit_price is not None:
+                    self.assertAlmostEqual(trade['exit_price'], exit_price, places=9)
+                self.assertAlmostEqual(trade['pnl'], pnl, places=6)
+        self.assertEqual(result['summary']['closed'], sum(t['status'] == 'CLOSED' for t in result['trades']))
+
+    def test_requires_signals(self):
+        with self.assertRaises(BacktestError):
+            run_backtest([])
+
+
+class SweepTests(TestCase):
+    """Sweep points are the backtests of their parameters, with or without the pool."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_15m_candles(['AAAUSDT', 'BBBUSDT'], 400, seed=6)
+        cls.signals = random_signals(cls.data, 150, seed=6)
+
+    def test_points_match_backtests(self):
+        space = {'tp_pct': [0.01, 0.02], 'sl_pct': [0.01, 0.02], 'min_probability': [0, 0.5]}
+        with override_settings(SWEEP_WORKERS=1):
+            sequential = run_sweep('signals', space, signals=self.signals)
+        with override_settings(SWEEP_WORKERS=2, SWEEP_CHUNK_SIZE=2):
+            pooled = run_sweep('signals', space, signals=self.signals)
+        self.assertEqual(sequential['points'], 8)
+        self.assertEqual(sequential['results'], pooled['results'])
+
+        for point in sequential['results'][:2]:
+            signals = [
+                dict(signal, tp_pct=point['tp_pct'], sl_pct=point['sl_pct'])
+                for signal in self.signals if signal['probability'] >= point['min_probability']
+            ]
+            self.assertAlmostEqual(point['net_pnl'], run_backtest(signals)['summary']['net_pnl'], places=6)
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(SweepError):
+            run_sweep('foo', {'tp_pct': 0.01})
+
+
+def random_ticks(symbols, start, seconds, seed, gap=(5, 150)):
+    """Random-walk price records {'time', 'symbol', 'price'} sorted by time."""
+    rng = random.Random(seed)
+    records = []
+    for symbol in symbols:
+        price, time = 100.0, start
+        while time < start + seconds:
+            price *= 1 + rng.uniform(-0.003, 0.003)
+            records.append({'time': time, 'symbol': symbol, 'price': round(price, 4)})
+            time += rng.randint(*gap)
+    return sorted(records, key=lambda record: record['time'])
+
+
+def random_orders(records, count, start, seconds, seed):
+    rng = random.Random(seed)
+    symbols = sorted({record['symbol'] for record in records})
+    orders = []
+    for _ in range(count):
+        symbol, time, side = rng.choice(symbols), start + rng.randrange(seconds - 3000), rng.choice(['BUY', 'SELL'])
+        last = [r['price'] for r in records if r['symbol'] == symbol and r['time'] <= time] or [100.0]
+        sign = 1 if side == 'BUY' else -1
+        price = last[-1] * (1 - sign * rng.uniform(0, 0.004))
+        orders.append({
+            'symbol': symbol, 'time': time, 'side': side, 'entry_price': round(price, 4),
+            'tp': round(price * (1 + sign * rng.uniform(0.002, 0.01)), 4),
+            'sl': round(price * (1 - sign * rng.uniform(0.002, 0.01)), 4),
+            'quantity': round(rng.uniform(1, 20), 3),
+        })
+    return sorted(orders, key=lambda order: order['time'])
+
+
+def iso_time(epoch):
+    return datetime.fromtimestamp(epoch, tz=dt_timezone.utc)
+
+
+class ReplayTestCase(TestCase):
+    SYMBOLS = ['AAAUSDT', 'BBBUSDT', 'CCCUSDT']
+    START = 1_700_000_000 // 60 * 60 + 17
+    SECONDS = 8 * 3600
+
+    @classmethod
+    def setUpTestData(cls):
+        for symbol in cls.SYMBOLS:
+            Asset.objects.create(symbol=symbol)
+        DemoConfig.objects.create(name='default', balance=10000, available_balance=10000, max_open_positions=6)
+
+    def assertPositionsEqual(self, stored, replayed):
+        self.assertEqual(len(stored), len(replayed))
+        for position, record in zip(stored, replayed):
+            with self.subTest(position=position.id):
+                self.assertEqual(position.status, record['status'])
+                self.assertEqual(position.entry_time.isoformat() if position.entry_time else None, record['entry_time'])
+                self.assertEqual(position.exit_time.isoformat() if position.exit_time else None, record['exit_time'])
+                self.assertEqual(position.exit_price, record['exit_price'])
+                self.assertAlmostEqual(position.pnl, record['pnl'], places=9)
+                self.assertEqual(str(position.margin_balance), record['margin'])
+
+
+class ReplayTests(ReplayTestCase):
+    """The replay books what the per-minute demo tasks book on the same prices."""
+
+    @mock.patch('fake_trade.tasks.send_telegram_message')
+    @mock.patch('fake_trade.views.send_telegram_message')
+    def test_matches_demo_tasks(self, *send):
+        records = random_ticks(self.SYMBOLS, self.START, self.SECONDS, seed=3)
+        orders = random_orders(records, 30, self.START, self.SECONDS, seed=3)
+        end = iso_time(self.START + self.SECONDS)
+        result = replay(
+            [dict(order, time=iso_time(order['time']).isoformat()) for order in orders],
+            ticks=parse_ticks(records), end=end
+        )
+
+        # The demo tasks run every minute on the latest price of each symbol
+        prices, next_order, next_record = {}, 0, 0
+        minute = -(-self.START // 60) * 60
+        while minute <= self.START + self.SECONDS:
+            while next_order < len(orders) and orders[next_order]['time'] <= minute:
+                order = orders[next_order]
+                body = {key: order[key] for key in ('symbol', 'quantity', 'side', 'entry_price', 'tp', 'sl')}
+                response = self.client.post('/api/demo/place-order/', json.dumps(body), content_type='application/json')
+                if response.status_code == 200:
+                    DemoPosition.objects.filter(id=response.json()['position_id']).update(create_time=iso_time(order['time']))
+                next_order += 1
+            while next_record < len(records) and records[next_record]['time'] <= minute:
+                prices[records[next_record]['symbol']] = records[next_record]['price']
+                next_record += 1
+            with mock.patch('fake_trade.tasks.fetch_last_prices', return_value=dict(prices)), \
+                    mock.patch('fake_trade.tasks.timezone.now', return_value=iso_time(minute)):
+                tasks.fill_pending_positions()
+                tasks.close_open_positions()
+            minute += 60
+
+        self.assertPositionsEqual(list(DemoPosition.objects.order_by('create_time', 'id')), result['positions'])
+        account = DemoConfig.objects.get(name='default')
+        self.assertEqual(str(account.balance), result['summary']['balance'])
+        self.assertEqual(str(account.available_balance), result['summary']['available_balance'])
+        self.assertGreater(result['summary']['closed'], 0)
+
+
+@mock.patch('fake_trade.engine.send_telegram_message')
+class EngineReplayTests(ReplayTestCase):
+    """The matching engine books what the replay does at one-second steps."""
+
+    def test_matches_replay(self, send):
+        records = random_ticks(self.SYMBOLS, self.START, self.SECONDS, seed=4, gap=(1, 60))
+        orders = [
+            dict(order, time=iso_time(self.START).isoformat())
+            for order in random_orders(records, 60, self.START, self.SECONDS, seed=4)
+        ]
+        DemoConfig.objects.filter(name='default').update(
+            balance=1000000, available_balance=1000000, max_open_positions=len(orders)
+        )
+        result = replay(orders, ticks=parse_ticks(records), step=1)
+
+        account = DemoConfig.objects.get(name='default')
+        assets = {asset.symbol: asset for asset in Asset.objects.all()}
+        for order in orders:
+            margin = round(Decimal(str(order['quantity'])) * Decimal(str(order['entry_price'])), 2)
+            DemoPosition.objects.create(
+                account=account, asset=assets[order['symbol']], side=order['side'], quantity=order['quantity'],
+                entry_price=order['entry_price'], take_profit=order['tp'], stop_loss=order['sl'], margin_balance=margin
+            )
+            account.available_balance -= margin
+        account.save()
+
+        engine = MatchingEngine()
+        self.addCleanup(engine.notifier.shutdown)
+        engine.sync()
+        for n, record in enumerate(records):
+            engine.on_price(record['symbol'], record['price'], now=iso_time(record['time']))
+            if n % 500 == 0:
+                engine.sync()
+        engine.sync()
+
+        self.assertPositionsEqual(list(DemoPosition.objects.order_by('id')), result['positions'])
+        account.refresh_from_db()
+        self.assertEqual(str(account.balance), result['summary']['balance'])
+        self.assertEqual(str(account.available_balance), result['summary']['available_balance'])
+        self.assertGreater(result['summary']['closed'], 0)
+
+
+@mock.patch('fake_trade.tasks.send_telegram_message')
+class DemoTaskQueryTests(TestCase):
+    """The per-minute demo tasks run a fixed number of queries however many positions move."""
+
+    SYMBOLS = ['AAAUSDT', 'BBBUSDT', 'CCCUSDT']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.assets = [Asset.objects.create(symbol=symbol) for symbol in cls.SYMBOLS]
+
+    def queries(self, count):
+        DemoPosition.objects.all().delete()
+        DemoConfig.objects.all().delete()
+        account = DemoConfig.objects.create(name='default', balance=10000, available_balance=10000)
+        DemoPosition.objects.bulk_create([
+            DemoPosition(
+                account=account, asset=self.assets[i % len(self.assets)], side='BUY' if i % 2 else 'SELL',
+                quantity=1, entry_price=100, take_profit=101 if i % 2 else 99, stop_loss=99 if i % 2 else 101,
+                margin_balance=100
+            )
+            for i in range(count)
+        ])
+        counts = []
+        for price, task in ((100.0, tasks.fill_pending_positions), (102.0, tasks.close_open_positions)):
+            with mock.patch('fake_trade.tasks.fetch_last_prices', return_value=dict.fromkeys(self.SYMBOLS, price)):
+                with CaptureQueriesContext(connection) as captured:
+                    task()
+            counts.append(len(captured))
+        self.assertEqual(DemoPosition.objects.filter(status='CLOSED').count(), count)
+        return counts
+
+    def test_queries_do_not_grow_with_positions(self, send):
+        self.assertEqual(self.queries(4), self.queries(40))
+
+
+class EquityRecordTests(TestCase):
+    """Equity records mark every open position to market in a fixed number of queries."""
+
+    SYMBOLS = ['AAAUSDT', 'BBBUSDT', 'CCCUSDT']
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(5)
+        assets = [Asset.objects.create(symbol=symbol) for symbol in cls.SYMBOLS]
+        cls.accounts = [
+            DemoConfig.objects.create(name=name, balance=balance, available_balance=balance)
+            for name, balance in (('default', 10000), ('alpha', 5000), ('idle', 700))
+        ]
+        DemoPosition.objects.bulk_create([
+            DemoPosition(
+                account=cls.accounts[i % 2], asset=rng.choice(assets), side=rng.choice(['BUY', 'SELL']),
+                quantity=round(rng.uniform(0.1, 2), 4), entry_price=round(rng.uniform(90, 110), 4),
+                margin_balance=1, status=rng.choice(['OPEN', 'OPEN', 'PENDING', 'CLOSED'])
+            )
+            for i in range(200)
+        ])
+        # The last symbol has no price, its positions are marked at their entry price
+        cls.prices = {'AAAUSDT': 101.5, 'BBBUSDT': 97.25}
+
+    def test_matches_position_by_position(self):
+        with mock.patch('fake_trade.equity.fetch_last_prices', return_value=self.prices):
+            with self.assertNumQueries(2):
+                tasks.save_equity_records()
+
+        for account in self.accounts:
+            with self.subTest(account=account.name):
+                positions = DemoPosition.objects.filter(account=account, status='OPEN').select_related('asset')
+                unrealized = sum(
+                    close_pnl(p.side, p.quantity, p.entry_price, self.prices.get(p.asset.symbol, p.entry_price))[2]
+                    for p in positions
+                )
+                record = DemoEquityRecord.objects.get(account=account)
+                self.assertEqual(record.open_positions, len(positions))
+                self.assertAlmostEqual(float(record.unrealized_pnl), round(unrealized, 2), places=2)
+                self.assertAlmostEqual(float(record.equity), float(account.balance) + round(unrealized, 2), places=2)
+
+    def test_no_prices_saves_nothing(self):
+        with mock.patch('fake_trade.equity.fetch_last_prices', return_value=None):
+            tasks.save_equity_records()
+        self.assertFalse(DemoEquityRecord.objects.exists())
+
+
+class EquityHistoryTests(TestCase):
+    """The equity API keeps each bucket's extremes and the full-resolution drawdown."""
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(6)
+        cls.account = DemoConfig.objects.create(name='default', balance=10000, available_balance=10000)
+        DemoConfig.objects.create(name='alpha', balance=5000, available_balance=5000)
+        cls.first = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+        cls.equity = [round(10000 + 200 * np.sin(i / 50) + rng.uniform(-5, 5), 2) for i in range(1000)]
+        cls.equity[400] = 9000.0
+        DemoEquityRecord.objects.bulk_create([
+            DemoEquityRecord(
+                account=cls.account, timestamp=cls.first + timedelta(minutes=5 * i), balance=10000,
+                unrealized_pnl=round(equity - 10000, 2), equity=equity, open_positions=1
+            )
+            for i, equity in enumerate(cls.equity)
+        ])
+
+    def test_downsampled_history(self):
+        data = self.client.get('/api/demo/equity/', {'points': 100}).json()
+        self.assertEqual(data['records'], 1000)
+        self.assertLessEqual(len(data['data']), 100)
+        self.assertEqual(min(bucket['equity_low'] for bucket in data['data']), 9000.0)
+        self.assertEqual(max(bucket['equity_high'] for bucket in data['data']), max(self.equity))
+        self.assertEqual(data['data'][-1]['timestamp'], (self.first + timedelta(minutes=5 * 999)).isoformat())
+
+        peak = np.maximum.accumulate(self.equity)
+        self.assertEqual(data['max_drawdown'], round(float(((peak - self.equity) / peak).max()), 4))
+
+    def test_range_and_full_resolution(self):
+        start = (self.first + timedelta(minutes=5 * 900)).timestamp()
+        data = self.client.get('/api/demo/equity/', {'start': start, 'points': 1000}).json()
+        self.assertEqual(data['records'], 100)
+        self.assertEqual([bucket['equity'] for bucket in data['data']], self.equity[900:])
+
+    def test_account_without_records(self):
+        data = self.client.get('/api/demo/equity/', {'account': 'alpha'}).json()
+        self.assertEqual((data['records'], data['data'], data['max_drawdown']), (0, [], 0.0))
+
+    def test_invalid_parameters(self):
+        for params, status in (
+            ({'points': 0}, 400), ({'points': 'x'}, 400), ({'start': '1e30'}, 400), ({'account': 'nope'}, 404)
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/demo/equity/', params).status_code, status)
@@ -1,13 +1,18 @@
 import requests
 import logging
+from decimal import Decimal
 from decouple import config
+from asset.utils import get_prices
+from .models import DEFAULT_ACCOUNT
 
 logger = logging.getLogger(__name__)
 
 # Load config once
 TELEGRAM_BOT_TOKEN = config("BOT_TOKEN")
 TELEGRAM_CHAT_ID = '-1003520692428' # or config("TELEGRAM_CHAT_ID")
-BINANCE_API_KEY = config("BINANCE_API_KEY")
+
+# Demo commission per side (0.05% on entry, 0.05% on exit)
+COMMISSION_RATE = 0.0005
 
 def send_telegram_message(message: str):
     """
@@ -30,27 +35,16 @@ def send_telegram_message(message: str):
         logger.error(f"Failed to send Telegram message: {e}")
 
 
-def fetch_last_prices():
+def fetch_last_prices(symbols=None):
     """
-    Fetch the last price for all symbols.
+    Fetch the last price of the symbols (default: all in the shared snapshot).
     Returns a Dictionary: {'BTCUSDT': 65000.00, ...}
+    Prices come from the snapshot kept by update_last_price, with one REST
+    download when some are missing or stale (asset.utils.get_prices).
     If it fails, it sends an alert to Telegram and returns None.
     """
     try:
-        headers = {'X-MBX-APIKEY': BINANCE_API_KEY}
-        
-        # Fetch all ticker prices
-        response = requests.get(
-            'https://fapi.binance.com/fapi/v1/ticker/price',
-            headers=headers,
-            timeout=10
-        )
-        response.raise_for_status()
-        prices_data = response.json()
-
-        # Create dictionary
-        prices_dict = {item['symbol']: float(item['price']) for item in prices_data}
-        return prices_dict
+        return get_prices(symbols)
 
     except requests.exceptions.RequestException as e:
         msg = f"⚠️ *CRITICAL API ERROR*\nFailed to fetch Binance prices.\nError: `{str(e)}`"
@@ -61,4 +55,131 @@ def fetch_last_prices():
         msg = f"⚠️ *SYSTEM ERROR*\nUnexpected error in price fetch.\nError: `{str(e)}`"
         logger.error(msg)
         send_telegram_message(msg)
-        return None
\ No newline at end of file
+        return None
+
+
+def close_pnl(side, quantity, entry_price, exit_price):
+    """
+    Gross PnL, commission and net PnL of closing a position, as
+    (gross_pnl, commission, net_pnl). Works on single positions and on NumPy
+    arrays of positions alike.
+
+    These are the rules close_open_positions has always booked: gross PnL is
+    exit value minus entry value whatever the side.
+    """
+    entry_value = quantity * entry_price
+    exit_value = quantity * exit_price
+
+    commission = entry_value * COMMISSION_RATE + exit_value * COMMISSION_RATE
+
+    gross_pnl = exit_value - entry_value
+    return gross_pnl, commission, gross_pnl - commission
+
+
+def account_line(account):
+    """Account line of a Telegram message, empty for the default account."""
+    if not account or account == DEFAULT_ACCOUNT:
+        return ""
+    safe_account = account.replace('_', '\\_')
+    return f"*Account:* {safe_account}\n"
+
+
+def fill_message(position, symbol, available_balance, account=None):
+    """Telegram message for a filled position."""
+    # Escape underscore for Telegram Markdown (e.g. 1000_SHIB -> 1000\_SHIB)
+    safe_symbol = symbol.replace('_', '\\_')
+    side_icon = "🟢" if position.side == "BUY" else "🔴"
+
+    return (
+        f"{side_icon} *Position Filled*\n"
+        f"{account_line(account)}"
+        f"*Position ID:* `{position.id}`\n"
+        f"*Symbol:* {safe_symbol}\n"
+        f"*Side:* {position.side.upper()}\n"
+        f"*Quantity:* {position.quantity}\n"
+        f"*Fill Price:* {position.entry_price}\n"
+        f"*Margin:* {position.margin_balance}\n"
+        f"*Available Balance:* {available_balance}"
+    )
+
+
+def close_message(position, symbol, exit_reason, gross_pnl, commission, net_pnl, available_balance, account=None):
+    """Telegram message for a position closed at TP or SL."""
+    safe_symbol = symbol.replace('_', '\\_')  # Escape for Telegram
+    header_icon = "🚀 *Take Profit Hit*" if exit_reason == "TP" else "🛑 *Stop Loss Hit*"
+    pnl_icon = "🤑" if net_pnl > 0 else "🔻"
+
+    return (
+        f"{header_icon}\n"
+        f"{account_line(account)}"
+        f"*Position ID:* `{position.id}`\n"
+        f"*Symbol:* {safe_symbol}\n"
+        f"*Side:* {position.side}\n"
+        f"*Entry:* {float(position.entry_price)}\n"
+        f"*Exit:* {position.exit_price}\n"
+        f"*Gross PnL:* {gross_pnl:.2f}\n"
+        f"*Comm (0.1%):* -{commission:.2f}\n"
+        f"-----------------------------\n"
+        f"{pnl_icon} *Net PnL:* {net_pnl:.2f}\n"
+        f"-----------------------------\n"
+        f"*New Balance:* {available_balance}"
+    )
+
+
+def fill_triggered(side, entry_price, price):
+    """Whether a pending limit position fills at `price`."""
+    if side == 'BUY':
+        return price <= entry_price
+    if side == 'SELL':
+        return price >= entry_price
+    return False
+
+
+def exit_trigger(side, take_profit, stop_loss, price):
+    """
+    ('TP' or 'SL', exit price) when `price` reaches a level of an open
+    position, None otherwise. Take profit is checked first; a level that is
+    not set never triggers.
+    """
+    if side == 'BUY':
+        # Long: Profit if price goes UP, Loss if price goes DOWN
+        if take_profit is not None and price >= take_profit:
+            return 'TP', float(take_profit)
+        if stop_loss is not None and price <= stop_loss:
+            return 'SL', float(stop_loss)
+    elif side == 'SELL':
+        # Short: Profit if price goes DOWN, Loss if price goes UP
+        if take_profit is not None and price <= take_profit:
+            return 'TP', float(take_profit)
+        if stop_loss is not None and price >= stop_loss:
+            return 'SL', float(stop_loss)
+    return None
+
+
+def fill_position(position, now):
+    """Mark a pending position filled at `now` (not saved)."""
+    position.status = 'OPEN'
+    position.entry_time = now
+
+
+def close_position(position, config, exit_price, now):
+    """
+    Close an open position at `exit_price` and book the result on the config
+    (neither is saved): the locked margin is returned to the available
+    balance and the net PnL added to both balances.
+    Returns (gross_pnl, commission, net_pnl).
+    """
+    gross_pnl, commission, net_pnl = close_pnl(
+        position.side, float(position.quantity), float(position.entry_price), exit_price
+    )
+    position.status = 'CLOSED'
+    position.exit_price = exit_price
+    position.exit_time = now
+    position.commission = float(commission)
+    position.pnl = float(net_pnl)
+
+    # Decimal for financial math with Django models
+    pnl_decimal = Decimal(f"{net_pnl:.2f}")
+    config.available_balance += Decimal(position.margin_balance) + pnl_decimal
+    config.balance += pnl_decimal  # Total equity changes by PnL
+    return float(gross_pnl), float(commission), float(net_pnl)
@@ -2,13 +2,19 @@ from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
 import json
 import logging
+from datetime import datetime, timezone
 from decimal import Decimal
+import numpy as np
+from django.conf import settings
+from django.db import transaction
 
-from .models import DemoConfig, DemoPosition
+from .models import DemoConfig, DemoPosition, DemoEquityRecord, DEFAULT_ACCOUNT
+from .backtest import run_backtest, BacktestError
+from .equity import downsample, max_drawdown
 from asset.models import Asset
 
 logger = logging.getLogger(__name__)
-from .utils import send_telegram_message
+from .utils import send_telegram_message, account_line
 
 
 @csrf_exempt
@@ -25,60 +31,69 @@ def place_fake_order(request):
         entry_price = data.get('entry_price')
         take_profit = data.get('tp')
         stop_loss = data.get('sl')
+        account = data.get('account') or DEFAULT_ACCOUNT
 
         if not all([symbol, quantity, side, entry_price, take_profit, stop_loss]):
             msg = "❌ Missing fields in order request"
             send_telegram_message(msg)
             return JsonResponse({'error': 'All fields (symbol, quantity, side, entry_price, tp, sl) are required.'}, status=400)
 
-        config = DemoConfig.objects.first()
-        if not config:
-            msg = "❌ Demo configuration not found"
-            send_telegram_message(msg)
-            return JsonResponse({'error': 'Demo configuration not found.'}, status=500)
+        # The account's config row is locked from the checks to the balance
+        # update, against concurrent orders and the demo tasks
+        with transaction.atomic():
+            config = DemoConfig.objects.select_for_update().filter(name=account).first()
+            if not config:
+                msg = f"❌ Demo account {account} not found"
+                send_telegram_message(msg)
+                return JsonResponse({'error': f'Demo account {account} not found.'}, status=404)
 
-        # Check max open positions
-        open_positions_count = DemoPosition.objects.filter(status__in=['PENDING', 'OPEN']).count()
-        if open_positions_count >= config.max_open_positions:
-            msg = f"❌ Max open positions reached ({config.max_open_positions}). Cannot place new order."
-            send_telegram_message(msg)
-            return JsonResponse({'error': msg}, status=400)
+            # Check max open positions of the account
+            open_positions_count = DemoPosition.objects.filter(account=config, status__in=['PENDING', 'OPEN']).count()
+            if open_positions_count >= config.max_open_positions:
+                msg = f"❌ Max open positions reached ({config.max_open_positions}). Cannot place new order."
+                if config.notify:
+                    send_telegram_message(msg)
+                return JsonResponse({'error': msg}, status=400)
 
-        # Check available balance
-        required_margin = float(quantity) * float(entry_price)
-        if required_margin > float(config.available_balance):
-            msg = f"❌ Not enough balance. Required: {required_margin}, Available: {config.available_balance}"
-            send_telegram_message(msg)
-            return JsonResponse({'error': msg}, status=400)
+            # Check available balance
+            required_margin = float(quantity) * float(entry_price)
+            if required_margin > float(config.available_balance):
+                msg = f"❌ Not enough balance. Required: {required_margin}, Available: {config.available_balance}"
+                if config.notify:
+                    send_telegram_message(msg)
+                return JsonResponse({'error': msg}, status=400)
 
-        # Find asset
-        asset = Asset.objects.filter(symbol=symbol.upper()).first()
-        if not asset:
-            msg = f"❌ Asset {symbol} not found"
-            send_telegram_message(msg)
-            return JsonResponse({'error': msg}, status=404)
+            # Find asset
+            asset = Asset.objects.filter(symbol=symbol.upper()).first()
+            if not asset:
+                msg = f"❌ Asset {symbol} not found"
+                send_telegram_message(msg)
+                return JsonResponse({'error': msg}, status=404)
 
-        # Create position
-        position = DemoPosition.objects.create(
-            asset=asset,
-            side=side.upper(),
-            quantity=quantity,
-            entry_price=entry_price,
-            stop_loss=stop_loss,
-            take_profit=take_profit,
-            margin_balance=required_margin
-        )
+            # Create position
+            position = DemoPosition.objects.create(
+                account=config,
+                asset=asset,
+                side=side.upper(),
+                quantity=quantity,
+                entry_price=entry_price,
+                stop_loss=stop_loss,
+                take_profit=take_profit,
+                margin_balance=required_margin
+            )
 
-        # Update available balance
-        config.available_balance -= Decimal(required_margin)
-        config.save()
+            # Update available balance
+            config.available_balance -= Decimal(required_margin)
+            config.save()
 
-        msg = f"💰 New Order:\n*Position ID:* {position.id}\n*Symbol:* {symbol.upper()}\n*Side:* {side.upper()}\n*Quantity:* {quantity}\n*Margin:* {required_margin}\n*Available Balance: *{config.available_balance}\n"
-        send_telegram_message(msg)
+        msg = f"💰 New Order:\n{account_line(account)}*Position ID:* {position.id}\n*Symbol:* {symbol.upper()}\n*Side:* {side.upper()}\n*Quantity:* {quantity}\n*Margin:* {required_margin}\n*Available Balance: *{config.available_balance}\n"
+        if config.notify:
+            send_telegram_message(msg)
         logger.info(msg)
 
         return JsonResponse({
             'success': True,
+            'account': account,
             'position_id': position.id,
             'symbol': symbol.upper(),
             'quantity': quantity,
@@ -102,10 +117,14 @@ def reset_demo_config(request):
         data = json.loads(request.body)
         init_balance = data.get('init_balance', 10000.00)
         max_open_positions = data.get('max_open_positions', 5)
+        account = data.get('account') or DEFAULT_ACCOUNT
+
+        config, created = DemoConfig.objects.get_or_create(name=account)
 
         # Create position to show reset
         asset = Asset.objects.filter(symbol='BTCUSDT').first()
         position = DemoPosition.objects.create(
+            account=config,
             asset=asset,
             side='BUY',
             quantity=0,
@@ -115,22 +134,23 @@ def reset_demo_config(request):
             margin_balance=0
         )
 
-        # Close all existing positions
-        DemoPosition.objects.filter(status__in=['PENDING', 'OPEN']).update(status='CLOSED')
+        # Close all existing positions of the account
+        DemoPosition.objects.filter(account=config, status__in=['PENDING', 'OPEN']).update(status='CLOSED')
 
-        # Update or create config
-        config, created = DemoConfig.objects.get_or_create(id=1)
+        # Update config
         config.balance = Decimal(init_balance)
         config.available_balance = Decimal(init_balance)
         config.max_open_positions = max_open_positions
         config.save()
 
-        msg = f"🔄 Demo configuration reset:\n*Initial Balance:* {init_balance}\n*Max Open Positions:* {max_open_positions}"
-        send_telegram_message(msg)
+        msg = f"🔄 Demo configuration reset:\n{account_line(account)}*Initial Balance:* {init_balance}\n*Max Open Positions:* {max_open_positions}"
+        if config.notify:
+            send_telegram_message(msg)
         logger.info(msg)
 
         return JsonResponse({
             'success': True,
+            'account': account,
             'init_balance': init_balance,
             'max_open_positions': max_open_positions
         })
@@ -147,11 +167,15 @@ def get_open_positions(request):
         send_telegram_message("❌ GET method required for /api/demo/open-positions/")
         return JsonResponse({'error': 'GET method required'}, status=405)
     try:
-        positions = DemoPosition.objects.filter(status__in=['PENDING', 'OPEN'])
+        positions = DemoPosition.objects.select_related('asset', 'account').filter(status__in=['PENDING', 'OPEN'])
+        account = request.GET.get('account')
+        if account:
+            positions = positions.filter(account__name=account)
         data = []
         for pos in positions:
             data.append({
                 'id': pos.id,
+                'account': pos.account.name,
                 'symbol': pos.asset.symbol,
                 'side': pos.side,
                 'quantity': pos.quantity,
@@ -165,4 +189,92 @@ def get_open_positions(request):
         msg = f"❌ Error fetching open positions: {str(e)}"
         send_telegram_message(msg)
         logger.exception(msg)
-        return JsonResponse({'error': str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@csrf_exempt
+def backtest_signals(request):
+    """
+    POST {"signals": [{"symbol", "time", "side", "entry_price", "tp", "sl", "quantity"}, ...],
+          "balance": 10000, "end": "2025-01-01T00:00:00Z"}
+    Resolve demo order signals against stored 15m candles (fake_trade.backtest).
+    entry_price null places a market order, balance and end are optional.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST method required'}, status=405)
+
+    try:
+        data = json.loads(request.body)
+        result = run_backtest(
+            data.get('signals') or [], balance=float(data.get('balance', 10000.0)), end=data.get('end')
+        )
+        return JsonResponse(result)
+
+    except (BacktestError, ValueError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        msg = f"❌ Error running backtest: {str(e)}"
+        send_telegram_message(msg)
+        logger.exception(msg)
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+def get_equity_history(request):
+    """
+    GET ?account=default&start=<unix>&end=<unix>&points=500
+    Mark-to-market equity curve of a demo account (save_equity_records),
+    downsampled on the server to at most `points` equal time buckets. Each
+    bucket has its last record plus its lowest and highest equity, and
+    max_drawdown is computed on the full-resolution series.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'GET method required'}, status=405)
+
+    account = request.GET.get('account') or DEFAULT_ACCOUNT
+    try:
+        points = int(request.GET.get('points', settings.DEMO_EQUITY_POINTS))
+        if not 1 <= points <= settings.DEMO_EQUITY_MAX_POINTS:
+            raise ValueError(f'points must be between 1 and {settings.DEMO_EQUITY_MAX_POINTS}')
+        records = DemoEquityRecord.objects.filter(account__name=account)
+        start, end = request.GET.get('start'), request.GET.get('end')
+        if start:
+            records = records.filter(timestamp__gte=datetime.fromtimestamp(float(start), tz=timezone.utc))
+        if end:
+            records = records.filter(timestamp__lte=datetime.fromtimestamp(float(end), tz=timezone.utc))
+    except (ValueError, OverflowError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    try:
+        if not DemoConfig.objects.filter(name=account).exists():
+            return JsonResponse({'error': f'Demo account {account} not found.'}, status=404)
+
+        rows = list(records.order_by('timestamp').values_list(
+            'timestamp', 'balance', 'unrealized_pnl', 'equity', 'open_positions'
+        ))
+        epochs = np.array([row[0].timestamp() for row in rows], dtype=np.int64)
+        equity = np.array([row[3] for row in rows], dtype=float)
+        last, low, high = downsample(epochs, equity, points)
+
+        data = [
+            {
+                'timestamp': rows[i][0].isoformat(),
+                'balance': rows[i][1],
+                'unrealized_pnl': rows[i][2],
+                'equity': rows[i][3],
+                'equity_low': float(low[k]),
+                'equity_high': float(high[k]),
+                'open_positions': rows[i][4],
+            }
+            for k, i in enumerate(last.tolist())
+        ]
+        return JsonResponse({
+            'account': account,
+            'records': len(rows),
+            'max_drawdown': round(max_drawdown(equity), 4),
+            'data': data,
+        })
+    except Exception as e:
+        msg = f"❌ Error fetching demo equity history: {str(e)}"
+        send_telegram_message(msg)
+        logger.exception(msg)
+        return JsonResponse({'error': str(e)}, status=500)
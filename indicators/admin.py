@@ -1,3 +1,9 @@
 from django.contrib import admin
+from indicators.models import IndicatorState
 
-# Register your models here.
+
+@admin.register(IndicatorState)
+class IndicatorStateAdmin(admin.ModelAdmin):
+    list_display = ('symbol', 'timeframe', 'indicator', 'period', 'last_timestamp', 'updated_at',)
+    list_filter = ('timeframe', 'indicator',)
+    exclude = ('state',)
@@ -0,0 +1,426 @@
+"""
+Incremental versions of the indicators in indicators.utils.
+
+Each indicator object keeps the running state of one series (EMA and Wilder
+averages, window sums, monotonic deques for window max/min) and advances one
+closed candle at a time with `update`. Fed the whole history of a series, the
+value returned for a candle equals what the batch function in utils returns
+for that candle, but recursive indicators never depend on how much warm-up
+was fetched.
+
+State is a JSON-serializable dict (`get_state` / `from_state`), persisted per
+(symbol, timeframe, indicator, period) in IndicatorState.
+"""
+from collections import deque
+
+
+# Window sums are re-summed from the window every `period` updates so that
+# add/subtract rounding does not build up over a long history
+def _resync_due(count, period):
+    return count % period == 0
+
+
+class IncrementalIndicator:
+    """Base class, subclasses implement `_update` and list their deques in `deques`."""
+    name = None
+    deques = {}  # attribute name -> maxlen as a function of period
+
+    def __init__(self, period):
+        self.period = period
+        self.count = 0  # candles seen
+        for attr, maxlen in self.deques.items():
+            setattr(self, attr, deque(maxlen=maxlen(period)))
+
+    def update(self, open_, high, low, close, volume):
+        """
+        Advance by one closed candle. Returns a dict of output columns
+        (same names as the batch function), or None while warming up.
+        """
+        result = self._update(float(open_), float(high), float(low), float(close), float(volume))
+        self.count += 1
+        return result
+
+    def _update(self, open_, high, low, close, volume):
+        raise NotImplementedError
+
+    def get_state(self):
+        return {
+            key: list(value) if isinstance(value, deque) else value
+            for key, value in vars(self).items()
+        }
+
+    @classmethod
+    def from_state(cls, period, state):
+        indicator = cls(period)
+        for key, value in (state or {}).items():
+            if key in cls.deques:
+                getattr(indicator, key).extend(value)
+            else:
+                setattr(indicator, key, value)
+        return indicator
+
+
+class _Wilder:
+    """Helpers for a Wilder average seeded with the plain mean of the first `period` values."""
+
+    @staticmethod
+    def add(state, value, period):
+        """`state` is [seed values, average or None]; returns the average once seeded."""
+        seed, average = state
+        if average is None:
+            seed.append(value)
+            if len(seed) == period:
+                state[0] = []
+                state[1] = average = sum(seed) / period
+            return average
+        state[1] = average = (average * (period - 1) + value) / period
+        return average
+
+
+class SMA(IncrementalIndicator):
+    name = 'sma'
+    deques = {'window': lambda period: period}
+
+    def __init__(self, period):
+        super().__init__(period)
+        self.total = 0.0
+
+    def _update(self, open_, high, low, close, volume):
+        if len(self.window) == self.period:
+            self.total -= self.window[0]
+        self.window.append(close)
+        self.total += close
+        if _resync_due(self.count, self.period):
+            self.total = sum(self.window)
+
+        if self.count < self.period:
+            return None
+        return {'value': self.total / self.period}
+
+
+class EMA(IncrementalIndicator):
+    name = 'ema'
+
+    def __init__(self, period):
+        super().__init__(period)
+        self.seed = []
+        self.ema = None
+
+    def _update(self, open_, high, low, close, volume):
+        if self.count < self.period:
+            self.seed.append(close)
+            if len(self.seed) == self.period:
+                self.ema = sum(self.seed) / self.period
+                self.seed = []
+            return None
+
+        self.ema = (close - self.ema) * (2 / (self.period + 1)) + self.ema
+        return {'value': self.ema}
+
+
+class RSI(IncrementalIndicator):
+    name = 'rsi'
+
+    def __init__(self, period):
+        super().__init__(period)
+        self.prev_close = None
+        self.gain = [[], None]
+        self.loss = [[], None]
+
+    def _update(self, open_, high, low, close, volume):
+        # Like the batch RSI, the value at a candle uses the changes up to the previous one
+        result = None
+        if self.count >= self.period + 1:
+            avg_gain, avg_loss = self.gain[1], self.loss[1]
+            result = {'value': 100.0 if avg_loss == 0 else 100 - (100 / (1 + avg_gain / avg_loss))}
+
+        if self.prev_close is not None:
+            delta = close - self.prev_close
+            _Wilder.add(self.gain, delta if delta > 0 else 0.0, self.period)
+            _Wilder.add(self.loss, -delta if delta < 0 else 0.0, self.period)
+        self.prev_close = close
+        return result
+
+
+class MACD(IncrementalIndicator):
+    """12/26/9 MACD; `period` is accepted for consistency and not used."""
+    name = 'macd'
+    fast_period = 12
+    slow_period = 26
+    signal_period = 9
+    # The batch MACD pairs the fast EMA with the slow EMA of 14 candles later
+    deques = {'fast_history': lambda period: MACD.slow_period - MACD.fast_period + 1}
+
+    def __init__(self, period):
+        super().__init__(period)
+        self.closes = []
+        self.fast = None
+        self.slow = None
+        self.macd_seed = []
+        self.signal = None
+
+    @staticmethod
+    def _step(ema, close, period):
+        return (close - ema) * (2 / (period + 1)) + ema
+
+    def _update(self, open_, high, low, close, volume):
+        i = self.count
+        if i < self.slow_period:
+            self.closes.append(close)
+
+        # Each EMA takes its seed at the candle after the seed window and folds from the next one
+        if i == self.fast_period:
+            self.fast = sum(self.closes[:self.fast_period]) / self.fast_period
+        elif i > self.fast_period:
+            self.fast = self._step(self.fast, close, self.fast_period)
+        if i >= self.fast_period:
+            self.fast_history.append(self.fast)
+
+        if i < self.slow_period:
+            return None
+        if i == self.slow_period:
+            self.slow = sum(self.closes) / self.slow_period
+            self.closes = []
+        else:
+            self.slow = self._step(self.slow, close, self.slow_period)
+
+        macd_value = self.fast_history[0] - self.slow
+
+        if self.signal is None:
+            self.macd_seed.append(macd_value)
+            if len(self.macd_seed) < self.signal_period:
+                return None
+            self.signal = sum(self.macd_seed) / self.signal_period
+            self.macd_seed = []
+        else:
+            self.signal = self._step(self.signal, macd_value, self.signal_period)
+
+        return {'macd': macd_value, 'signal': self.signal, 'histogram': macd_value - self.signal}
+
+
+class BollingerBands(IncrementalIndicator):
+    name = 'bollinger_bands'
+    std_dev = 2
+    deques = {'window': lambda period: period}
+
+    def __init__(self, period):
+        super().__init__(period)
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared deviations from the mean
+
+    def _resync(self):
+        self.mean = sum(self.window) / len(self.window)
+        self.m2 = sum((x - self.mean) ** 2 for x in self.window)
+
+    def _update(self, open_, high, low, close, volume):
+        if len(self.window) < self.period:
+            self.window.append(close)
+            self._resync()
+        else:
+            # Sliding Welford update: replace the oldest value with the new one
+            old = self.window[0]
+            self.window.append(close)
+            old_mean = self.mean
+            self.mean += (close - old) / self.period
+            self.m2 = max(self.m2 + (close - old) * (close - self.mean + old - old_mean), 0.0)
+            # Re-sum on schedule, and whenever the spread is small enough
+            # for the update's rounding to show in the square root
+            if _resync_due(self.count, self.period) or self.m2 < 1e-8 * self.mean * self.mean * self.period:
+                self._resync()
+
+        if self.count < self.period:
+            return None
+        deviation = self.std_dev * (self.m2 / self.period) ** 0.5
+        return {'upper': self.mean + deviation, 'middle': self.mean, 'lower': self.mean - deviation}
+
+
+class Stochastic(IncrementalIndicator):
+    name = 'stochastic'
+    # Monotonic deques of (index, value) for the window max/min, and the last 3 %K values
+    deques = {
+        'highs': lambda period: None,
+        'lows': lambda period: None,
+        'k_values': lambda period: 3,
+    }
+
+    def _update(self, open_, high, low, close, volume):
+        i = self.count
+        while self.highs and self.highs[-1][1] <= high:
+            self.highs.pop()
+        self.highs.append((i, high))
+        while self.lows and self.lows[-1][1] >= low:
+            self.lows.pop()
+        self.lows.append((i, low))
+        while self.highs[0][0] <= i - self.period:
+            self.highs.popleft()
+        while self.lows[0][0] <= i - self.period:
+            self.lows.popleft()
+
+        if i < self.period:
+            return None
+
+        highest_high = self.highs[0][1]
+        lowest_low = self.lows[0][1]
+        if highest_high == lowest_low:
+            k = 50.0
+        else:
+            k = ((close - lowest_low) / (highest_high - lowest_low)) * 100
+        self.k_values.append(k)
+
+        if len(self.k_values) < 3:
+            return None
+        return {'k': k, 'd': (self.k_values[0] + self.k_values[1] + self.k_values[2]) / 3}
+
+    @classmethod
+    def from_state(cls, period, state):
+        indicator = super().from_state(period, state)
+        # JSON turns the (index, value) tuples into lists
+        indicator.highs = deque(tuple(item) for item in indicator.highs)
+        indicator.lows = deque(tuple(item) for item in indicator.lows)
+        return indicator
+
+
+def _true_range(high, low, prev_close):
+    return max(high - low, abs(high - prev_close), abs(low - prev_close))
+
+
+class ATR(IncrementalIndicator):
+    name = 'atr'
+
+    def __init__(self, period):
+        super().__init__(period)
+        self.prev_close = None
+        self.tr = [[], None]
+
+    def _update(self, open_, high, low, close, volume):
+        prev_close, self.prev_close = self.prev_close, close
+        if prev_close is None:
+            return None
+
+        average = _Wilder.add(self.tr, _true_range(high, low, prev_close), self.period)
+        return None if average is None else {'value': average}
+
+
+class OBV(IncrementalIndicator):
+    """`period` is the index of the first candle accumulated, as in utils.obv."""
+    name = 'obv'
+
+    def __init__(self, period):
+        super().__init__(period)
+        self.prev_close = None
+        self.obv = 0.0
+
+    def _update(self, open_, high, low, close, volume):
+        if self.prev_close is None:
+            change = volume
+        elif close > self.prev_close:
+            change = volume
+        elif close < self.prev_close:
+            change = -volume
+        else:
+            change = 0.0
+        self.prev_close = close
+
+        if self.count < max(self.period, 0):
+            return None
+        self.obv += change
+        return {'value': self.obv}
+
+
+class ADX(IncrementalIndicator):
+    name = 'adx'
+    deques = {'dx_window': lambda period: period}
+
+    def __init__(self, period):
+        super().__init__(period)
+        self.prev = None  # (high, low, close) of the previous candle
+        self.tr = [[], None]
+        self.plus_dm = [[], None]
+        self.minus_dm = [[], None]
+        self.dx_total = 0.0
+        self.dx_count = 0
+
+    def _update(self, open_, high, low, close, volume):
+        prev, self.prev = self.prev, (high, low, close)
+        if prev is None:
+            return None
+        prev_high, prev_low, prev_close = prev
+
+        up_move = high - prev_high
+        down_move = prev_low - low
+        plus_dm = up_move if up_move > down_move and up_move > 0 else 0.0
+        minus_dm = down_move if down_move > up_move and down_move > 0 else 0.0
+
+        # The batch ADX skips the first smoothed value (the seed) of each average
+        seeded = self.tr[1] is not None
+        atr_value = _Wilder.add(self.tr, _true_range(high, low, prev_close), self.period)
+        plus_value = _Wilder.add(self.plus_dm, plus_dm, self.period)
+        minus_value = _Wilder.add(self.minus_dm, minus_dm, self.period)
+        if not seeded:
+            return None
+
+        plus_di = (plus_value / atr_value) * 100 if atr_value != 0 else 0.0
+        minus_di = (minus_value / atr_value) * 100 if atr_value != 0 else 0.0
+        di_sum = plus_di + minus_di
+        dx = (abs(plus_di - minus_di) / di_sum) * 100 if di_sum != 0 else 0.0
+
+        if len(self.dx_window) == self.period:
+            self.dx_total -= self.dx_window[0]
+        self.dx_window.append(dx)
+        self.dx_total += dx
+        self.dx_count += 1
+        if _resync_due(self.dx_count, self.period):
+            self.dx_total = sum(self.dx_window)
+
+        if len(self.dx_window) < self.period:
+            return None
+        return {'adx': self.dx_total / self.period, 'plus_di': plus_di, 'minus_di': minus_di}
+
+
+class CCI(IncrementalIndicator):
+    """Mean deviation has no running form, each update is O(period)."""
+    name = 'cci'
+    deques = {'window': lambda period: period}
+
+    def _update(self, open_, high, low, close, volume):
+        typical_price = (high + low + close) / 3
+        self.window.append(typical_price)
+        if self.count < self.period:
+            return None
+
+        sma_tp = sum(self.window) / self.period
+        mean_deviation = sum(abs(tp - sma_tp) for tp in self.window) / self.period
+        if mean_deviation == 0:
+            return {'value': 0.0}
+        return {'value': (typical_price - sma_tp) / (0.015 * mean_deviation)}
+
+
+class VWAP(IncrementalIndicator):
+    """`period` is the index of the first candle accumulated, as in utils.vwap."""
+    name = 'vwap'
+
+    def __init__(self, period):
+        super().__init__(period)
+        self.tp_volume = 0.0
+        self.volume = 0.0
+
+    def _update(self, open_, high, low, close, volume):
+        if self.count < max(self.period, 0):
+            return None
+
+        typical_price = (high + low + close) / 3
+        self.tp_volume += typical_price * volume
+        self.volume += volume
+        return {'value': typical_price if self.volume == 0 else self.tp_volume / self.volume}
+
+
+INCREMENTAL_INDICATORS = {
+    cls.name: cls
+    for cls in (SMA, EMA, RSI, MACD, BollingerBands, Stochastic, ATR, OBV, ADX, CCI, VWAP)
+}
+
+
+def create(indicator_name, period, state=None):
+    """Incremental indicator object for `indicator_name`, restored from `state` if given."""
+    cls = INCREMENTAL_INDICATORS[indicator_name]
+    return cls.from_state(period, state) if state else cls(period)
@@ -0,0 +1,82 @@
+"""
+Sequential indicator recurrences.
+
+EMA and Wilder smoothing fold every value into the previous result, so they
+cannot be vectorized with NumPy. When Numba is installed and
+INDICATOR_JIT_ENABLED is on, these loops are compiled to native code on their
+first call and the machine code is cached on disk, so later worker processes
+load it instead of compiling again. Otherwise they run as Python loops.
+Both backends perform the same float64 operations in the same order and
+return identical results.
+"""
+import numpy as np
+from django.conf import settings
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+JIT_ENABLED = numba is not None and settings.INDICATOR_JIT_ENABLED
+
+
+def _ema_loop(values, multiplier, seed):
+    out = np.empty(len(values))
+    ema_value = seed
+    for i in range(len(values)):
+        ema_value = (values[i] - ema_value) * multiplier + ema_value
+        out[i] = ema_value
+    return out
+
+
+def _wilder_loop(values, period, seed):
+    out = np.full(len(values), np.nan)
+    smoothed = seed
+    out[period - 1] = smoothed
+    for i in range(period, len(values)):
+        smoothed = (smoothed * (period - 1) + values[i]) / period
+        out[i] = smoothed
+    return out
+
+
+def _ema_python(values, multiplier, seed):
+    out = np.empty(len(values))
+    ema_value = seed
+    # Iterating a list is several times faster than indexing the array
+    for i, value in enumerate(values.tolist()):
+        ema_value = (value - ema_value) * multiplier + ema_value
+        out[i] = ema_value
+    return out
+
+
+def _wilder_python(values, period, seed):
+    out = np.full(len(values), np.nan)
+    smoothed = seed
+    out[period - 1] = smoothed
+    for i, value in enumerate(values[period:].tolist(), start=period):
+        smoothed = (smoothed * (period - 1) + value) / period
+        out[i] = smoothed
+    return out
+
+
+if JIT_ENABLED:
+    # No fastmath: results must match the Python backend bit for bit
+    _ema = numba.njit(cache=True, nogil=True)(_ema_loop)
+    _wilder = numba.njit(cache=True, nogil=True)(_wilder_loop)
+else:
+    _ema = _ema_python
+    _wilder = _wilder_python
+
+
+def ema_series(values, multiplier, seed):
+    """Apply the EMA update to each value in turn, starting from `seed`."""
+    return _ema(np.asarray(values, dtype=np.float64), float(multiplier), float(seed))
+
+
+def wilder_series(values, period, seed):
+    """
+    Wilder smoothing of values with at least `period` entries: `seed` (the
+    average of the first `period` values) sits at index period - 1, each
+    later index folds in its own value. Earlier indexes are NaN.
+    """
+    return _wilder(np.asarray(values, dtype=np.float64), int(period), float(seed))
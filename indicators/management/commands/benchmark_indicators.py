@@ -0,0 +1,115 @@
+import json
+import time
+import tracemalloc
+from django.core.management.base import BaseCommand, CommandError
+from indicators import kernels, reference, utils
+from indicators.registry import INDICATORS
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every indicator on synthetic candles: best time and peak memory per size, '
+        'and agreement with the reference implementation'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000,1000000', help='Comma separated candle counts')
+        parser.add_argument('--indicators', default=','.join(INDICATORS), help='Comma separated name[:period] specs')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per indicator, the best is reported')
+        parser.add_argument(
+            '--reference-max', type=int, default=100000,
+            help='Largest size checked against the (slow) reference implementation'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', help='Also write the results to this file')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--sizes must be comma separated integers')
+
+        specs = []
+        for item in options['indicators'].split(','):
+            name, _, period = item.strip().partition(':')
+            if name not in INDICATORS:
+                raise CommandError(f'No indicator with name: {name}')
+            specs.append((INDICATORS[name], INDICATORS[name].resolve_period(period)))
+
+        self.stdout.write(f"Backend: {'numba' if kernels.JIT_ENABLED else 'python'}")
+        self.stdout.write(
+            f"{'indicator':<22}{'candles':>10}{'time ms':>12}{'peak MiB':>10}"
+            f"{'reference ms':>14}{'speed-up':>10}{'deviation':>11}"
+        )
+
+        results = []
+        failed = []
+        for n in sizes:
+            values = reference.synthetic_candles(n, options['seed'])
+            candles = utils.to_arrays(values)
+            candles_data = reference.candles_data(values) if n <= options['reference_max'] else None
+
+            for indicator, period in specs:
+                result = self._run(indicator, period, candles, candles_data, options['repeat'])
+                results.append(result)
+                if not result['agrees']:
+                    failed.append(f"{result['indicator']} at {n} candles")
+                self._write_row(result)
+
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump({'backend': 'numba' if kernels.JIT_ENABLED else 'python', 'results': results}, f, indent=2)
+
+        if failed:
+            raise CommandError(f"Disagrees with the reference: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS('All checked results agree with the reference'))
+
+    def _run(self, indicator, period, candles, candles_data, repeat):
+        n = len(candles['close'])
+
+        # Untimed first call, which also loads or compiles the numba kernels
+        output = indicator.compute(candles, period)
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            indicator.compute(candles, period)
+            best = min(best, time.perf_counter() - started)
+
+        tracemalloc.start()
+        indicator.compute(candles, period)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        reference_time = deviation = None
+        agrees = True
+        if candles_data is not None:
+            started = time.perf_counter()
+            expected = getattr(reference, indicator.name)(candles_data, period=period)
+            reference_time = time.perf_counter() - started
+            actual = indicator.to_records(list(range(n)), output)
+            deviation = reference.max_deviation(expected, actual, indicator.outputs)
+            agrees = deviation is not None and deviation <= reference.TOLERANCE
+
+        return {
+            'indicator': f'{indicator.name}:{period}',
+            'candles': n,
+            'time_ms': round(best * 1000, 3),
+            'peak_mib': round(peak / 2 ** 20, 2),
+            'reference_ms': None if reference_time is None else round(reference_time * 1000, 1),
+            'deviation': deviation,
+            'agrees': agrees,
+        }
+
+    def _write_row(self, result):
+        reference_ms = result['reference_ms']
+        speedup = f"{reference_ms / result['time_ms']:.0f}x" if reference_ms and result['time_ms'] else '-'
+        if result['deviation'] is None:
+            deviation = '-' if reference_ms is None else 'mismatch'
+        else:
+            deviation = f"{result['deviation']:.2f}"
+
+        line = (
+            f"{result['indicator']:<22}{result['candles']:>10}{result['time_ms']:>12.3f}{result['peak_mib']:>10.2f}"
+            f"{'-' if reference_ms is None else f'{reference_ms:.1f}':>14}{speedup:>10}{deviation:>11}"
+        )
+        self.stdout.write(line if result['agrees'] else self.style.ERROR(line))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-19 00:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('asset', '0004_asset_leverage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndicatorState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timeframe', models.CharField(max_length=3)),
+                ('indicator', models.CharField(max_length=32)),
+                ('period', models.IntegerField()),
+                ('last_timestamp', models.DateTimeField(blank=True, help_text='Open time of the last closed candle fed to the indicator', null=True)),
+                ('state', models.JSONField(default=dict)),
+                ('value', models.JSONField(blank=True, help_text='Output at last_timestamp', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('symbol', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='asset.asset')),
+            ],
+            options={
+                'unique_together': {('symbol', 'timeframe', 'indicator', 'period')},
+            },
+        ),
+    ]
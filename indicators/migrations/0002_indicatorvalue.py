@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-19 00:03
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def reset_indicator_states(apps, schema_editor):
+    # States advanced before the value table existed have no stored history,
+    # dropping them makes the next run replay each series and fill it
+    apps.get_model('indicators', 'IndicatorState').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asset', '0004_asset_leverage'),
+        ('indicators', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndicatorValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timeframe', models.CharField(max_length=3)),
+                ('indicator', models.CharField(max_length=32)),
+                ('period', models.IntegerField()),
+                ('timestamp', models.DateTimeField()),
+                ('values', django.contrib.postgres.fields.ArrayField(base_field=models.FloatField(), help_text='Output columns in indicators.utils.OUTPUT_DECIMALS order', size=None)),
+                ('symbol', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='asset.asset')),
+            ],
+            options={
+                'unique_together': {('symbol', 'timeframe', 'indicator', 'period', 'timestamp')},
+            },
+        ),
+        migrations.RunPython(reset_indicator_states, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-19 00:12
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('indicators', '0002_indicatorvalue'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='indicatorvalue',
+            name='values',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.FloatField(), help_text="Output columns in the indicator's declared order (indicators.registry)", size=None),
+        ),
+    ]
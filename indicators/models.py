@@ -1,3 +1,40 @@
 from django.db import models
+from django.contrib.postgres.fields import ArrayField
+from asset.models import Asset
 
-# Create your models here.
+
+class IndicatorState(models.Model):
+    """Running state of an incremental indicator for one (symbol, timeframe) series"""
+    symbol = models.ForeignKey(Asset, on_delete=models.CASCADE)
+    timeframe = models.CharField(max_length=3)
+    indicator = models.CharField(max_length=32)
+    period = models.IntegerField()
+    last_timestamp = models.DateTimeField(
+        null=True, blank=True,
+        help_text="Open time of the last closed candle fed to the indicator"
+    )
+    state = models.JSONField(default=dict)
+    value = models.JSONField(null=True, blank=True, help_text="Output at last_timestamp")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('symbol', 'timeframe', 'indicator', 'period')
+
+    def __str__(self):
+        return f"{self.symbol.symbol} {self.timeframe} {self.indicator}({self.period})"
+
+
+class IndicatorValue(models.Model):
+    """Materialised output of a tracked indicator at one closed candle"""
+    symbol = models.ForeignKey(Asset, on_delete=models.CASCADE)
+    timeframe = models.CharField(max_length=3)
+    indicator = models.CharField(max_length=32)
+    period = models.IntegerField()
+    timestamp = models.DateTimeField()
+    values = ArrayField(
+        models.FloatField(),
+        help_text="Output columns in the indicator's declared order (indicators.registry)"
+    )
+
+    class Meta:
+        unique_together = ('symbol', 'timeframe', 'indicator', 'period', 'timestamp')
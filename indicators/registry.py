@@ -0,0 +1,104 @@
+"""
+Indicator registry.
+
+Every indicator the API serves is declared here with its batch function in
+indicators.utils, its default period, its output columns (with the decimals
+they are rounded to) and its warm-up: the number of candles it needs before
+a timestamp to have a value at that timestamp. The views fetch exactly that
+many bars before the requested start.
+"""
+import numpy as np
+from indicators import utils
+
+
+class Indicator:
+    """Declaration of one indicator."""
+
+    def __init__(self, name, default_period, outputs, warmup, uses_period=True, anchored=False):
+        self.name = name
+        self.func = getattr(utils, name)
+        self.default_period = default_period
+        self.outputs = outputs  # column -> decimals; a candle has a value when the first column is not NaN
+        self.warmup = warmup  # period -> bars needed before the first value
+        self.uses_period = uses_period
+        self.anchored = anchored  # cumulative from the first fetched candle
+
+    @property
+    def columns(self):
+        return list(self.outputs)
+
+    def resolve_period(self, period=None):
+        """
+        Period for a query value. None, '-1' and '0' select the default.
+        Raises ValueError for anything else that is not a positive integer.
+        """
+        if not self.uses_period or period in (None, '', '-1', '0'):
+            return self.default_period
+        period = int(period)
+        if period < 1:
+            raise ValueError(f'Invalid period: {period}')
+        return period
+
+    def compute(self, candles, period):
+        return self.func(candles, period=period)
+
+    def to_records(self, timestamps, result):
+        """
+        Convert a result to the API shape: one dict per candle that has a
+        value, with a 'timestamp' key and the rounded output columns.
+        """
+        if 'error' in result:
+            return result
+
+        index = np.flatnonzero(~np.isnan(result[self.columns[0]]))
+        values = [(column, result[column][index].tolist(), digits) for column, digits in self.outputs.items()]
+
+        return [
+            {
+                'timestamp': timestamps[i],
+                **{column: round(column_values[j], digits) for column, column_values, digits in values}
+            }
+            for j, i in enumerate(index.tolist())
+        ]
+
+    def to_columns(self, result, index):
+        """
+        Rounded output columns of a result at the positions in `index`, as
+        lists with None where the indicator has no value.
+        """
+        if 'error' in result:
+            return result
+
+        return {
+            column: [None if value != value else round(value, digits) for value in result[column][index].tolist()]
+            for column, digits in self.outputs.items()
+        }
+
+
+INDICATORS = {
+    indicator.name: indicator
+    for indicator in (
+        Indicator('sma', 14, {'value': 8}, lambda period: period),
+        Indicator('ema', 14, {'value': 8}, lambda period: period),
+        Indicator('rsi', 14, {'value': 2}, lambda period: period + 1),
+        # Fixed 12/26/9: the slow EMA and the signal seed need 26 + 9 - 1 bars
+        Indicator(
+            'macd', 34, {'macd': 8, 'signal': 8, 'histogram': 8}, lambda period: 34, uses_period=False
+        ),
+        Indicator('bollinger_bands', 20, {'upper': 8, 'middle': 8, 'lower': 8}, lambda period: period),
+        # %D is the 3-period average of %K
+        Indicator('stochastic', 14, {'k': 2, 'd': 2}, lambda period: period + 2),
+        Indicator('atr', 14, {'value': 8}, lambda period: period),
+        # Period is the index of the first candle accumulated
+        Indicator('obv', 1, {'value': 2}, lambda period: period, anchored=True),
+        # Wilder averages, then the average of `period` DX values
+        Indicator('adx', 14, {'adx': 2, 'plus_di': 2, 'minus_di': 2}, lambda period: 2 * period),
+        Indicator('cci', 20, {'value': 2}, lambda period: period),
+        Indicator('vwap', 1, {'value': 8}, lambda period: period, anchored=True),
+    )
+}
+
+
+def get_indicator(name):
+    """Registered indicator by name, None if unknown."""
+    return INDICATORS.get(name)
@@ -0,0 +1,76 @@
+"""
+Higher timeframes from base candles.
+
+Base candles are grouped into buckets of a higher timeframe aligned to UTC
+(weeks start on Monday, as on Binance) and aggregated with NumPy reductions.
+An indicator computed on the resampled candles is then forward-aligned onto
+the base timeline without look-ahead: each base candle gets the value of the
+last higher-timeframe candle that had closed by the time it closed, never
+the one still forming.
+"""
+import numpy as np
+
+DAY = 86400
+WEEK = 7 * DAY
+
+# The Unix epoch is a Thursday, weekly buckets are shifted to start on Monday
+WEEK_OFFSET = 4 * DAY
+
+
+def bucket_starts(epochs, seconds):
+    """Open time of the `seconds` bucket each epoch-second timestamp falls in."""
+    offset = WEEK_OFFSET if seconds % WEEK == 0 else 0
+    return (epochs - offset) // seconds * seconds + offset
+
+
+def resample(epochs, values, base_seconds, seconds):
+    """
+    Aggregate base candles (int64 epoch-second open times and an (n, 5)
+    float64 array of open, high, low, close, volume) into `seconds` candles.
+
+    Returns (open times, (m, 5) values) of the complete buckets only: the
+    first bucket is dropped when the data starts inside it and the last one
+    when it has not closed by the close of the last base candle.
+    """
+    if not len(epochs):
+        return epochs[:0], values[:0]
+
+    starts = bucket_starts(epochs, seconds)
+    first = np.concatenate(([0], np.flatnonzero(np.diff(starts)) + 1))
+    last = np.append(first[1:], len(epochs)) - 1
+
+    bucket = starts[first]
+    resampled = np.column_stack((
+        values[first, 0],
+        np.maximum.reduceat(values[:, 1], first),
+        np.minimum.reduceat(values[:, 2], first),
+        values[last, 3],
+        np.add.reduceat(values[:, 4], first),
+    ))
+
+    complete = np.ones(len(bucket), dtype=bool)
+    complete[0] &= epochs[0] == bucket[0]
+    complete[-1] &= bucket[-1] + seconds <= epochs[-1] + base_seconds
+    return bucket[complete], resampled[complete]
+
+
+def align_index(epochs, base_seconds, bucket, seconds):
+    """
+    Position in `bucket` of the last higher-timeframe candle closed when
+    each base candle closes, -1 where none has closed yet.
+    """
+    return np.searchsorted(bucket + seconds, epochs + base_seconds, side='right') - 1
+
+
+def align(result, index):
+    """Forward-align the output columns of a result with align_index positions."""
+    if 'error' in result:
+        return result
+
+    aligned = {}
+    for column, values in result.items():
+        column_values = np.full(len(index), np.nan)
+        known = index >= 0
+        column_values[known] = values[index[known]]
+        aligned[column] = column_values
+    return aligned
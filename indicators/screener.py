@@ -0,0 +1,269 @@
+"""
+Universe-wide screener.
+
+A screen is a list of conditions `<operand> <op> <operand>` that must all
+hold on the last closed candle of a symbol, with op one of < <= > >=.
+An operand is a number, a candle field or an indicator output at a timeframe:
+
+    rsi:14@1h < 30
+    close@4h > ema:200@4h
+    macd.histogram@1h > 0          (column of a multi-output indicator)
+
+Candles of every enabled asset are loaded with one query per timeframe, then
+symbols are evaluated in chunks across a process pool with the vectorized
+kernels of indicators.utils.
+"""
+import logging
+import multiprocessing
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from django.conf import settings
+from django.db.models import F, FloatField, Window
+from django.db.models.functions import Cast, RowNumber
+from asset.models import Asset
+from ohlc.utils.timeframes import TIMEFRAME_MODEL_MAP, open_candle_start
+from indicators import utils
+from indicators.registry import get_indicator
+
+logger = logging.getLogger(__name__)
+
+OPERATORS = {
+    '<=': np.less_equal,
+    '>=': np.greater_equal,
+    '<': np.less,
+    '>': np.greater,
+}
+
+_CONDITION = re.compile(r'^\s*(?P<left>[^<>=\s]+)\s*(?P<op><=|>=|<|>)\s*(?P<right>[^<>=\s]+)\s*$')
+_OPERAND = re.compile(
+    r'^(?P<name>[a-z_]+)(?::(?P<period>\d+))?(?:\.(?P<column>[a-z_]+))?@(?P<timeframe>[0-9a-z]+)$'
+)
+
+
+class ScreenerError(ValueError):
+    pass
+
+
+def parse_operand(text):
+    """
+    Parse an operand into a float, or a (name, period, column, timeframe)
+    tuple where name is an indicator or a candle field (period None).
+    """
+    try:
+        return float(text)
+    except ValueError:
+        pass
+
+    match = _OPERAND.match(text.strip().lower())
+    if not match:
+        raise ScreenerError(f'Invalid operand: {text}')
+
+    name, period, column, timeframe = match.group('name', 'period', 'column', 'timeframe')
+    if timeframe not in TIMEFRAME_MODEL_MAP:
+        raise ScreenerError(f'Invalid timeframe in {text}. Must be one of: {", ".join(TIMEFRAME_MODEL_MAP)}')
+
+    if name in utils.FIELDS:
+        if period is not None or column is not None:
+            raise ScreenerError(f'Candle field {name} takes no period or column')
+        return (name, None, None, timeframe)
+
+    indicator = get_indicator(name)
+    if indicator is None:
+        raise ScreenerError(f'No indicator with name: {name}')
+
+    column = column or indicator.columns[0]
+    if column not in indicator.columns:
+        raise ScreenerError(f'{name} has no output {column}. Outputs: {", ".join(indicator.columns)}')
+
+    try:
+        period = indicator.resolve_period(period)
+    except ValueError as e:
+        raise ScreenerError(f'{e} in {text}')
+    return (name, period, column, timeframe)
+
+
+def parse_conditions(conditions):
+    """Parse condition strings into (left, op, right, text) tuples."""
+    if not conditions:
+        raise ScreenerError('At least one condition is required')
+
+    parsed = []
+    for text in conditions:
+        match = _CONDITION.match(text)
+        if not match:
+            raise ScreenerError(f'Invalid condition: {text}')
+        left = parse_operand(match.group('left'))
+        right = parse_operand(match.group('right'))
+        if isinstance(left, float) and isinstance(right, float):
+            raise ScreenerError(f'Condition compares two numbers: {text}')
+        parsed.append((left, match.group('op'), right, text.strip()))
+    return parsed
+
+
+def operand_label(operand):
+    name, period, column, timeframe = operand
+    if period is None:
+        return f'{name}@{timeframe}'
+    if column != get_indicator(name).columns[0]:
+        return f'{name}:{period}.{column}@{timeframe}'
+    return f'{name}:{period}@{timeframe}'
+
+
+def _operands(conditions, sort):
+    operands = [o for left, _, right, _ in conditions for o in (left, right) if not isinstance(o, float)]
+    if sort is not None:
+        operands.append(sort)
+    return list(dict.fromkeys(operands))
+
+
+def load_candles(timeframes, bars):
+    """
+    Latest `bars` closed candles of every enabled asset for each timeframe,
+    one query per timeframe: {symbol: {timeframe: (n, 5) float64 array}}.
+    """
+    symbols = list(Asset.objects.filter(enable=True).values_list('symbol', flat=True))
+    data = {symbol: {} for symbol in symbols}
+
+    for timeframe in timeframes:
+        rows = TIMEFRAME_MODEL_MAP[timeframe].objects.filter(
+            symbol__enable=True,
+            timestamp__lt=open_candle_start(timeframe)
+        ).annotate(
+            row_number=Window(RowNumber(), partition_by=[F('symbol_id')], order_by=F('timestamp').desc()),
+        ).filter(row_number__lte=bars).order_by('symbol__symbol', 'timestamp').values_list(
+            # Floats straight from the database, skipping Decimal construction
+            'symbol__symbol', *(Cast(field, FloatField()) for field in utils.FIELDS)
+        )
+
+        grouped = {}
+        for symbol, *values in rows:
+            grouped.setdefault(symbol, []).append(values)
+        for symbol, values in grouped.items():
+            data[symbol][timeframe] = np.array(values, dtype=np.float64)
+
+    return data
+
+
+def _last_value(candles, operand, computed):
+    """Value of an operand at the last closed candle, NaN when unavailable."""
+    name, period, column, timeframe = operand
+    values = candles.get(timeframe)
+    if values is None or not len(values):
+        return np.nan
+
+    if period is None:
+        return float(values[-1, utils.FIELDS.index(name)])
+
+    key = (name, period, timeframe)
+    if key not in computed:
+        computed[key] = get_indicator(name).compute(utils.to_arrays(values), period)
+    result = computed[key]
+    if 'error' in result:
+        return np.nan
+    return float(result[column][-1])
+
+
+def evaluate_chunk(chunk, conditions, operands):
+    """
+    Evaluate conditions for a chunk of {symbol: candles}. Returns
+    [(symbol, {operand: value})] for the symbols that match. Runs in pool workers.
+    """
+    matches = []
+    for symbol, candles in chunk.items():
+        computed = {}
+        values = {operand: _last_value(candles, operand, computed) for operand in operands}
+
+        matched = True
+        for left, op, right, _ in conditions:
+            left_value = left if isinstance(left, float) else values[left]
+            right_value = right if isinstance(right, float) else values[right]
+            # NaN (missing data or warm-up) never matches
+            if not OPERATORS[op](left_value, right_value):
+                matched = False
+                break
+
+        if matched:
+            matches.append((symbol, values))
+    return matches
+
+
+def _chunks(data, size):
+    items = list(data.items())
+    for i in range(0, len(items), size):
+        yield dict(items[i:i + size])
+
+
+def _bars_needed(operands):
+    # SCREENER_BARS on top of the warm-up lets the recursive averages settle
+    warmups = [get_indicator(name).warmup(period) for name, period, _, _ in operands if period is not None]
+    return settings.SCREENER_BARS + max(warmups, default=0)
+
+
+def run_screen(conditions, sort=None, descending=False, limit=None):
+    """
+    Run a screen over all enabled assets.
+
+    Args:
+        conditions: List of condition strings
+        sort: Operand string to rank matches by (default: first operand of the first condition)
+        descending: Rank from the highest value
+        limit: Maximum number of matches returned
+
+    Returns:
+        {'scanned', 'matched', 'elapsed', 'results': [{'symbol', 'values'}]}
+    """
+    started = time.monotonic()
+    conditions = parse_conditions(conditions)
+    if sort is not None:
+        sort = parse_operand(sort)
+        if isinstance(sort, float):
+            raise ScreenerError('sort must be a candle field or an indicator')
+    else:
+        first_left, _, first_right, _ = conditions[0]
+        sort = first_left if not isinstance(first_left, float) else first_right
+
+    operands = _operands(conditions, sort)
+    timeframes = sorted({operand[3] for operand in operands})
+    data = load_candles(timeframes, _bars_needed(operands))
+
+    chunk_size = settings.SCREENER_CHUNK_SIZE
+    chunks = list(_chunks(data, chunk_size))
+    workers = min(settings.SCREENER_WORKERS, len(chunks))
+
+    # Pool workers cannot be started from daemonic processes (Celery prefork children)
+    if workers > 1 and not multiprocessing.current_process().daemon:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+            results = pool.map(evaluate_chunk, chunks, [conditions] * len(chunks), [operands] * len(chunks))
+            matches = [match for chunk_matches in results for match in chunk_matches]
+    else:
+        matches = [match for chunk in chunks for match in evaluate_chunk(chunk, conditions, operands)]
+
+    # Matches without a sort value go last
+    matches.sort(key=lambda match: (
+        np.isnan(match[1][sort]), -match[1][sort] if descending else match[1][sort]
+    ))
+    matched = len(matches)
+    if limit:
+        matches = matches[:limit]
+
+    elapsed = time.monotonic() - started
+    logger.info(f"Screened {len(data)} symbols in {elapsed:.2f}s: {matched} matches")
+
+    return {
+        'scanned': len(data),
+        'matched': matched,
+        'elapsed': round(elapsed, 3),
+        'sort': operand_label(sort),
+        'results': [
+            {
+                'symbol': symbol,
+                'values': {
+                    operand_label(operand): None if np.isnan(value) else round(value, 8)
+                    for operand, value in values.items()
+                }
+            }
+            for symbol, values in matches
+        ]
+    }
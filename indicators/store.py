@@ -0,0 +1,86 @@
+"""
+Materialised indicator values.
+
+Indicators listed in TRACKED_INDICATORS are advanced on every candle close
+(see indicators.tasks) and, unless they are anchored to the request window,
+their output for each closed candle is written to IndicatorValue. The API
+serves registered (indicator, period, timeframe) combinations from that table
+with one index range scan and computes everything else on the fly.
+"""
+from django.conf import settings
+from ohlc.utils.timeframes import TIMEFRAME_MODEL_MAP, open_candle_start
+from indicators.models import IndicatorState, IndicatorValue
+from indicators.registry import get_indicator
+
+
+def tracked_indicators(timeframe):
+    """
+    (indicator, period) pairs tracked for a timeframe. TRACKED_INDICATORS items
+    are 'name:period', optionally restricted to timeframes with '@tf[|tf...]'.
+    """
+    tracked = []
+    for item in settings.TRACKED_INDICATORS:
+        spec, _, timeframes = item.strip().partition('@')
+        if timeframes and timeframe not in timeframes.split('|'):
+            continue
+        name, _, period = spec.partition(':')
+        tracked.append((name, int(period)))
+    return tracked
+
+
+def is_materialized(indicator_name, period, timeframe):
+    return (
+        settings.INDICATOR_STATE_ENABLED
+        and not get_indicator(indicator_name).anchored
+        and (indicator_name, period) in tracked_indicators(timeframe)
+    )
+
+
+def value_row(asset, timeframe, indicator_name, period, timestamp, output):
+    """IndicatorValue for one indicator output dict."""
+    return IndicatorValue(
+        symbol=asset,
+        timeframe=timeframe,
+        indicator=indicator_name,
+        period=period,
+        timestamp=timestamp,
+        values=[output[column] for column in get_indicator(indicator_name).columns]
+    )
+
+
+def read_records(asset, timeframe, indicator_name, period, start, end):
+    """
+    Stored values for candles with start <= timestamp <= end, in the API
+    record shape, or None when the range reaches the forming candle or the
+    store has not caught up with its last candle yet.
+    """
+    # The forming candle has no stored value
+    if end >= open_candle_start(timeframe):
+        return None
+
+    last_candle = TIMEFRAME_MODEL_MAP[timeframe].objects.filter(
+        symbol=asset, timestamp__lte=end
+    ).order_by('-timestamp').values_list('timestamp', flat=True).first()
+    last_fed = IndicatorState.objects.filter(
+        symbol=asset, timeframe=timeframe, indicator=indicator_name, period=period
+    ).values_list('last_timestamp', flat=True).first()
+    if last_candle is None or last_fed is None or last_fed < last_candle:
+        return None
+
+    rows = IndicatorValue.objects.filter(
+        symbol=asset,
+        timeframe=timeframe,
+        indicator=indicator_name,
+        period=period,
+        timestamp__gte=start,
+        timestamp__lte=end
+    ).order_by('timestamp').values_list('timestamp', 'values')
+
+    decimals = get_indicator(indicator_name).outputs
+    return [
+        {
+            'timestamp': timestamp,
+            **{column: round(value, digits) for (column, digits), value in zip(decimals.items(), values)}
+        }
+        for timestamp, values in rows
+    ]
@@ -0,0 +1,121 @@
+import logging
+from celery import shared_task
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from asset.models import Asset
+from ohlc.utils.timeframes import TIMEFRAME_MODEL_MAP, open_candle_start
+from indicators.incremental import create
+from indicators.models import IndicatorState, IndicatorValue
+from indicators.store import tracked_indicators, is_materialized, value_row
+from indicators.screener import run_screen
+
+logger = logging.getLogger(__name__)
+
+VALUE_BATCH_SIZE = 5000
+
+
+def _write_values(values):
+    if values:
+        IndicatorValue.objects.bulk_create(
+            values,
+            update_conflicts=True,
+            update_fields=['values'],
+            unique_fields=['symbol', 'timeframe', 'indicator', 'period', 'timestamp']
+        )
+
+
+def _reset_states(states, rewritten_from):
+    """
+    Forget the state and stored values of the states that already fed a
+    candle at or after `rewritten_from`, so they start again from the first
+    candle. Returns how many were reset.
+    """
+    stale = [state for state in states if state.last_timestamp is not None and state.last_timestamp >= rewritten_from]
+    for state in stale:
+        IndicatorValue.objects.filter(
+            symbol=state.symbol_id, timeframe=state.timeframe, indicator=state.indicator, period=state.period
+        ).delete()
+        state.state = {}
+        state.value = None
+        state.last_timestamp = None
+    return len(stale)
+
+
+@shared_task
+def advance_indicator_states(symbol, timeframe, rewritten_from=None):
+    """
+    Feed the closed candles of a series that its tracked indicators have not
+    seen yet, write the outputs of materialised ones to IndicatorValue, then
+    save their state. A series without state starts from its first candle,
+    afterwards each run only reads the new candles.
+
+    `rewritten_from` (ISO timestamp) is the first candle of a backfill: states
+    that already fed it are reset and recomputed from the first candle.
+    """
+    asset = Asset.objects.get(symbol=symbol)
+    CandleModel = TIMEFRAME_MODEL_MAP[timeframe]
+
+    tracked = tracked_indicators(timeframe)
+
+    with transaction.atomic():
+        existing = set(IndicatorState.objects.filter(
+            symbol=asset, timeframe=timeframe
+        ).values_list('indicator', 'period'))
+        IndicatorState.objects.bulk_create([
+            IndicatorState(symbol=asset, timeframe=timeframe, indicator=indicator_name, period=period)
+            for indicator_name, period in tracked
+            if (indicator_name, period) not in existing
+        ], ignore_conflicts=True)
+
+        # Locked so two runs for the same series never feed a candle twice
+        states = [
+            state for state in IndicatorState.objects.select_for_update().filter(symbol=asset, timeframe=timeframe)
+            if (state.indicator, state.period) in tracked
+        ]
+        if not states:
+            return
+
+        reset = _reset_states(states, parse_datetime(rewritten_from)) if rewritten_from else 0
+
+        candles = CandleModel.objects.filter(symbol=asset, timestamp__lt=open_candle_start(timeframe))
+        last_timestamps = [state.last_timestamp for state in states]
+        if None not in last_timestamps:
+            candles = candles.filter(timestamp__gt=min(last_timestamps))
+
+        indicators = [create(state.indicator, state.period, state.state) for state in states]
+        materialized = [is_materialized(state.indicator, state.period, timeframe) for state in states]
+        values = []
+        fed = 0
+        rows = candles.order_by('timestamp').values_list('timestamp', 'open', 'high', 'low', 'close', 'volume')
+        for timestamp, *candle in rows.iterator(chunk_size=2000):
+            for state, indicator, store in zip(states, indicators, materialized):
+                if state.last_timestamp is not None and timestamp <= state.last_timestamp:
+                    continue
+                state.value = indicator.update(*candle)
+                state.last_timestamp = timestamp
+                if store and state.value is not None:
+                    values.append(value_row(asset, timeframe, state.indicator, state.period, timestamp, state.value))
+            fed += 1
+
+            if len(values) >= VALUE_BATCH_SIZE:
+                _write_values(values)
+                values = []
+
+        _write_values(values)
+        if not fed and not reset:
+            return
+
+        now = timezone.now()
+        for state, indicator in zip(states, indicators):
+            state.state = indicator.get_state()
+            state.updated_at = now
+        IndicatorState.objects.bulk_update(states, ['state', 'value', 'last_timestamp', 'updated_at'])
+
+    logger.info(f"Advanced {len(states)} indicators of {symbol} {timeframe} by {fed} candles, {reset} reset")
+
+
+@shared_task
+def run_screener(conditions, sort=None, descending=False, limit=None):
+    """Run a screen over all enabled assets, see indicators.screener.run_screen."""
+    return run_screen(conditions, sort=sort, descending=descending, limit=limit)
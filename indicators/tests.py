@@ -1,3 +1,277 @@
-from django.test import TestCase
+import json
+from datetime import datetime, timedelta
+from decimal import Decimal
+import numpy as np
+from unittest import skipUnless
+from django.test import SimpleTestCase, TestCase, override_settings
+from asset.models import Asset
+from ohlc.models import Candle1H
+from ohlc.utils.timeframes import TIMEFRAME_DELTA_MAP, TIMEFRAME_MODEL_MAP, open_candle_start
+from indicators import kernels, reference, utils
+from indicators.incremental import create
+from indicators.models import IndicatorState, IndicatorValue
+from indicators.registry import INDICATORS
+from indicators.screener import run_screen
+from indicators.tasks import advance_indicator_states
 
-# Create your tests here.
+PERIODS = (1, 2, 3, 14, 50)
+
+
+class ReferenceAgreementTests(SimpleTestCase):
+    """The vectorized library returns the reference records."""
+
+    def test_indicators_match_reference(self):
+        for n, seed in ((3, 1), (40, 2), (2000, 3)):
+            values = reference.synthetic_candles(n, seed)
+            candles = utils.to_arrays(values)
+            candles_data = reference.candles_data(values)
+
+            for name, indicator in INDICATORS.items():
+                for period in PERIODS:
+                    with self.subTest(indicator=name, period=period, candles=n):
+                        expected = getattr(reference, name)(candles_data, period=period)
+                        actual = indicator.to_records(list(range(n)), indicator.compute(candles, period))
+                        deviation = reference.max_deviation(expected, actual, indicator.outputs)
+                        self.assertIsNotNone(deviation, 'records do not line up with the reference')
+                        self.assertLessEqual(deviation, reference.TOLERANCE)
+
+
+class WarmupTests(SimpleTestCase):
+    """The registry warm-up is the index of the first value."""
+
+    def test_first_value_at_warmup(self):
+        candles = utils.to_arrays(reference.synthetic_candles(300, 4))
+        for name, indicator in INDICATORS.items():
+            for period in PERIODS:
+                with self.subTest(indicator=name, period=period):
+                    period = indicator.resolve_period(period)
+                    first_column = indicator.compute(candles, period)[indicator.columns[0]]
+                    self.assertEqual(np.flatnonzero(~np.isnan(first_column))[0], indicator.warmup(period))
+
+
+class KernelTests(SimpleTestCase):
+
+    @skipUnless(kernels.JIT_ENABLED, 'numba not installed or INDICATOR_JIT_ENABLED off')
+    def test_compiled_loops_match_python(self):
+        values = utils.to_arrays(reference.synthetic_candles(5000, 5))['close']
+        np.testing.assert_array_equal(
+            kernels.ema_series(values, 2 / 15, 30000.0), kernels._ema_python(values, 2 / 15, 30000.0)
+        )
+        np.testing.assert_array_equal(
+            kernels.wilder_series(values, 14, 30000.0), kernels._wilder_python(values, 14, 30000.0)
+        )
+
+
+class IncrementalTests(SimpleTestCase):
+    """Incremental indicators fed candle by candle match the batch output."""
+
+    def test_incremental_matches_batch(self):
+        values = reference.synthetic_candles(600, 6)
+        candles = utils.to_arrays(values)
+        rows = values.tolist()
+
+        for name, indicator in INDICATORS.items():
+            for period in (2, 14):
+                period = indicator.resolve_period(period)
+                batch = indicator.compute(candles, period)
+                state = create(name, period)
+                with self.subTest(indicator=name, period=period):
+                    for i, row in enumerate(rows):
+                        if i == len(rows) // 2:
+                            # Resume from a JSON round-tripped state
+                            state = create(name, period, json.loads(json.dumps(state.get_state())))
+                        output = state.update(*row)
+                        if np.isnan(batch[indicator.columns[0]][i]):
+                            self.assertIsNone(output)
+                            continue
+                        for column in indicator.columns:
+                            expected = batch[column][i]
+                            self.assertAlmostEqual(output[column], expected, delta=1e-9 * max(1, abs(expected)))
+
+
+@override_settings(INDICATOR_STATE_ENABLED=True, TRACKED_INDICATORS=['sma:3'])
+class MaterializedValueTests(TestCase):
+    """Materialised values follow the candles, backfills included."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.asset = Asset.objects.create(symbol='BTCUSDT')
+        cls.first = open_candle_start('1h') - timedelta(hours=10)
+        Candle1H.objects.bulk_create([
+            Candle1H(
+                symbol=cls.asset, timestamp=cls.first + timedelta(hours=i),
+                open=i + 1, high=i + 2, low=i, close=i + 1, volume=1
+            )
+            for i in range(10)
+        ])
+
+    def stored(self):
+        rows = IndicatorValue.objects.filter(symbol=self.asset, timeframe='1h', indicator='sma', period=3)
+        return {row.timestamp: row.values[0] for row in rows}
+
+    def recomputed(self):
+        """The values of a fresh state fed every candle."""
+        state = create('sma', 3)
+        outputs = {}
+        for timestamp, *candle in Candle1H.objects.filter(symbol=self.asset).order_by('timestamp').values_list(
+            'timestamp', 'open', 'high', 'low', 'close', 'volume'
+        ):
+            output = state.update(*map(float, candle))
+            if output is not None:
+                outputs[timestamp] = output['value']
+        return outputs
+
+    def assertValuesEqual(self, stored, expected):
+        self.assertEqual(stored.keys(), expected.keys())
+        for timestamp, value in expected.items():
+            self.assertAlmostEqual(stored[timestamp], value)
+
+    def test_values_written_on_close(self):
+        advance_indicator_states('BTCUSDT', '1h')
+        self.assertValuesEqual(self.stored(), self.recomputed())
+        self.assertEqual(
+            IndicatorState.objects.get(symbol=self.asset, indicator='sma').last_timestamp,
+            self.first + timedelta(hours=9)
+        )
+
+    def test_backfill_resets_states(self):
+        advance_indicator_states('BTCUSDT', '1h')
+        before = self.stored()
+        changed = self.first + timedelta(hours=1)
+        Candle1H.objects.filter(symbol=self.asset, timestamp=changed).update(close=32)
+
+        # A plain run does not revisit fed candles
+        advance_indicator_states('BTCUSDT', '1h')
+        self.assertEqual(self.stored(), before)
+
+        advance_indicator_states('BTCUSDT', '1h', changed.isoformat())
+        self.assertNotEqual(self.stored(), before)
+        self.assertValuesEqual(self.stored(), self.recomputed())
+
+
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def create_candles(asset, timeframe, values):
+    """Store (n, 5) OHLCV values as the latest closed candles of a series, the last one still open."""
+    delta = TIMEFRAME_DELTA_MAP[timeframe]
+    first = open_candle_start(timeframe) - delta * (len(values) - 1)
+    TIMEFRAME_MODEL_MAP[timeframe].objects.bulk_create([
+        TIMEFRAME_MODEL_MAP[timeframe](
+            symbol=asset, timestamp=first + delta * i,
+            **{field: Decimal(f'{value:.8f}') for field, value in zip(('open', 'high', 'low', 'close', 'volume'), row)}
+        )
+        for i, row in enumerate(values)
+    ])
+
+
+@override_settings(CACHES=LOCAL_CACHE, INDICATOR_STATE_ENABLED=False, HOT_WINDOW_ENABLED=False)
+class BatchIndicatorTests(TestCase):
+    """The batch endpoint returns the single endpoint values from one candle query."""
+
+    SPECS = 'rsi:14,macd,atr,bollinger_bands:20,stochastic,adx:7,cci,obv,vwap,ema:50,sma:0,sma:3'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.asset = Asset.objects.create(symbol='BTCUSDT')
+        create_candles(cls.asset, '1h', reference.synthetic_candles(300, 7))
+        cls.start = (open_candle_start('1h') - timedelta(hours=60)).isoformat()
+
+    def test_matches_single_endpoint(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/indicators/batch/', {
+                'symbol': 'BTCUSDT', 'start': self.start, 'timeframe': '1h', 'indicators': self.SPECS
+            })
+        batch = response.json()
+
+        for spec in self.SPECS.split(','):
+            name, _, period = spec.partition(':')
+            single = self.client.get('/api/indicators/', {
+                'symbol': 'BTCUSDT', 'start': self.start, 'timeframe': '1h', 'indicator': name, 'period': period or '-1'
+            }).json()
+            records = {record['timestamp']: record for record in single['result']}
+            columns = batch['indicators'][f"{name}:{single['period']}"]
+            with self.subTest(spec=spec):
+                for i, timestamp in enumerate(batch['timestamps']):
+                    for column, values in columns.items():
+                        self.assertEqual(values[i], records.get(timestamp, {}).get(column))
+
+    def test_unknown_indicator(self):
+        response = self.client.get('/api/indicators/batch/', {
+            'symbol': 'BTCUSDT', 'start': self.start, 'timeframe': '1h', 'indicators': 'foo'
+        })
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(CACHES=LOCAL_CACHE, INDICATOR_STATE_ENABLED=False, HOT_WINDOW_ENABLED=False)
+class ResampledIndicatorTests(TestCase):
+    """Indicators at a higher timeframe are computed on candles resampled from the base one."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.asset = Asset.objects.create(symbol='BTCUSDT')
+        values = reference.synthetic_candles(400, 8)
+        create_candles(cls.asset, '15m', values)
+        # The stored 1h candles aggregate the 15m ones, the last (open) hour partially
+        quarter = open_candle_start('15m').minute // 15
+        hours = [values[i:i + 4] for i in range((len(values) - 1 - quarter) % 4, len(values), 4)]
+        hourly = [
+            (hour[0, 0], hour[:, 1].max(), hour[:, 2].min(), hour[-1, 3], hour[:, 4].sum()) for hour in hours
+        ]
+        create_candles(cls.asset, '1h', np.round(hourly, 8))
+
+    def test_matches_stored_higher_timeframe(self):
+        start = open_candle_start('1h') - timedelta(hours=20)
+        batch = self.client.get('/api/indicators/batch/', {
+            'symbol': 'BTCUSDT', 'start': start.isoformat(), 'timeframe': '15m', 'indicators': 'sma:3@1h'
+        }).json()
+        single = self.client.get('/api/indicators/', {
+            'symbol': 'BTCUSDT', 'start': (start - timedelta(hours=2)).isoformat(), 'timeframe': '1h',
+            'indicator': 'sma', 'period': 3
+        }).json()
+        hourly = {record['timestamp']: record['value'] for record in single['result']}
+
+        values = batch['indicators']['sma:3@1h']['value']
+        for timestamp, value in zip(batch['timestamps'], values):
+            moment = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+            # A 15m candle sees the hour it completes, or else the previous one
+            hour = moment.replace(minute=0) - (timedelta(0) if moment.minute == 45 else timedelta(hours=1))
+            with self.subTest(timestamp=timestamp):
+                self.assertAlmostEqual(value, hourly[hour.isoformat().replace('+00:00', 'Z')], places=6)
+
+    def test_timeframe_not_a_multiple(self):
+        response = self.client.get('/api/indicators/batch/', {
+            'symbol': 'BTCUSDT', 'start': open_candle_start('1h').isoformat(), 'timeframe': '1h', 'indicators': 'rsi@90m'
+        })
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(SCREENER_BARS=100, SCREENER_CHUNK_SIZE=2)
+class ScreenerTests(TestCase):
+    """The screener matches the same symbols with and without the process pool."""
+
+    @classmethod
+    def setUpTestData(cls):
+        for seed in range(6):
+            asset = Asset.objects.create(symbol=f'S{seed}USDT')
+            for timeframe in ('1h', '4h'):
+                create_candles(asset, timeframe, reference.synthetic_candles(250, seed))
+
+    def test_pool_matches_sequential(self):
+        conditions = ['rsi:14@1h < 50', 'close@4h > ema:20@4h']
+        with override_settings(SCREENER_WORKERS=3):
+            pooled = run_screen(conditions)
+        with override_settings(SCREENER_WORKERS=1):
+            sequential = run_screen(conditions)
+        self.assertEqual(pooled, {**sequential, 'elapsed': pooled['elapsed']})
+        self.assertEqual(pooled['scanned'], 6)
+        for result in pooled['results']:
+            values = result['values']
+            self.assertLess(values['rsi:14@1h'], 50)
+            self.assertGreater(values['close@4h'], values['ema:20@4h'])
+
+    def test_invalid_conditions(self):
+        for conditions in ('foo@1h>0', 'rsi@2h>0'):
+            with self.subTest(conditions=conditions):
+                response = self.client.get('/api/indicators/screener/', {'conditions': conditions})
+                self.assertEqual(response.status_code, 400)
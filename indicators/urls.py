@@ -5,4 +5,6 @@ app_name = 'indicators'
 
 urlpatterns = [
     path('', views.calculate_indicator, name='calculate_indicator'),
+    path('batch/', views.calculate_indicators_batch, name='calculate_indicators_batch'),
+    path('screener/', views.screener, name='screener'),
 ]
\ No newline at end of file
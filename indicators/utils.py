@@ -1,511 +1,488 @@
 """
 Popular technical indicator calculation functions.
-Each function accepts candles_data (list of dicts) and optional parameters.
+
+Each function accepts `candles`, a dict of float64 NumPy arrays keyed by
+'open', 'high', 'low', 'close' and 'volume', plus optional parameters.
+It returns a dict of output columns, each a float64 array aligned with the
+input candles and NaN where the indicator has no value, or {'error': ...}
+when there is not enough data. Defaults, output columns and warm-up of each
+indicator are declared in indicators.registry.
 """
+import numpy as np
+from indicators import kernels
+
+
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+# Windows per chunk for the rolling kernels, keeps cumulative sums local
+ROLLING_CHUNK = 4096
+
+
+def to_arrays(values):
+    """
+    Build the candles dict from an (n, 5) array-like of open, high, low, close, volume.
+    """
+    values = np.asarray(values, dtype=np.float64).reshape(-1, len(FIELDS))
+    return {field: np.ascontiguousarray(values[:, i]) for i, field in enumerate(FIELDS)}
 
 
-def sma(candles_data, period=14):
+def _empty(n):
+    return np.full(n, np.nan)
+
+
+def _seed(values, period):
+    """Plain average of the first `period` values, summed left to right."""
+    return sum(values[:period].tolist()) / period
+
+
+def _rolling_sums(x, period):
+    """
+    Sum of every `period` window of x, indexed by the window end.
+    Cumulative sums are taken chunk by chunk around a local anchor so
+    rounding error does not grow with len(x).
+    """
+    n = len(x)
+    sums = _empty(n)
+
+    for start in range(period - 1, n, ROLLING_CHUNK):
+        stop = min(start + ROLLING_CHUNK, n)
+        segment = x[start - period + 1:stop]
+        anchor = segment[0]
+        csum = np.concatenate(([0.0], np.cumsum(segment - anchor)))
+        sums[start:stop] = csum[period:] - csum[:-period] + period * anchor
+
+    return sums
+
+
+def _rolling_mean(x, period):
+    return _rolling_sums(x, period) / period
+
+
+def _window_sums(windows, transform=None):
+    """
+    Left-to-right sum of each row of a (windows, period) view, vectorized
+    across windows. Matches a plain Python sum() of every window exactly,
+    which keeps zero deviations exactly zero on flat windows.
+    """
+    total = (windows[:, 0] if transform is None else transform(windows[:, 0])).copy()
+    for j in range(1, windows.shape[1]):
+        total += windows[:, j] if transform is None else transform(windows[:, j])
+    return total
+
+
+def _rolling_max(x, period):
+    """
+    Max of every `period` window indexed by the window end, using the
+    van Herk/Gil-Werman block prefix/suffix maxima (O(n), exact).
+    """
+    n = len(x)
+    out = _empty(n)
+    if n < period:
+        return out
+
+    blocks = -(-n // period)
+    padded = np.full(blocks * period, -np.inf)
+    padded[:n] = x
+    padded = padded.reshape(blocks, period)
+    prefix = np.maximum.accumulate(padded, axis=1).ravel()
+    suffix = np.maximum.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+
+    starts = np.arange(n - period + 1)
+    out[period - 1:] = np.maximum(suffix[starts], prefix[starts + period - 1])
+    return out
+
+
+def _rolling_min(x, period):
+    return -_rolling_max(-x, period)
+
+
+def _ema_series(values, multiplier, seed):
+    """Apply the EMA update to each value in turn, starting from `seed`."""
+    return kernels.ema_series(values, multiplier, seed)
+
+
+def _wilder(values, period):
+    """
+    Wilder smoothing: the first average of `period` values sits at index
+    period - 1, each later index folds in its own value.
+    """
+    if len(values) < period:
+        return _empty(len(values))
+    return kernels.wilder_series(values, period, _seed(values, period))
+
+
+def _true_range(high, low, close):
+    """True range of each candle from the second one on (length n - 1)."""
+    prev_close = close[:-1]
+    return np.maximum.reduce([
+        high[1:] - low[1:],
+        np.abs(high[1:] - prev_close),
+        np.abs(low[1:] - prev_close),
+    ])
+
+
+def sma(candles, period=14):
     """
     Simple Moving Average
-    
+
     Args:
-        candles_data: List of candle dicts with 'close' field
+        candles: Dict of float64 arrays with 'close'
         period: Number of periods for the average
-    
+
     Returns:
-        List of SMA values
+        {'value': SMA array}
     """
-    if len(candles_data) < period:
+    closes = candles['close']
+    if len(closes) < period:
         return {'error': f'Insufficient data. Need at least {period} candles'}
-    
-    sma_values = []
-    closes = [float(candle['close']) for candle in candles_data]
-    
-    for i in range(period, len(closes)):
-        sma = sum(closes[i - period + 1:i + 1]) / period
-        sma_values.append({
-            'timestamp': candles_data[i]['timestamp'],
-            'value': round(sma, 8)
-        })
-    
-    return sma_values
-
-
-def ema(candles_data, period=14):
+
+    value = _rolling_mean(closes, period)
+    value[:period] = np.nan
+    return {'value': value}
+
+
+def ema(candles, period=14):
     """
     Exponential Moving Average
-    
+
     Args:
-        candles_data: List of candle dicts with 'close' field
+        candles: Dict of float64 arrays with 'close'
         period: Number of periods for the average
-    
+
     Returns:
-        List of EMA values
+        {'value': EMA array}
     """
-    if len(candles_data) < period:
+    closes = candles['close']
+    if len(closes) < period:
         return {'error': f'Insufficient data. Need at least {period} candles'}
-    
-    closes = [float(candle['close']) for candle in candles_data]
+
     multiplier = 2 / (period + 1)
-    
-    # Calculate initial SMA
-    ema_value = sum(closes[:period]) / period
-    ema_values = [{
-        'timestamp': candles_data[period - 1]['timestamp'],
-        'value': round(ema_value, 8)
-    }]
-    
-    # Calculate EMA for remaining values
-    for i in range(period, len(closes)):
-        ema_value = (closes[i] - ema_value) * multiplier + ema_value
-        ema_values.append({
-            'timestamp': candles_data[i]['timestamp'],
-            'value': round(ema_value, 8)
-        })
-    
-    return ema_values[1:]  # Exclude the first EMA which is just the SMA
-
-
-def rsi(candles_data, period=14):
+
+    # Seeded with the SMA of the first period, which is not reported itself
+    value = _empty(len(closes))
+    value[period:] = _ema_series(closes[period:], multiplier, _seed(closes, period))
+    return {'value': value}
+
+
+def rsi(candles, period=14):
     """
     Relative Strength Index
-    
+
     Args:
-        candles_data: List of candle dicts with 'close' field
+        candles: Dict of float64 arrays with 'close'
         period: Number of periods for RSI calculation
-    
+
     Returns:
-        List of RSI values (0-100)
+        {'value': RSI array (0-100)}
     """
-    if len(candles_data) < period + 1:
+    closes = candles['close']
+    n = len(closes)
+    if n < period + 1:
         return {'error': f'Insufficient data. Need at least {period + 1} candles'}
-    
-    closes = [float(candle['close']) for candle in candles_data]
-    
-    # Calculate price changes
-    deltas = [closes[i] - closes[i - 1] for i in range(1, len(closes))]
-    
-    gains = [delta if delta > 0 else 0 for delta in deltas]
-    losses = [-delta if delta < 0 else 0 for delta in deltas]
-    
-    # Calculate initial averages
-    avg_gain = sum(gains[:period]) / period
-    avg_loss = sum(losses[:period]) / period
-    
-    rsi_values = []
-    
-    for i in range(period, len(deltas)):
-        if avg_loss == 0:
-            rsi = 100
-        else:
-            rs = avg_gain / avg_loss
-            rsi = 100 - (100 / (1 + rs))
-        
-        rsi_values.append({
-            'timestamp': candles_data[i + 1]['timestamp'],
-            'value': round(rsi, 2)
-        })
-        
-        # Update averages
-        avg_gain = (avg_gain * (period - 1) + gains[i]) / period
-        avg_loss = (avg_loss * (period - 1) + losses[i]) / period
-    
-    return rsi_values
-
-
-def macd(candles_data, period=12):
+
+    deltas = np.diff(closes)
+    gains = np.where(deltas > 0, deltas, 0.0)
+    losses = np.where(deltas < 0, -deltas, 0.0)
+
+    # RSI at candle i uses the averages of the changes before it
+    avg_gain = _wilder(gains, period)[period - 1:n - 2]
+    avg_loss = _wilder(losses, period)[period - 1:n - 2]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        values = np.where(avg_loss == 0, 100.0, 100 - (100 / (1 + rs)))
+
+    value = _empty(n)
+    value[period + 1:] = values
+    return {'value': value}
+
+
+def macd(candles, period=12):
     """
     MACD (Moving Average Convergence Divergence)
     Uses fast=12, slow=26, signal=9 by default
-    
+
     Args:
-        candles_data: List of candle dicts with 'close' field
+        candles: Dict of float64 arrays with 'close'
         period: Not used, kept for consistency (uses standard 12/26/9)
-    
+
     Returns:
-        List of dicts with macd, signal, and histogram values
+        {'macd': ..., 'signal': ..., 'histogram': ...} arrays
     """
     fast_period = 12
     slow_period = 26
     signal_period = 9
-    
-    if len(candles_data) < slow_period + signal_period:
+
+    closes = candles['close']
+    n = len(closes)
+    if n < slow_period + signal_period:
         return {'error': f'Insufficient data. Need at least {slow_period + signal_period} candles'}
-    
-    closes = [float(candle['close']) for candle in candles_data]
-    
-    # Calculate fast EMA (12-period)
+
+    # Each EMA starts from its SMA seed, then folds in closes after the seed candle
     fast_multiplier = 2 / (fast_period + 1)
-    fast_ema = sum(closes[:fast_period]) / fast_period
-    fast_emas = []
-    
-    for i in range(len(closes)):
-        if i < fast_period:
-            continue
-        elif i == fast_period:
-            fast_emas.append(fast_ema)
-        else:
-            fast_ema = (closes[i] - fast_ema) * fast_multiplier + fast_ema
-            fast_emas.append(fast_ema)
-    
-    # Calculate slow EMA (26-period)
+    fast_emas = np.concatenate((
+        [_seed(closes, fast_period)],
+        _ema_series(closes[fast_period + 1:], fast_multiplier, _seed(closes, fast_period))
+    ))
+
     slow_multiplier = 2 / (slow_period + 1)
-    slow_ema = sum(closes[:slow_period]) / slow_period
-    slow_emas = []
-    
-    for i in range(len(closes)):
-        if i < slow_period:
-            continue
-        elif i == slow_period:
-            slow_emas.append(slow_ema)
-        else:
-            slow_ema = (closes[i] - slow_ema) * slow_multiplier + slow_ema
-            slow_emas.append(slow_ema)
-    
-    # Calculate MACD line (fast EMA - slow EMA)
-    macd_line = []
-    for i in range(len(slow_emas)):
-        macd_val = fast_emas[i] - slow_emas[i]
-        macd_line.append(macd_val)
-    
-    if len(macd_line) < signal_period:
-        return {'error': f'Insufficient data after EMA calculation'}
-    
-    # Calculate signal line (9-period EMA of MACD)
+    slow_emas = np.concatenate((
+        [_seed(closes, slow_period)],
+        _ema_series(closes[slow_period + 1:], slow_multiplier, _seed(closes, slow_period))
+    ))
+
+    # MACD line (fast EMA - slow EMA), paired by position in each series
+    macd_line = fast_emas[:len(slow_emas)] - slow_emas
+
+    # Signal line (9-period EMA of MACD)
     signal_multiplier = 2 / (signal_period + 1)
-    signal_ema = sum(macd_line[:signal_period]) / signal_period
-    
-    macd_values = []
-    
-    for i in range(signal_period - 1, len(macd_line)):
-        if i == signal_period - 1:
-            signal_val = signal_ema
-        else:
-            signal_ema = (macd_line[i] - signal_ema) * signal_multiplier + signal_ema
-            signal_val = signal_ema
-        
-        histogram = macd_line[i] - signal_val
-        
-        # Calculate the correct timestamp index
-        timestamp_idx = slow_period + i
-        
-        macd_values.append({
-            'timestamp': candles_data[timestamp_idx]['timestamp'],
-            'macd': round(macd_line[i], 8),
-            'signal': round(signal_val, 8),
-            'histogram': round(histogram, 8)
-        })
-    
-    return macd_values
-
-
-def bollinger_bands(candles_data, period=20):
+    signal_seed = _seed(macd_line, signal_period)
+    signal = np.concatenate((
+        [signal_seed],
+        _ema_series(macd_line[signal_period:], signal_multiplier, signal_seed)
+    ))
+
+    macd_values = macd_line[signal_period - 1:]
+    first = slow_period + signal_period - 1
+
+    result = {'macd': _empty(n), 'signal': _empty(n), 'histogram': _empty(n)}
+    result['macd'][first:] = macd_values
+    result['signal'][first:] = signal
+    result['histogram'][first:] = macd_values - signal
+    return result
+
+
+def bollinger_bands(candles, period=20):
     """
     Bollinger Bands (uses 2 standard deviations)
-    
+
     Args:
-        candles_data: List of candle dicts with 'close' field
+        candles: Dict of float64 arrays with 'close'
         period: Number of periods for the moving average
-    
+
     Returns:
-        List of dicts with upper, middle, and lower band values
+        {'upper': ..., 'middle': ..., 'lower': ...} arrays
     """
-    if len(candles_data) < period:
+    closes = candles['close']
+    if len(closes) < period:
         return {'error': f'Insufficient data. Need at least {period} candles'}
-    
-    closes = [float(candle['close']) for candle in candles_data]
-    bb_values = []
+
     std_dev = 2
-    
-    for i in range(period, len(closes)):
-        window = closes[i - period + 1:i + 1]
-        sma = sum(window) / period
-        
-        # Calculate standard deviation
-        variance = sum((x - sma) ** 2 for x in window) / period
-        std = variance ** 0.5
-        
-        bb_values.append({
-            'timestamp': candles_data[i]['timestamp'],
-            'upper': round(sma + (std_dev * std), 8),
-            'middle': round(sma, 8),
-            'lower': round(sma - (std_dev * std), 8)
-        })
-    
-    return bb_values
-
-
-def stochastic(candles_data, period=14):
+    n = len(closes)
+
+    # Two-pass variance on window views; the running sum-of-squares form
+    # loses the digits of small variances on large prices
+    windows = np.lib.stride_tricks.sliding_window_view(closes, period)
+    window_mean = _window_sums(windows) / period
+    variance = _window_sums(windows, lambda column: (column - window_mean) ** 2) / period
+    std = variance ** 0.5
+
+    middle = _empty(n)
+    middle[period - 1:] = window_mean
+    deviation = _empty(n)
+    deviation[period - 1:] = std_dev * std
+
+    result = {
+        'upper': middle + deviation,
+        'middle': middle,
+        'lower': middle - deviation,
+    }
+    for column in result.values():
+        column[:period] = np.nan
+    return result
+
+
+def stochastic(candles, period=14):
     """
     Stochastic Oscillator (%K and %D)
-    
+
     Args:
-        candles_data: List of candle dicts with 'high', 'low', 'close' fields
+        candles: Dict of float64 arrays with 'high', 'low', 'close'
         period: Number of periods (default 14)
-    
+
     Returns:
-        List of dicts with %K and %D values
+        {'k': ..., 'd': ...} arrays
     """
-    if len(candles_data) < period + 3:
+    closes = candles['close']
+    n = len(closes)
+    if n < period + 3:
         return {'error': f'Insufficient data. Need at least {period + 3} candles'}
-    
-    stoch_values = []
-    k_values = []
-    
-    for i in range(period, len(candles_data)):
-        window = candles_data[i - period + 1:i + 1]
-        
-        highest_high = max(float(candle['high']) for candle in window)
-        lowest_low = min(float(candle['low']) for candle in window)
-        current_close = float(candles_data[i]['close'])
-        
-        if highest_high == lowest_low:
-            k = 50
-        else:
-            k = ((current_close - lowest_low) / (highest_high - lowest_low)) * 100
-        
-        k_values.append(k)
-        
-        # Calculate %D (3-period SMA of %K)
-        if len(k_values) >= 3:
-            d = sum(k_values[-3:]) / 3
-            stoch_values.append({
-                'timestamp': candles_data[i]['timestamp'],
-                'k': round(k, 2),
-                'd': round(d, 2)
-            })
-    
-    return stoch_values
-
-
-def atr(candles_data, period=14):
+
+    highest_high = _rolling_max(candles['high'], period)
+    lowest_low = _rolling_min(candles['low'], period)
+    price_range = highest_high - lowest_low
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k = np.where(price_range == 0, 50.0, ((closes - lowest_low) / price_range) * 100)
+    k[:period] = np.nan
+
+    # %D is the 3-period SMA of %K
+    d = _empty(n)
+    d[period + 2:] = (k[period:-2] + k[period + 1:-1] + k[period + 2:]) / 3
+    k[:period + 2] = np.nan
+    return {'k': k, 'd': d}
+
+
+def atr(candles, period=14):
     """
     Average True Range
-    
+
     Args:
-        candles_data: List of candle dicts with 'high', 'low', 'close' fields
+        candles: Dict of float64 arrays with 'high', 'low', 'close'
         period: Number of periods
-    
+
     Returns:
-        List of ATR values
+        {'value': ATR array}
     """
-    if len(candles_data) < period + 1:
+    closes = candles['close']
+    n = len(closes)
+    if n < period + 1:
         return {'error': f'Insufficient data. Need at least {period + 1} candles'}
-    
-    true_ranges = []
-    
-    for i in range(1, len(candles_data)):
-        high = float(candles_data[i]['high'])
-        low = float(candles_data[i]['low'])
-        prev_close = float(candles_data[i - 1]['close'])
-        
-        tr = max(
-            high - low,
-            abs(high - prev_close),
-            abs(low - prev_close)
-        )
-        true_ranges.append(tr)
-    
-    # Calculate initial ATR (simple average)
-    atr_value = sum(true_ranges[:period]) / period
-    atr_values = [{
-        'timestamp': candles_data[period]['timestamp'],
-        'value': round(atr_value, 8)
-    }]
-    
-    # Calculate smoothed ATR
-    for i in range(period, len(true_ranges)):
-        atr_value = (atr_value * (period - 1) + true_ranges[i]) / period
-        atr_values.append({
-            'timestamp': candles_data[i + 1]['timestamp'],
-            'value': round(atr_value, 8)
-        })
-    
-    return atr_values
-
-
-def obv(candles_data, period=1):
+
+    true_ranges = _true_range(candles['high'], candles['low'], closes)
+
+    value = _empty(n)
+    value[1:] = _wilder(true_ranges, period)
+    return {'value': value}
+
+
+def obv(candles, period=1):
     """
     On-Balance Volume
-    
+
     Args:
-        candles_data: List of candle dicts with 'close' and 'volume' fields
-        period: Not used, kept for consistency
-    
+        candles: Dict of float64 arrays with 'close' and 'volume'
+        period: Index of the first candle to accumulate from
+
     Returns:
-        List of OBV values
+        {'value': OBV array}
     """
-    if len(candles_data) < 2:
+    closes = candles['close']
+    volumes = candles['volume']
+    n = len(closes)
+    if n < 2:
         return {'error': 'Insufficient data. Need at least 2 candles'}
-    
-    obv_value = 0
-    obv_values = []
-    
-    for i in range(period, len(candles_data)):
-        if i == 0:
-            obv_value = float(candles_data[i]['volume'])
-        else:
-            current_close = float(candles_data[i]['close'])
-            prev_close = float(candles_data[i - 1]['close'])
-            volume = float(candles_data[i]['volume'])
-            
-            if current_close > prev_close:
-                obv_value += volume
-            elif current_close < prev_close:
-                obv_value -= volume
-        
-        obv_values.append({
-            'timestamp': candles_data[i]['timestamp'],
-            'value': round(obv_value, 2)
-        })
-    
-    return obv_values
-
-
-def adx(candles_data, period=14):
+
+    period = max(period, 0)
+    changes = np.zeros(n)
+    changes[0] = volumes[0]
+    changes[1:] = np.where(
+        closes[1:] > closes[:-1], volumes[1:],
+        np.where(closes[1:] < closes[:-1], -volumes[1:], 0.0)
+    )
+
+    value = _empty(n)
+    value[period:] = np.cumsum(changes[period:])
+    return {'value': value}
+
+
+def adx(candles, period=14):
     """
     Average Directional Index
-    
+
     Args:
-        candles_data: List of candle dicts with 'high', 'low', 'close' fields
+        candles: Dict of float64 arrays with 'high', 'low', 'close'
         period: Number of periods
-    
+
     Returns:
-        List of dicts with ADX, +DI, and -DI values
+        {'adx': ..., 'plus_di': ..., 'minus_di': ...} arrays
     """
-    if len(candles_data) < period * 2:
+    high = candles['high']
+    low = candles['low']
+    n = len(high)
+    if n < period * 2:
         return {'error': f'Insufficient data. Need at least {period * 2} candles'}
-    
-    # Calculate True Range and Directional Movement
-    tr_list = []
-    plus_dm_list = []
-    minus_dm_list = []
-    
-    for i in range(1, len(candles_data)):
-        high = float(candles_data[i]['high'])
-        low = float(candles_data[i]['low'])
-        prev_high = float(candles_data[i - 1]['high'])
-        prev_low = float(candles_data[i - 1]['low'])
-        prev_close = float(candles_data[i - 1]['close'])
-        
-        tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
-        tr_list.append(tr)
-        
-        plus_dm = high - prev_high if high - prev_high > prev_low - low and high - prev_high > 0 else 0
-        minus_dm = prev_low - low if prev_low - low > high - prev_high and prev_low - low > 0 else 0
-        
-        plus_dm_list.append(plus_dm)
-        minus_dm_list.append(minus_dm)
-    
-    # Calculate smoothed values
-    atr_value = sum(tr_list[:period]) / period
-    plus_di_value = sum(plus_dm_list[:period]) / period
-    minus_di_value = sum(minus_dm_list[:period]) / period
-    
-    adx_values = []
-    dx_values = []
-    
-    for i in range(period, len(tr_list)):
-        atr_value = (atr_value * (period - 1) + tr_list[i]) / period
-        plus_di_value = (plus_di_value * (period - 1) + plus_dm_list[i]) / period
-        minus_di_value = (minus_di_value * (period - 1) + minus_dm_list[i]) / period
-        
-        plus_di = (plus_di_value / atr_value) * 100 if atr_value != 0 else 0
-        minus_di = (minus_di_value / atr_value) * 100 if atr_value != 0 else 0
-        
-        dx = (abs(plus_di - minus_di) / (plus_di + minus_di)) * 100 if (plus_di + minus_di) != 0 else 0
-        dx_values.append(dx)
-        
-        if len(dx_values) >= period:
-            adx = sum(dx_values[-period:]) / period
-            adx_values.append({
-                'timestamp': candles_data[i + 1]['timestamp'],
-                'adx': round(adx, 2),
-                'plus_di': round(plus_di, 2),
-                'minus_di': round(minus_di, 2)
-            })
-    
-    return adx_values
-
-
-def cci(candles_data, period=20):
+
+    # True Range and Directional Movement, one entry per candle from the second on
+    true_ranges = _true_range(high, low, candles['close'])
+    up_move = high[1:] - high[:-1]
+    down_move = low[:-1] - low[1:]
+    plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+    minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+
+    atr_value = _wilder(true_ranges, period)[period:]
+    plus_di_value = _wilder(plus_dm, period)[period:]
+    minus_di_value = _wilder(minus_dm, period)[period:]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plus_di = np.where(atr_value != 0, (plus_di_value / atr_value) * 100, 0.0)
+        minus_di = np.where(atr_value != 0, (minus_di_value / atr_value) * 100, 0.0)
+        di_sum = plus_di + minus_di
+        dx = np.where(di_sum != 0, (np.abs(plus_di - minus_di) / di_sum) * 100, 0.0)
+
+    # ADX is the plain average of the last `period` DX values
+    adx_values = _rolling_mean(dx, period)
+
+    # dx[j] belongs to candle j + period + 1
+    result = {'adx': _empty(n), 'plus_di': _empty(n), 'minus_di': _empty(n)}
+    first = 2 * period
+    result['adx'][first:] = adx_values[period - 1:]
+    result['plus_di'][first:] = plus_di[period - 1:]
+    result['minus_di'][first:] = minus_di[period - 1:]
+    return result
+
+
+def cci(candles, period=20):
     """
     Commodity Channel Index
-    
+
     Args:
-        candles_data: List of candle dicts with 'high', 'low', 'close' fields
+        candles: Dict of float64 arrays with 'high', 'low', 'close'
         period: Number of periods
-    
+
     Returns:
-        List of CCI values
+        {'value': CCI array}
     """
-    if len(candles_data) < period:
+    closes = candles['close']
+    n = len(closes)
+    if n < period:
         return {'error': f'Insufficient data. Need at least {period} candles'}
-    
-    cci_values = []
-    
-    for i in range(period, len(candles_data)):
-        window = candles_data[i - period + 1:i + 1]
-        
-        # Calculate Typical Price
-        typical_prices = [
-            (float(c['high']) + float(c['low']) + float(c['close'])) / 3
-            for c in window
-        ]
-        
-        sma_tp = sum(typical_prices) / period
-        current_tp = typical_prices[-1]
-        
-        # Calculate Mean Deviation
-        mean_deviation = sum(abs(tp - sma_tp) for tp in typical_prices) / period
-        
-        if mean_deviation == 0:
-            cci = 0
-        else:
-            cci = (current_tp - sma_tp) / (0.015 * mean_deviation)
-        
-        cci_values.append({
-            'timestamp': candles_data[i]['timestamp'],
-            'value': round(cci, 2)
-        })
-    
-    return cci_values
-
-
-def vwap(candles_data, period=1):
+
+    typical_prices = (candles['high'] + candles['low'] + closes) / 3
+
+    # Mean deviation around each window's own mean has no running form,
+    # it is summed column by column over window views instead
+    windows = np.lib.stride_tricks.sliding_window_view(typical_prices, period)
+    window_mean = _window_sums(windows) / period
+    mean_deviation = _window_sums(windows, lambda column: np.abs(column - window_mean)) / period
+
+    current_tp = typical_prices[period - 1:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = np.where(mean_deviation == 0, 0.0, (current_tp - window_mean) / (0.015 * mean_deviation))
+
+    value = _empty(n)
+    value[period - 1:] = values
+    value[:period] = np.nan
+    return {'value': value}
+
+
+def vwap(candles, period=1):
     """
     Volume Weighted Average Price
     Calculates cumulative VWAP from the start of the data
-    
+
     Args:
-        candles_data: List of candle dicts with 'high', 'low', 'close', 'volume' fields
-        period: Not used, kept for consistency
-    
+        candles: Dict of float64 arrays with 'high', 'low', 'close', 'volume'
+        period: Index of the first candle to accumulate from
+
     Returns:
-        List of VWAP values
+        {'value': VWAP array}
     """
-    if len(candles_data) < 1:
+    closes = candles['close']
+    n = len(closes)
+    if n < 1:
         return {'error': 'Insufficient data. Need at least 1 candle'}
-    
-    cumulative_tp_volume = 0
-    cumulative_volume = 0
-    vwap_values = []
-    
-    for candle in candles_data[period:]:
-        typical_price = (float(candle['high']) + float(candle['low']) + float(candle['close'])) / 3
-        volume = float(candle['volume'])
-        
-        cumulative_tp_volume += typical_price * volume
-        cumulative_volume += volume
-        
-        if cumulative_volume == 0:
-            vwap = typical_price
-        else:
-            vwap = cumulative_tp_volume / cumulative_volume
-        
-        vwap_values.append({
-            'timestamp': candle['timestamp'],
-            'value': round(vwap, 8)
-        })
-    
-    return vwap_values
\ No newline at end of file
+
+    period = max(period, 0)
+    typical_prices = ((candles['high'] + candles['low'] + closes) / 3)[period:]
+    volumes = candles['volume'][period:]
+
+    cumulative_tp_volume = np.cumsum(typical_prices * volumes)
+    cumulative_volume = np.cumsum(volumes)
+
+    value = _empty(n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value[period:] = np.where(
+            cumulative_volume == 0, typical_prices, cumulative_tp_volume / cumulative_volume
+        )
+    return {'value': value}
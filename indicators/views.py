@@ -1,42 +1,53 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from django.utils.dateparse import parse_datetime
 from django.utils import timezone
-from datetime import timedelta
+from django.db.models import DateTimeField, Subquery, Value
+from django.db.models.functions import Coalesce
+from datetime import datetime, timezone as dt_timezone
 from asset.models import Asset
-from ohlc.models import Candle15M, Candle1H, Candle4H, Candle1D
-from indicators import utils
-import inspect
-
-
-TIMEFRAME_MODEL_MAP = {
-    '15m': Candle15M,
-    '1h': Candle1H,
-    '4h': Candle4H,
-    '1d': Candle1D,
-}
-
-TIMEFRAME_DELTA_MAP = {
-    '15m': timedelta(minutes=15),
-    '1h': timedelta(hours=1),
-    '4h': timedelta(hours=4),
-    '1d': timedelta(days=1),
-}
-
-INDICATOR_DEFAULTS = {
-    'sma': 14,
-    'ema': 14,
-    'rsi': 14,
-    'macd': 34,           # Special: needs 26 + 9 - 1
-    'bollinger_bands': 20,
-    'stochastic': 14,  # Special: needs %K period + %D period - 1
-    'atr': 14,
-    'obv': 1,
-    'adx': 14,
-    'cci': 20,
-    'vwap': 1,
-}
+from ohlc.utils.timeframes import TIMEFRAME_MODEL_MAP, TIMEFRAME_DELTA_MAP, parse_timestamp, timeframe_delta
+from ohlc.utils.cache import make_cache_key, get_or_compute
+from ohlc.utils.hot_window import get_range
+from indicators import utils, store
+from indicators.registry import get_indicator
+from indicators.resample import resample, align_index, align
+from indicators.screener import run_screen, parse_conditions, parse_operand, ScreenerError
+from indicators.tasks import run_screener
+from celery.result import AsyncResult
+import numpy as np
+
+def _load_candles(symbol, timeframe, start, end, lookback=0):
+    """
+    Candles of a series between start and end (inclusive), plus the
+    `lookback` candles before start, as a list of timestamps and an (n, 5)
+    sequence of open, high, low, close, volume. Served from the hot window
+    when it covers the range, else one query.
+    """
+    window = get_range(symbol, timeframe, start, end, lookback)
+    if window is not None:
+        timestamps = [datetime.fromtimestamp(ts, tz=dt_timezone.utc) for ts in window[0].tolist()]
+        return timestamps, window[1]
+
+    candles = TIMEFRAME_MODEL_MAP[timeframe].objects.filter(symbol__symbol=symbol)
+    first = start
+    if lookback:
+        # Timestamp of the lookback-th candle before start (ORDER BY timestamp
+        # DESC LIMIT 1 OFFSET lookback-1), or the first candle of a shorter history
+        before = candles.filter(timestamp__lt=start)
+        first = Coalesce(
+            Subquery(before.order_by('-timestamp').values('timestamp')[lookback - 1:lookback]),
+            Subquery(before.order_by('timestamp').values('timestamp')[:1]),
+            Value(start, output_field=DateTimeField())
+        )
+
+    rows = list(candles.filter(
+        timestamp__gte=first,
+        timestamp__lte=end
+    ).order_by('timestamp').values_list(
+        'timestamp', 'open', 'high', 'low', 'close', 'volume'
+    ))
+    return [row[0] for row in rows], [row[1:] for row in rows]
 
 
 @api_view(['GET'])
@@ -51,6 +62,9 @@ def calculate_indicator(request):
     - indicator: Indicator name (required)
     - timeframe: Timeframe - 15m, 1h, 4h, or 1d (required)
     - period: Number used in indicator calculation (optional, default varies by indicator)
+
+    Indicators registered in TRACKED_INDICATORS are read from the precomputed
+    IndicatorValue table, others are computed from candles.
     """
     
     # Get and validate query parameters
@@ -77,13 +91,13 @@ def calculate_indicator(request):
     
     # Parse timestamps
     try:
-        start_dt = parse_datetime(start)
+        start_dt = parse_timestamp(start)
         if not start_dt:
             raise ValueError("Invalid start datetime format")
         
         # If end not provided, use current time
         if end:
-            end_dt = parse_datetime(end)
+            end_dt = parse_timestamp(end)
             if not end_dt:
                 raise ValueError("Invalid end datetime format")
         else:
@@ -95,99 +109,290 @@ def calculate_indicator(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Get period value for calculating lookback
+    # Check the indicator is one of the library's indicators
+    indicator = get_indicator(indicator_name)
+    if indicator is None:
+        return Response(
+            {'error': f'No indicator with name: {indicator_name}'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
     try:
-        period_int = int(period) if period != '-1' else int(INDICATOR_DEFAULTS.get(indicator_name, 14))  # default period
+        period_int = indicator.resolve_period(period)
     except ValueError:
         return Response(
             {'error': 'Period must be a valid integer'},
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    if indicator_name == 'macd':
-        # MACD needs a longer lookback: 26 + 9 - 1 = 34
-        period_int = max(period_int, 34)
-    
-    # Calculate adjusted start time (period units before start)
-    timeframe_delta = TIMEFRAME_DELTA_MAP[timeframe]
-    adjusted_start = start_dt - (timeframe_delta * period_int)
-
-    if indicator_name == 'stochastic':
-        # Stochastic needs an additional period for %D
-        adjusted_start -= timeframe_delta * (3 - 1)  # assuming %D period is 3
-    elif indicator_name == 'adx':
-        # ADX needs double the period
-        adjusted_start -= timeframe_delta * (period_int) # additional period
-    
+    # Candles needed before start for the indicator to have a value at start
+    lookback = indicator.warmup(period_int)
+
     # Calculate adjusted end time (one unit before end)
-    adjusted_end = end_dt - timeframe_delta
-    
-    # Check if indicator function exists in utils
-    if not hasattr(utils, indicator_name):
-        return Response(
-            {'error': f'No indicator with name: {indicator_name}'},
-            status=status.HTTP_404_NOT_FOUND
-        )
-    
-    indicator_func = getattr(utils, indicator_name)
-    
-    # Verify it's actually a function
-    if not callable(indicator_func):
+    adjusted_end = end_dt - TIMEFRAME_DELTA_MAP[timeframe]
+
+    # Registered (indicator, period, timeframe) combinations are precomputed
+    materialized = store.is_materialized(indicator_name, period_int, timeframe)
+
+    def compute():
+        # Get the asset
+        try:
+            asset = Asset.objects.get(symbol=symbol)
+        except Asset.DoesNotExist:
+            return {
+                'error': f'Asset with symbol {symbol} not found',
+                'status': status.HTTP_404_NOT_FOUND
+            }
+
+        if materialized:
+            records = store.read_records(asset, timeframe, indicator_name, period_int, start_dt, adjusted_end)
+            if records is not None:
+                return {'candles_fetched': 0, 'source': 'store', 'result': records}
+
+        timestamps, values = _load_candles(asset.symbol, timeframe, start_dt, adjusted_end, lookback)
+
+        if not timestamps:
+            return {
+                'error': 'No candles found for the specified time range',
+                'status': status.HTTP_404_NOT_FOUND
+            }
+
+        # Call the indicator function on float64 column arrays
+        try:
+            output = indicator.compute(utils.to_arrays(values), period_int)
+            result = indicator.to_records(timestamps, output)
+
+        except Exception as e:
+            return {
+                'error': f'Error calculating indicator: {str(e)}',
+                'status': status.HTTP_500_INTERNAL_SERVER_ERROR
+            }
+
+        return {'candles_fetched': len(timestamps), 'source': 'computed', 'result': result}
+
+    # Keyed by the resolved parameters, so '-1' and the explicit default share
+    # an entry; a hit costs no query at all
+    key, timeout = make_cache_key(symbol, timeframe, start_dt, end_dt if end else None, f"{indicator_name}:{period_int}")
+
+    def cacheable(value):
+        # A registered indicator computed on the fly only until the store catches up
+        return 'error' not in value and not (materialized and value['source'] == 'computed')
+
+    computed = get_or_compute(key, compute, timeout=timeout, cacheable=cacheable)
+
+    if 'error' in computed:
+        return Response({'error': computed['error']}, status=computed['status'])
+
+    return Response({
+        'symbol': symbol,
+        'timeframe': timeframe,
+        'indicator': indicator_name,
+        'start': start,
+        'end': end if end else end_dt.isoformat(),
+        'period': period_int,
+        'candles_fetched': computed['candles_fetched'],
+        'source': computed['source'],
+        'result': computed['result']
+    }, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+def calculate_indicators_batch(request):
+    """
+    GET endpoint to calculate several indicators of one series from a single candle fetch
+
+    Query Parameters:
+    - symbol: Asset symbol (required)
+    - start: Start timestamp (required, ISO format)
+    - end: End timestamp (optional, defaults to now)
+    - timeframe: Timeframe - 15m, 1h, 4h, or 1d (required)
+    - indicators: Comma separated specs, name[:period][@timeframe] (required),
+                  e.g. rsi:14,macd,atr,bollinger_bands:20,ema:200@4h,rsi@1d
+
+    Candles for the longest lookback are fetched once. Each indicator is computed
+    from its own lookback start, so values match calculate_indicator computed on
+    the fly, and returned as columns aligned with one 'timestamps' axis
+    (None where the indicator has no value).
+
+    A spec with @timeframe is computed on the base candles resampled to that
+    timeframe (any multiple of the base one, e.g. 2h, 4h, 1d, 1w) and aligned
+    onto the base candles: each one gets the value of the last higher-timeframe
+    candle closed by its close, so there is no look-ahead (indicators.resample).
+    """
+    symbol = request.query_params.get('symbol')
+    start = request.query_params.get('start')
+    end = request.query_params.get('end')
+    timeframe = request.query_params.get('timeframe')
+    indicators = request.query_params.get('indicators')
+
+    if not all([symbol, start, timeframe, indicators]):
         return Response(
-            {'error': f'{indicator_name} is not a valid indicator function'},
+            {'error': 'Missing required parameters: symbol, start, timeframe, indicators'},
             status=status.HTTP_400_BAD_REQUEST
         )
-    
-    # Get the asset
-    try:
-        asset = Asset.objects.get(symbol=symbol)
-    except Asset.DoesNotExist:
-        return Response(
-            {'error': f'Asset with symbol {symbol} not found'},
-            status=status.HTTP_404_NOT_FOUND
-        )
-    
-    # Get candles based on timeframe
-    CandleModel = TIMEFRAME_MODEL_MAP[timeframe]
-    candles = CandleModel.objects.filter(
-        symbol=asset,
-        timestamp__gte=adjusted_start,
-        timestamp__lte=adjusted_end
-    ).order_by('timestamp')
-    
-    if not candles.exists():
+
+    if timeframe not in TIMEFRAME_MODEL_MAP:
         return Response(
-            {'error': 'No candles found for the specified time range'},
-            status=status.HTTP_404_NOT_FOUND
+            {'error': f'Invalid timeframe. Must be one of: {", ".join(TIMEFRAME_MODEL_MAP.keys())}'},
+            status=status.HTTP_400_BAD_REQUEST
         )
-    
-    # Convert candles to list of dicts for easier processing
-    candles_data = list(candles.values(
-        'timestamp', 'open', 'high', 'low', 'close', 'volume'
-    ))
-    
-    # Call the indicator function
-    try:
-        # Check if the function accepts a period parameter
-        sig = inspect.signature(indicator_func)
-        if 'period' in sig.parameters and int(period) != 0:
-            result = indicator_func(candles_data, period=period_int)
-        else:
-            result = indicator_func(candles_data)
-            
-    except Exception as e:
+
+    start_dt = parse_timestamp(start)
+    end_dt = parse_timestamp(end) if end else timezone.now()
+    if not start_dt or not end_dt:
         return Response(
-            {'error': f'Error calculating indicator: {str(e)}'},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            {'error': 'Invalid timestamp format. Use ISO format (e.g., 2024-01-01T00:00:00Z)'},
+            status=status.HTTP_400_BAD_REQUEST
         )
-    
+
+    adjusted_end = end_dt - TIMEFRAME_DELTA_MAP[timeframe]
+
+    base_seconds = int(TIMEFRAME_DELTA_MAP[timeframe].total_seconds())
+
+    # (key, indicator, period, base candles of lookback, resampled timeframe seconds or None) per spec
+    specs = []
+    for item in indicators.split(','):
+        item, _, spec_timeframe = item.strip().partition('@')
+        indicator_name, _, period = item.partition(':')
+        indicator = get_indicator(indicator_name)
+        if indicator is None:
+            return Response(
+                {'error': f'No indicator with name: {indicator_name}'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        try:
+            period_int = indicator.resolve_period(period)
+        except ValueError:
+            return Response(
+                {'error': f'Period must be a valid integer: {item}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        key = f"{indicator_name}:{period_int}"
+        seconds = None
+        lookback = indicator.warmup(period_int)
+        if spec_timeframe and spec_timeframe != timeframe:
+            try:
+                seconds = int(timeframe_delta(spec_timeframe).total_seconds())
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            if seconds <= base_seconds or seconds % base_seconds:
+                return Response(
+                    {'error': f'Timeframe {spec_timeframe} is not a multiple of {timeframe}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            key = f"{key}@{spec_timeframe}"
+            # Warm-up in resampled candles, plus the one forming at start and a partial first one
+            lookback = (lookback + 2) * (seconds // base_seconds)
+
+        if key not in (spec[0] for spec in specs):
+            specs.append((key, indicator, period_int, lookback, seconds))
+
+    lookback = max(spec[3] for spec in specs)
+
+    def compute():
+        timestamps, values = _load_candles(symbol, timeframe, start_dt, adjusted_end, lookback)
+        if not timestamps:
+            if not Asset.objects.filter(symbol=symbol).exists():
+                return {'error': f'Asset with symbol {symbol} not found', 'status': status.HTTP_404_NOT_FOUND}
+            return {'error': 'No candles found for the specified time range', 'status': status.HTTP_404_NOT_FOUND}
+
+        epochs = np.array([int(ts.timestamp()) for ts in timestamps], dtype=np.int64)
+        axis_start = int(np.searchsorted(epochs, start_dt.timestamp()))
+        values = np.asarray(values, dtype=np.float64).reshape(-1, len(utils.FIELDS))
+        candles = utils.to_arrays(values)
+
+        results = {}
+        for key, indicator, period_int, warmup, seconds in specs:
+            index = None
+            try:
+                if seconds is None:
+                    # Each indicator starts from its own warm-up, as in calculate_indicator
+                    first = max(axis_start - warmup, 0)
+                    indicator_candles = {field: column[first:] for field, column in candles.items()}
+                    output = indicator.compute(indicator_candles, period_int)
+                    index = slice(axis_start - first, None)
+                else:
+                    bucket, resampled = resample(epochs, values, base_seconds, seconds)
+                    index = align_index(epochs[axis_start:], base_seconds, bucket, seconds)
+                    # Resampled candles from the warm-up before the one seen at start
+                    first = max(int(index[0]) - indicator.warmup(period_int), 0) if len(index) else 0
+                    output = indicator.compute(utils.to_arrays(resampled[first:]), period_int)
+                    output = align(output, index - first)
+                    index = slice(None)
+            except Exception as e:
+                output = {'error': f'Error calculating indicator: {str(e)}'}
+            results[key] = indicator.to_columns(output, index)
+
+        return {
+            'candles_fetched': len(timestamps),
+            'timestamps': timestamps[axis_start:],
+            'indicators': results
+        }
+
+    key, timeout = make_cache_key(
+        symbol, timeframe, start_dt, end_dt if end else None, 'batch:' + ','.join(spec[0] for spec in specs)
+    )
+    computed = get_or_compute(key, compute, timeout=timeout, cacheable=lambda value: 'error' not in value)
+
+    if 'error' in computed:
+        return Response({'error': computed['error']}, status=computed['status'])
+
     return Response({
         'symbol': symbol,
         'timeframe': timeframe,
-        'indicator': indicator_name,
         'start': start,
         'end': end if end else end_dt.isoformat(),
-        'period': period_int,
-        'candles_fetched': len(candles_data),
-        'result': result
-    }, status=status.HTTP_200_OK)
\ No newline at end of file
+        **computed
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def screener(request):
+    """
+    GET endpoint to screen all enabled assets with indicator conditions
+
+    Query Parameters:
+    - conditions: Comma separated conditions (required), e.g. rsi:14@1h<30,close@4h>ema:200@4h
+    - sort: Operand to rank matches by (optional, defaults to the first condition's operand)
+    - order: asc or desc (optional, default asc)
+    - limit: Maximum number of matches (optional)
+    - async: 1 to run the screen as a Celery task and return its task_id (optional)
+    - task_id: Fetch the result of a screen started with async=1 (optional)
+
+    See indicators.screener for the condition syntax.
+    """
+    task_id = request.query_params.get('task_id')
+    if task_id:
+        task = AsyncResult(task_id)
+        if not task.ready():
+            return Response({'task_id': task_id, 'status': task.status}, status=status.HTTP_202_ACCEPTED)
+        if task.failed():
+            return Response({'task_id': task_id, 'error': str(task.result)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(task.result, status=status.HTTP_200_OK)
+
+    conditions = [c for c in request.query_params.get('conditions', '').split(',') if c.strip()]
+    sort = request.query_params.get('sort') or None
+    descending = request.query_params.get('order', 'asc') == 'desc'
+    try:
+        limit = int(request.query_params.get('limit', 0)) or None
+    except ValueError:
+        return Response({'error': 'limit must be a valid integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        # Validate before queueing so syntax errors are reported right away
+        parse_conditions(conditions)
+        if sort:
+            parse_operand(sort)
+    except ScreenerError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    if request.query_params.get('async') in ('1', 'true'):
+        task = run_screener.delay(conditions, sort=sort, descending=descending, limit=limit)
+        return Response({'task_id': task.id, 'status': task.status}, status=status.HTTP_202_ACCEPTED)
+
+    try:
+        result = run_screen(conditions, sort=sort, descending=descending, limit=limit)
+    except ScreenerError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(result, status=status.HTTP_200_OK)
@@ -6,6 +6,7 @@ from ohlc.models import Candle15M, Candle1H, Candle4H, Candle1D
 from datetime import datetime, timezone
 from asset.models import Asset
 from decimal import Decimal
+from ohlc.utils.events import candles_written
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +53,7 @@ def update_15minute_ohlc(limit=5):
                 update_fields=['open', 'high', 'low', 'close', 'volume'],
                 unique_fields=['symbol', 'timestamp']
             )
+            candles_written(asset, '15m', candles)
 
         except Exception as e:
             logger.exception(f"An error occurred while updating 15m candles for {asset.symbol}: {e}")
@@ -98,6 +100,7 @@ def update_1hour_ohlc(limit=5):
                 update_fields=['open', 'high', 'low', 'close', 'volume'],
                 unique_fields=['symbol', 'timestamp']
             )
+            candles_written(asset, '1h', candles)
 
         except Exception as e:
             logger.exception(f"An error occurred while updating 1h candles for {asset.symbol}: {e}")
@@ -145,6 +148,7 @@ def update_4hour_ohlc(limit=5):
                 update_fields=['open', 'high', 'low', 'close', 'volume'],
                 unique_fields=['symbol', 'timestamp']
             )
+            candles_written(asset, '4h', candles)
             
 
         except Exception as e:
@@ -192,6 +196,7 @@ def update_1day_ohlc(limit=5):
                 update_fields=['open', 'high', 'low', 'close', 'volume'],
                 unique_fields=['symbol', 'timestamp']
             )
+            candles_written(asset, '1d', candles)
 
         except Exception as e:
             logger.exception(f"An error occurred while updating 1d candles for {asset.symbol}: {e}")
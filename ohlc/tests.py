@@ -1,3 +1,255 @@
-from django.test import TestCase
+import json
+from datetime import datetime, timedelta, timezone
+from django.core.cache import cache
+from decimal import Decimal
+from unittest import mock
+from django.test import SimpleTestCase, TestCase, override_settings
+from asset.models import Asset
+from ohlc.models import Candle15M, Candle1H
+from ohlc.utils import events, hot_window, stream
+from ohlc.utils.cache import advance_watermark, bump_data_version, bump_history_version, make_cache_key
+from ohlc.utils.timeframes import open_candle_start
 
-# Create your tests here.
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCAL_CACHE, RESPONSE_CACHE_CLOSED_TIMEOUT=86400)
+class CacheKeyTests(SimpleTestCase):
+    """Closed ranges are cached only once their candles were written final."""
+
+    def setUp(self):
+        cache.clear()
+        self.open_start = open_candle_start('1h')
+        self.start = self.open_start - timedelta(hours=10)
+        self.end = self.open_start - timedelta(hours=3)
+
+    def test_range_without_watermark_is_open(self):
+        key, timeout = make_cache_key('BTCUSDT', '1h', self.start, self.end, 'json')
+        self.assertEqual(timeout, 3600)
+        self.assertIn(f':{int(self.open_start.timestamp())}', key)
+        bump_data_version('BTCUSDT', '1h')
+        self.assertNotEqual(make_cache_key('BTCUSDT', '1h', self.start, self.end, 'json')[0], key)
+
+    def test_range_ending_at_watermark_is_open(self):
+        advance_watermark('BTCUSDT', '1h', int(self.end.timestamp()))
+        self.assertNotIn(':h0', make_cache_key('BTCUSDT', '1h', self.start, self.end, 'json')[0])
+
+    def test_range_before_watermark_is_closed(self):
+        advance_watermark('BTCUSDT', '1h', int((self.end + timedelta(hours=1)).timestamp()))
+        key, timeout = make_cache_key('BTCUSDT', '1h', self.start, self.end, 'json')
+        self.assertTrue(key.endswith(':h0'))
+        self.assertEqual(timeout, 86400)
+
+        # New rows leave closed ranges alone, backfills invalidate them
+        bump_data_version('BTCUSDT', '1h')
+        self.assertEqual(make_cache_key('BTCUSDT', '1h', self.start, self.end, 'json')[0], key)
+        bump_history_version('BTCUSDT', '1h')
+        self.assertTrue(make_cache_key('BTCUSDT', '1h', self.start, self.end, 'json')[0].endswith(':h1'))
+
+    def test_watermark_never_moves_back(self):
+        advance_watermark('BTCUSDT', '1h', int(self.open_start.timestamp()))
+        advance_watermark('BTCUSDT', '1h', int(self.start.timestamp()))
+        self.assertTrue(make_cache_key('BTCUSDT', '1h', self.start, self.end, 'json')[0].endswith(':h0'))
+
+    def test_range_touching_open_candle_is_open(self):
+        advance_watermark('BTCUSDT', '1h', int(datetime.now(timezone.utc).timestamp()) + 86400)
+        key, timeout = make_cache_key('BTCUSDT', '1h', self.start, None, 'json')
+        self.assertIn(':open:', key)
+        self.assertEqual(timeout, 3600)
+
+
+@override_settings(CACHES=LOCAL_CACHE, HOT_WINDOW_ENABLED=False)
+class CandleViewTests(TestCase):
+    """The candle endpoints read naive timestamps as UTC."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.asset = Asset.objects.create(symbol='BTCUSDT')
+        cls.first = open_candle_start('1h') - timedelta(hours=5)
+        Candle1H.objects.bulk_create([
+            Candle1H(
+                symbol=cls.asset, timestamp=cls.first + timedelta(hours=i),
+                open=Decimal('100.5'), high=Decimal('101'), low=Decimal('99.25'),
+                close=Decimal('100.75'), volume=Decimal('12.12345678')
+            )
+            for i in range(5)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_naive_end(self):
+        start = self.first.replace(tzinfo=None).isoformat()
+        end = (self.first + timedelta(hours=2)).replace(tzinfo=None).isoformat()
+        response = self.client.get('/1h/', {'symbol': 'BTCUSDT', 'timestamp': start, 'end': end})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['candles']), 3)
+
+        response = self.client.get('/candles/', {
+            'symbols': 'BTCUSDT', 'timeframes': '1h', 'timestamp': start, 'end': end
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['candles']['BTCUSDT']['1h']), 3)
+
+    def test_invalid_timestamp(self):
+        response = self.client.get('/1h/', {'symbol': 'BTCUSDT', 'timestamp': '2025-13-01T00:00:00'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES=LOCAL_CACHE, HOT_WINDOW_ENABLED=False)
+class CandleBatchViewTests(TestCase):
+    """The batch endpoint returns what the single endpoints do, in one query per timeframe."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.first = open_candle_start('1h') - timedelta(hours=6)
+        for n, symbol in enumerate(('BTCUSDT', 'ETHUSDT')):
+            asset = Asset.objects.create(symbol=symbol)
+            for model, step, count in ((Candle1H, timedelta(hours=1), 6), (Candle15M, timedelta(minutes=15), 24)):
+                model.objects.bulk_create([
+                    model(
+                        symbol=asset, timestamp=cls.first + i * step,
+                        open=Decimal(100 + n + i), high=Decimal(102 + n + i), low=Decimal('99.5') + n + i,
+                        close=Decimal('101.12345678') + i, volume=Decimal(i + 1)
+                    )
+                    for i in range(count)
+                ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_matches_single_endpoints(self):
+        params = {'symbols': 'BTCUSDT,ETHUSDT,NOPE', 'timeframes': '15m,1h', 'timestamp': self.first.isoformat()}
+        with self.assertNumQueries(3):
+            response = self.client.get('/candles/', params)
+        data = response.json()
+        self.assertEqual(data['missing'], ['NOPE'])
+
+        for symbol in ('BTCUSDT', 'ETHUSDT'):
+            for timeframe in ('15m', '1h'):
+                with self.subTest(symbol=symbol, timeframe=timeframe):
+                    single = self.client.get(f'/{timeframe}/', {'symbol': symbol, 'timestamp': self.first.isoformat()})
+                    self.assertEqual(data['candles'][symbol][timeframe], single.json()['candles'])
+
+    def test_invalid_timeframe(self):
+        response = self.client.get('/candles/', {'symbols': 'BTCUSDT', 'timeframes': '1h,2h', 'timestamp': '2025-01-01T00:00:00Z'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES=LOCAL_CACHE, HOT_WINDOW_ENABLED=True, HOT_WINDOW_SIZE=50, HOT_WINDOW_MAX_SERIES=10)
+class HotWindowTests(TestCase):
+    """The hot window returns exactly what the DB path does and follows backfills."""
+
+    # Values float64 cannot hold, at the DecimalField(20, 8) limits
+    VALUES = (
+        Decimal('123456789012.12345678'), Decimal('99999999999.99999999'), Decimal('0.00000001'),
+        Decimal('65000.10000000'), Decimal('0.30000000'),
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.asset = Asset.objects.create(symbol='BTCUSDT')
+        cls.first = open_candle_start('1h') - timedelta(hours=10)
+        Candle1H.objects.bulk_create([
+            Candle1H(
+                symbol=cls.asset, timestamp=cls.first + timedelta(hours=i),
+                open=cls.VALUES[i % 5], high=cls.VALUES[(i + 1) % 5], low=cls.VALUES[(i + 2) % 5],
+                close=cls.VALUES[(i + 3) % 5], volume=cls.VALUES[(i + 4) % 5]
+            )
+            for i in range(10)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        hot_window._buffers.clear()
+
+    def get_candles(self):
+        response = self.client.get('/1h/', {'symbol': 'BTCUSDT', 'timestamp': self.first.isoformat()})
+        return response.json()['candles']
+
+    def test_same_output_as_db_path(self):
+        hot = self.get_candles()
+        self.assertIsNotNone(hot_window.get_range('BTCUSDT', '1h', self.first))
+        cache.clear()
+        with override_settings(HOT_WINDOW_ENABLED=False):
+            self.assertEqual(hot, self.get_candles())
+        stored = Candle1H.objects.get(timestamp=self.first)
+        self.assertEqual(hot[0]['open'], hot_window.format_decimal(stored.open))
+        self.assertEqual(hot[0]['high'], hot_window.format_decimal(stored.high))
+
+    def test_format_scaled_matches_format_decimal(self):
+        for value in self.VALUES + (Decimal('-1.5'), Decimal('-0.00000001'), Decimal('7')):
+            with self.subTest(value=value):
+                units = int(value.scaleb(hot_window.DECIMALS))
+                self.assertEqual(hot_window.format_scaled(*divmod(units, hot_window.SCALE)), hot_window.format_decimal(value))
+
+    @mock.patch('ohlc.utils.events.publish_closed_candles')
+    def test_backfill_reloads_complete_buffer(self, publish):
+        served = self.get_candles()[0]['open']
+        Candle1H.objects.filter(timestamp=self.first).update(open=Decimal('1.23456789'))
+
+        # A plain write only pulls rows from the last one on
+        events._dispatch(self.asset, '1h', list(Candle1H.objects.filter(timestamp=self.first + timedelta(hours=9))))
+        self.assertEqual(self.get_candles()[0]['open'], served)
+
+        events._dispatch(self.asset, '1h', list(Candle1H.objects.filter(timestamp=self.first)), backfill=True)
+        self.assertEqual(self.get_candles()[0]['open'], '1.23456789')
+
+
+class PublishClosedCandlesTests(SimpleTestCase):
+    """Each closed candle is published once, and a missing marker never replays a batch."""
+
+    def setUp(self):
+        self.asset = Asset(symbol='BTCUSDT')
+        self.open_start = open_candle_start('1h')
+        self.candles = [
+            Candle1H(
+                symbol=self.asset, timestamp=self.open_start - timedelta(hours=i),
+                open=Decimal(1), high=Decimal(1), low=Decimal(1), close=Decimal(1), volume=Decimal(1)
+            )
+            for i in range(5)
+        ]
+        self.client = mock.Mock()
+        patcher = mock.patch('ohlc.utils.stream.get_redis', return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def published(self):
+        return [json.loads(c.args[1])['timestamp'] for c in self.client.publish.call_args_list]
+
+    def test_without_marker_only_latest_closed(self):
+        self.client.get.return_value = None
+        stream.publish_closed_candles(self.asset, '1h', self.candles)
+        latest = self.open_start - timedelta(hours=1)
+        self.assertEqual(self.published(), [latest.isoformat()])
+        self.client.set.assert_called_once_with('stream:last_closed:BTCUSDT:1h', int(latest.timestamp()))
+
+    def test_skips_candles_up_to_marker(self):
+        self.client.get.return_value = str(int((self.open_start - timedelta(hours=3)).timestamp())).encode()
+        stream.publish_closed_candles(self.asset, '1h', self.candles)
+        self.assertEqual(self.published(), [
+            (self.open_start - timedelta(hours=2)).isoformat(),
+            (self.open_start - timedelta(hours=1)).isoformat(),
+        ])
+
+
+@override_settings(PRICE_TICK_MIN_INTERVAL=1.0)
+class PublishPriceTests(SimpleTestCase):
+    """Clients get throttled ticks, the matching engine every price."""
+
+    def setUp(self):
+        self.client = mock.Mock()
+        patcher = mock.patch('ohlc.utils.stream.get_redis', return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        stream._last_tick_publish.clear()
+
+    def test_engine_gets_every_price(self):
+        for price in (100.0, 100.5, 99.0):
+            stream.publish_price_tick('btcusdt', price)
+            stream.publish_engine_price('btcusdt', price)
+
+        channels = [c.args[0] for c in self.client.publish.call_args_list]
+        self.assertEqual(channels.count('ticks:BTCUSDT'), 1)
+        engine = [json.loads(c.args[1]) for c in self.client.publish.call_args_list if c.args[0] == stream.ENGINE_CHANNEL]
+        self.assertEqual(engine, [{'symbol': 'BTCUSDT', 'price': price} for price in (100.0, 100.5, 99.0)])
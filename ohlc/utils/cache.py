@@ -0,0 +1,197 @@
+"""
+Shared Redis cache for candle and indicator responses.
+
+Entries are keyed by (symbol, timeframe, range, format). A range counts as
+closed once it ends before the open candle and the ingestion watermark (the
+latest candle written for the pair) is past its end, i.e. its candles were
+rewritten after they closed. Closed entries carry the pair's history
+version, which backfills bump, and expire after
+RESPONSE_CACHE_CLOSED_TIMEOUT. Every other range also carries the
+per-(symbol, timeframe) data version, which the ingestion tasks bump
+whenever they write rows, so those entries go stale exactly when new data
+lands.
+"""
+import logging
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from ohlc.utils.timeframes import TIMEFRAME_DELTA_MAP, open_candle_start
+
+logger = logging.getLogger(__name__)
+
+LOCK_POLL_INTERVAL = 0.05
+
+
+def _version_key(symbol, timeframe):
+    return f"candles:version:{symbol.upper()}:{timeframe}"
+
+
+def _history_key(symbol, timeframe):
+    return f"candles:history:{symbol.upper()}:{timeframe}"
+
+
+def _watermark_key(symbol, timeframe):
+    return f"candles:watermark:{symbol.upper()}:{timeframe}"
+
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # First write for this pair, incr fails on a missing key
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key)
+
+
+def get_data_version(symbol, timeframe):
+    """Current data version for a (symbol, timeframe) pair, 0 if never written."""
+    return cache.get(_version_key(symbol, timeframe), 0)
+
+
+def bump_data_version(symbol, timeframe):
+    """Invalidate every open-range entry of a (symbol, timeframe) pair."""
+    return _incr(_version_key(symbol, timeframe))
+
+
+def get_history_version(symbol, timeframe):
+    """Current history version for a (symbol, timeframe) pair, 0 if never backfilled."""
+    return cache.get(_history_key(symbol, timeframe), 0)
+
+
+def bump_history_version(symbol, timeframe):
+    """Invalidate every entry of a (symbol, timeframe) pair, closed ranges included."""
+    return _incr(_history_key(symbol, timeframe))
+
+
+def get_watermark(symbol, timeframe):
+    """Open time (epoch seconds) of the latest candle written for a pair, None if unknown."""
+    return cache.get(_watermark_key(symbol, timeframe))
+
+
+def advance_watermark(symbol, timeframe, timestamp):
+    """Move the pair's watermark forward to `timestamp` (epoch seconds), never back."""
+    key = _watermark_key(symbol, timeframe)
+    current = cache.get(key)
+    if current is None or timestamp > current:
+        cache.set(key, timestamp, timeout=None)
+
+
+def is_closed_range(symbol, timeframe, end):
+    """
+    True when every candle of a range ending at `end` is closed and stored
+    final: a later candle has been written, so the run that wrote it also
+    rewrote the candles up to `end` after they closed.
+    """
+    if end is None or end >= open_candle_start(timeframe):
+        return False
+    watermark = get_watermark(symbol, timeframe)
+    return watermark is not None and watermark > end.timestamp()
+
+
+def make_cache_key(symbol, timeframe, start, end, fmt):
+    """
+    Build the cache key and timeout for a response.
+
+    Closed ranges are bound to the history version and expire after
+    RESPONSE_CACHE_CLOSED_TIMEOUT. Other ranges are bound to the data version
+    and to the current open candle, and expire after one timeframe as a
+    safety net.
+    """
+    start_part = int(start.timestamp())
+    end_part = int(end.timestamp()) if end is not None else 'open'
+    key = f"candles:{symbol.upper()}:{timeframe}:{start_part}:{end_part}:{fmt}"
+
+    if is_closed_range(symbol, timeframe, end):
+        history = get_history_version(symbol, timeframe)
+        return f"{key}:h{history}", settings.RESPONSE_CACHE_CLOSED_TIMEOUT
+
+    version = get_data_version(symbol, timeframe)
+    open_start = int(open_candle_start(timeframe).timestamp())
+    timeout = int(TIMEFRAME_DELTA_MAP[timeframe].total_seconds())
+    return f"{key}:v{version}:{open_start}", timeout
+
+
+class _InFlight:
+    """A computation running in this process that identical callers wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+def get_or_compute(key, compute, timeout=None, cacheable=None):
+    """
+    Return the cached value for `key`, computing and storing it on a miss.
+
+    Concurrent misses for the same key are coalesced: threads of this process
+    wait for the one computing it, and across processes only the holder of
+    the cache lock computes while the others wait for the entry to show up
+    (stampede protection). Values for which `cacheable(value)` is False are
+    returned but not stored.
+    """
+    try:
+        value = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Response cache unavailable, computing {key} directly: {e}")
+        return compute()
+
+    if value is not None:
+        return value
+
+    with _in_flight_lock:
+        call = _in_flight.get(key)
+        leader = call is None
+        if leader:
+            call = _in_flight[key] = _InFlight()
+
+    if not leader:
+        if call.done.wait(settings.RESPONSE_CACHE_LOCK_TIMEOUT):
+            if call.error is not None:
+                raise call.error
+            return call.value
+        return compute()
+
+    try:
+        call.value = _compute_once(key, compute, timeout, cacheable)
+        return call.value
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _in_flight_lock:
+            _in_flight.pop(key, None)
+        call.done.set()
+
+
+def _compute_once(key, compute, timeout, cacheable):
+    """Compute a missing entry under the cross-process cache lock."""
+    lock_key = f"{key}:lock"
+    lock_timeout = settings.RESPONSE_CACHE_LOCK_TIMEOUT
+
+    if cache.add(lock_key, 1, timeout=lock_timeout):
+        try:
+            value = compute()
+            if cacheable is None or cacheable(value):
+                cache.set(key, value, timeout=timeout)
+            return value
+        finally:
+            cache.delete(lock_key)
+
+    # Another worker holds the lock, wait for its result
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+        if cache.get(lock_key) is None:
+            # Holder finished without storing (error or uncacheable result)
+            break
+
+    return compute()
@@ -0,0 +1,51 @@
+"""
+Ingestion events.
+
+Every code path that writes candle rows calls `candles_written` once per
+(symbol, timeframe) batch so that caches and other consumers can react to
+new data. Backfills (rows written over already served history) pass
+`backfill=True`, which also invalidates cached closed ranges.
+"""
+import logging
+from django.conf import settings
+from django.db import transaction
+from ohlc.utils.cache import advance_watermark, bump_data_version, bump_history_version
+from ohlc.utils.stream import publish_closed_candles
+
+logger = logging.getLogger(__name__)
+
+
+def candles_written(asset, timeframe, candles, backfill=False):
+    """
+    Notify consumers that `candles` were upserted for an asset and timeframe.
+    Inside a transaction, consumers run only once it commits.
+    """
+    if not candles:
+        return
+
+    transaction.on_commit(lambda: _dispatch(asset, timeframe, candles, backfill))
+
+
+def _dispatch(asset, timeframe, candles, backfill=False):
+    try:
+        if backfill:
+            bump_history_version(asset.symbol, timeframe)
+        bump_data_version(asset.symbol, timeframe)
+        latest = max(c.timestamp for c in candles)
+        advance_watermark(asset.symbol, timeframe, int(latest.timestamp()))
+    except Exception as e:
+        logger.exception(f"Failed to bump data version for {asset.symbol} {timeframe}: {e}")
+
+    try:
+        publish_closed_candles(asset, timeframe, candles)
+    except Exception as e:
+        logger.exception(f"Failed to publish closed candles for {asset.symbol} {timeframe}: {e}")
+
+    if settings.INDICATOR_STATE_ENABLED:
+        try:
+            from indicators.tasks import advance_indicator_states
+            # Indicators that already fed the backfilled candles start over
+            rewritten_from = min(c.timestamp for c in candles).isoformat() if backfill else None
+            advance_indicator_states.delay(asset.symbol, timeframe, rewritten_from)
+        except Exception as e:
+            logger.exception(f"Failed to schedule indicator update for {asset.symbol} {timeframe}: {e}")
@@ -0,0 +1,273 @@
+"""
+In-process hot window of recent candles.
+
+Each (symbol, timeframe) pair gets a fixed-size NumPy ring buffer with the
+latest HOT_WINDOW_SIZE candles. Reads whose range starts inside the window are
+served from memory. Before serving, the buffer compares its data version with
+the one the ingestion tasks bump (see ohlc.utils.cache) and pulls only the new
+rows when they differ, so a read costs no DB query between ingestion runs.
+A changed history version (a backfill) reloads the whole buffer instead.
+
+At most HOT_WINDOW_MAX_SERIES buffers are kept per process (least recently
+used are evicted), which bounds memory to roughly
+HOT_WINDOW_MAX_SERIES * HOT_WINDOW_SIZE * 88 bytes.
+
+Values are held exactly, as two int64 arrays: the whole part and the
+fraction in units of 1e-8, which covers every DecimalField(20, 8) value.
+format_scaled() renders them as format_decimal() renders the DB values, so
+both paths return the same strings. Indicator reads get float64 values.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from decimal import Decimal
+import numpy as np
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from ohlc.utils.cache import get_data_version, get_history_version
+from ohlc.utils.timeframes import TIMEFRAME_MODEL_MAP
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+DECIMALS = 8
+SCALE = 10 ** DECIMALS
+
+
+def format_decimal(value):
+    """A candle value as returned by the candle endpoints: fixed point with 8 decimals."""
+    return f'{value:.{DECIMALS}f}'
+
+
+def format_scaled(whole, fraction):
+    """format_decimal() of the value whole + fraction / SCALE."""
+    units = whole * SCALE + fraction
+    sign = '-' if units < 0 else ''
+    whole, fraction = divmod(abs(units), SCALE)
+    return f'{sign}{whole}.{fraction:0{DECIMALS}d}'
+
+
+def to_float(whole, fraction):
+    return whole + fraction / SCALE
+
+
+class CandleRingBuffer:
+    """Fixed-size ring buffer of candles ordered by timestamp."""
+
+    def __init__(self, size):
+        self.size = size
+        self.timestamps = np.zeros(size, dtype=np.int64)  # epoch seconds
+        self.whole = np.zeros((size, len(FIELDS)), dtype=np.int64)
+        self.fraction = np.zeros((size, len(FIELDS)), dtype=np.int64)  # units of 1 / SCALE
+        self.head = 0  # next slot to write
+        self.count = 0
+        self.complete = False  # True when the buffer holds the whole history
+        self.version = None
+        self.history = None
+        self.lock = threading.Lock()
+
+    def _order(self):
+        return (self.head - self.count + np.arange(self.count)) % self.size
+
+    @property
+    def last_timestamp(self):
+        return int(self.timestamps[(self.head - 1) % self.size]) if self.count else None
+
+    @property
+    def first_timestamp(self):
+        return int(self.timestamps[(self.head - self.count) % self.size]) if self.count else None
+
+    def load(self, timestamps, whole, fraction, complete):
+        """Replace the buffer content with rows sorted by timestamp."""
+        timestamps = timestamps[-self.size:]
+        n = len(timestamps)
+        self.timestamps[:n] = timestamps
+        self.whole[:n] = whole[len(whole) - n:]
+        self.fraction[:n] = fraction[len(fraction) - n:]
+        self.head = n % self.size
+        self.count = n
+        self.complete = complete and n < self.size
+
+    def upsert(self, timestamps, whole, fraction):
+        """
+        Apply rows sorted by timestamp: rows already in the window are
+        overwritten (the open candle changes until it closes), newer rows
+        are appended and push the oldest out.
+        """
+        for ts, row_whole, row_fraction in zip(timestamps, whole, fraction):
+            last = self.last_timestamp
+            if last is not None and ts <= last:
+                order = self._order()
+                pos = np.searchsorted(self.timestamps[order], ts)
+                if pos < self.count and self.timestamps[order[pos]] == ts:
+                    self.whole[order[pos]] = row_whole
+                    self.fraction[order[pos]] = row_fraction
+                continue
+
+            self.timestamps[self.head] = ts
+            self.whole[self.head] = row_whole
+            self.fraction[self.head] = row_fraction
+            self.head = (self.head + 1) % self.size
+            if self.count < self.size:
+                self.count += 1
+            else:
+                self.complete = False
+
+    def covers(self, start_ts):
+        return self.complete or (self.count > 0 and start_ts >= self.first_timestamp)
+
+    def range(self, start_ts, end_ts=None, lookback=0):
+        """
+        Return (timestamps, whole, fraction) copies for start_ts <= ts <= end_ts plus
+        the `lookback` candles before start_ts, or None when the window does
+        not hold them.
+        """
+        if not self.covers(start_ts):
+            return None
+
+        order = self._order()
+        timestamps = self.timestamps[order]
+        lo = np.searchsorted(timestamps, start_ts, side='left')
+        if lo < lookback and not self.complete:
+            return None
+        lo = max(lo - lookback, 0)
+        hi = self.count if end_ts is None else np.searchsorted(timestamps, end_ts, side='right')
+        index = order[lo:hi]
+        return self.timestamps[index], self.whole[index], self.fraction[index]
+
+
+_buffers = OrderedDict()
+_buffers_lock = threading.Lock()
+
+
+def _fetch_rows(symbol, timeframe, since_ts=None, limit=None):
+    CandleModel = TIMEFRAME_MODEL_MAP[timeframe]
+    candles = CandleModel.objects.filter(symbol__symbol=symbol)
+    if since_ts is not None:
+        candles = candles.filter(timestamp__gte=datetime.fromtimestamp(since_ts, tz=timezone.utc))
+    candles = candles.order_by('-timestamp')
+    if limit is not None:
+        candles = candles[:limit]
+
+    rows = list(candles.values_list('timestamp', *FIELDS))
+    rows.reverse()
+    return _rows_to_arrays(rows)
+
+
+def _rows_to_arrays(rows):
+    timestamps = np.fromiter((int(row[0].timestamp()) for row in rows), dtype=np.int64, count=len(rows))
+    # Exact: Decimal scaled to integer units, split so the whole part fits int64
+    split = [divmod(int(Decimal(value).scaleb(DECIMALS).to_integral_value()), SCALE) for row in rows for value in row[1:]]
+    scaled = np.array(split, dtype=np.int64).reshape(len(rows), len(FIELDS), 2)
+    return timestamps, scaled[..., 0], scaled[..., 1]
+
+
+def _get_buffer(symbol, timeframe):
+    key = (symbol.upper(), timeframe)
+    with _buffers_lock:
+        buffer = _buffers.get(key)
+        if buffer is not None:
+            _buffers.move_to_end(key)
+            return buffer, False
+
+        buffer = CandleRingBuffer(settings.HOT_WINDOW_SIZE)
+        _buffers[key] = buffer
+        while len(_buffers) > settings.HOT_WINDOW_MAX_SERIES:
+            _buffers.popitem(last=False)
+        return buffer, True
+
+
+def _refresh(buffer, symbol, timeframe, is_new):
+    # History first: a backfill bumps it before the data version
+    history = get_history_version(symbol, timeframe)
+    version = get_data_version(symbol, timeframe)
+    if not is_new and buffer.version == version and buffer.history == history:
+        return
+
+    if is_new or not buffer.count or buffer.history != history:
+        # A backfill may have rewritten rows anywhere in the window
+        buffer.load(*_fetch_rows(symbol, timeframe, limit=buffer.size), complete=True)
+    else:
+        buffer.upsert(*_fetch_rows(symbol, timeframe, since_ts=buffer.last_timestamp))
+    buffer.version = version
+    buffer.history = history
+
+
+def get_range(symbol, timeframe, start, end=None, lookback=0, exact=False):
+    """
+    Candles of a (symbol, timeframe) pair between `start` and `end` (inclusive),
+    preceded by the `lookback` candles before `start`, as (epoch-second
+    timestamps, float64 values with FIELDS columns), or None when the range
+    starts before the hot window and must go to the DB. With `exact`, returns
+    (timestamps, whole, fraction) with int64 values, see format_scaled().
+    """
+    if not settings.HOT_WINDOW_ENABLED:
+        return None
+
+    try:
+        buffer, is_new = _get_buffer(symbol, timeframe)
+        with buffer.lock:
+            _refresh(buffer, symbol, timeframe, is_new)
+            end_ts = int(end.timestamp()) if end is not None else None
+            window = buffer.range(int(start.timestamp()), end_ts, lookback)
+    except Exception as e:
+        logger.warning(f"Hot window unavailable for {symbol} {timeframe}: {e}")
+        return None
+
+    if window is None or exact:
+        return window
+    timestamps, whole, fraction = window
+    return timestamps, to_float(whole, fraction)
+
+
+def warm_hot_windows():
+    """
+    Load the latest HOT_WINDOW_SIZE candles of every enabled asset, one query per timeframe.
+    """
+    from asset.models import Asset
+
+    size = settings.HOT_WINDOW_SIZE
+    symbols = list(Asset.objects.filter(enable=True).values_list('symbol', flat=True))
+    symbols = symbols[:settings.HOT_WINDOW_MAX_SERIES // len(TIMEFRAME_MODEL_MAP)]
+
+    for timeframe, CandleModel in TIMEFRAME_MODEL_MAP.items():
+        # Read versions first so a write racing the query triggers a refresh later
+        histories = {symbol: get_history_version(symbol, timeframe) for symbol in symbols}
+        versions = {symbol: get_data_version(symbol, timeframe) for symbol in symbols}
+        rows = CandleModel.objects.filter(symbol__symbol__in=symbols).annotate(
+            row_number=Window(RowNumber(), partition_by=[F('symbol_id')], order_by=F('timestamp').desc()),
+        ).filter(row_number__lte=size).order_by('symbol__symbol', 'timestamp').values_list(
+            'symbol__symbol', 'timestamp', *FIELDS
+        )
+
+        grouped = {symbol: [] for symbol in symbols}
+        for row in rows:
+            grouped[row[0]].append(row[1:])
+
+        for symbol, symbol_rows in grouped.items():
+            buffer, _ = _get_buffer(symbol, timeframe)
+            with buffer.lock:
+                buffer.load(*_rows_to_arrays(symbol_rows), complete=True)
+                buffer.version = versions[symbol]
+                buffer.history = histories[symbol]
+
+    logger.info(f"Hot window warmed for {len(symbols)} symbols")
+
+
+def warm_on_startup():
+    """Warm the hot window in the background so worker startup is not delayed."""
+    if not (settings.HOT_WINDOW_ENABLED and settings.HOT_WINDOW_WARM_ON_STARTUP):
+        return
+
+    def run():
+        from django.db import connection
+        try:
+            warm_hot_windows()
+        except Exception as e:
+            logger.warning(f"Hot window warm-up failed: {e}")
+        finally:
+            connection.close()
+
+    threading.Thread(target=run, name='hot-window-warmup', daemon=True).start()
@@ -6,6 +6,7 @@ from datetime import datetime, timezone
 from django.db import transaction
 from asset.models import Asset
 from decimal import Decimal
+from ohlc.utils.events import candles_written
 
 logger = logging.getLogger(__name__)
 
@@ -68,6 +69,7 @@ def init_15m_candles(client: Client, asset: Asset, from_year: int = 2025, from_m
             update_fields=['open', 'high', 'low', 'close', 'volume'],
             unique_fields=['symbol', 'timestamp']
         )
+        candles_written(asset, '15m', candles, backfill=True)
 
         start_time = end_time
         end_time += converter_coef
@@ -111,6 +113,7 @@ def init_1h_candles(client: Client, asset: Asset, from_year: int = 2025, from_mo
             update_fields=['open', 'high', 'low', 'close', 'volume'],
             unique_fields=['symbol', 'timestamp']
         )
+        candles_written(asset, '1h', candles, backfill=True)
 
 
         start_time = end_time
@@ -155,6 +158,7 @@ def init_4h_candles(client: Client, asset: Asset, from_year: int = 2025, from_mo
             update_fields=['open', 'high', 'low', 'close', 'volume'],
             unique_fields=['symbol', 'timestamp']
         )
+        candles_written(asset, '4h', candles, backfill=True)
 
         start_time = end_time
         end_time += converter_coef
@@ -198,6 +202,7 @@ def init_1d_candles(client: Client, asset: Asset, from_year: int = 2025, from_mo
             update_fields=['open', 'high', 'low', 'close', 'volume'],
             unique_fields=['symbol', 'timestamp']
         )
+        candles_written(asset, '1d', candles, backfill=True)
 
         start_time = end_time
         end_time += converter_coef
@@ -0,0 +1,115 @@
+"""
+Real-time fan-out of closed candles and price ticks through Redis pub/sub.
+
+Producers (ingestion tasks, the price websocket command) publish JSON
+messages on per-symbol channels; every web worker serving the stream
+endpoint subscribes only to the channels its clients asked for.
+
+Channels:
+    candles:<SYMBOL>:<timeframe>   one message per newly closed candle
+    ticks:<SYMBOL>                 last price, at most one per PRICE_TICK_MIN_INTERVAL
+    engine:prices                  every price received, all symbols, for the demo matching engine
+"""
+import json
+import logging
+import time
+from datetime import datetime, timezone
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+from ohlc.utils.timeframes import TIMEFRAME_DELTA_MAP
+
+logger = logging.getLogger(__name__)
+
+_redis = None
+_last_tick_publish = {}
+
+
+def get_redis():
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(settings.REDIS_STREAM_URL)
+    return _redis
+
+
+def get_async_redis():
+    return aioredis.Redis.from_url(settings.REDIS_STREAM_URL)
+
+
+def candle_channel(symbol, timeframe):
+    return f"candles:{symbol.upper()}:{timeframe}"
+
+
+def tick_channel(symbol):
+    return f"ticks:{symbol.upper()}"
+
+
+ENGINE_CHANNEL = "engine:prices"
+
+
+def publish_closed_candles(asset, timeframe, candles):
+    """
+    Publish candles of a freshly written batch that are closed and newer than
+    the last one published for the pair. The ingestion tasks rewrite the last
+    few candles on every run, so each closed candle goes out exactly once.
+    Without a marker (first run, flushed Redis, a backfill of a new asset)
+    only the latest closed candle goes out, never the whole batch.
+    """
+    now = datetime.now(timezone.utc)
+    delta = TIMEFRAME_DELTA_MAP[timeframe]
+    closed = sorted(
+        (c for c in candles if c.timestamp + delta <= now),
+        key=lambda c: c.timestamp
+    )
+    if not closed:
+        return
+
+    client = get_redis()
+    marker = f"stream:last_closed:{asset.symbol.upper()}:{timeframe}"
+    last_published = client.get(marker)
+    if last_published is None:
+        closed = closed[-1:]
+        last_published = 0
+    else:
+        last_published = int(last_published)
+
+    channel = candle_channel(asset.symbol, timeframe)
+    for candle in closed:
+        ts = int(candle.timestamp.timestamp())
+        if ts <= last_published:
+            continue
+        client.publish(channel, json.dumps({
+            'type': 'candle',
+            'symbol': asset.symbol.upper(),
+            'timeframe': timeframe,
+            'timestamp': candle.timestamp.isoformat(),
+            'open': str(candle.open),
+            'high': str(candle.high),
+            'low': str(candle.low),
+            'close': str(candle.close),
+            'volume': str(candle.volume)
+        }))
+        last_published = ts
+
+    client.set(marker, last_published)
+
+
+def publish_price_tick(symbol, price):
+    """Publish a price tick, dropping ticks that come faster than the throttle interval."""
+    symbol = symbol.upper()
+    now = time.monotonic()
+    if now - _last_tick_publish.get(symbol, 0.0) < settings.PRICE_TICK_MIN_INTERVAL:
+        return
+
+    _last_tick_publish[symbol] = now
+    get_redis().publish(tick_channel(symbol), json.dumps({
+        'type': 'tick',
+        'symbol': symbol,
+        'price': price,
+        'time': datetime.now(timezone.utc).isoformat()
+    }))
+
+
+def publish_engine_price(symbol, price):
+    """Publish a price for the demo matching engine, unthrottled so no TP/SL touch is skipped."""
+    get_redis().publish(ENGINE_CHANNEL, json.dumps({'symbol': symbol.upper(), 'price': price}))
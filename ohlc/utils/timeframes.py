@@ -0,0 +1,58 @@
+import re
+from datetime import datetime, timedelta, timezone
+from django.utils.dateparse import parse_datetime
+from ohlc.models import Candle15M, Candle1H, Candle4H, Candle1D
+
+
+TIMEFRAME_MODEL_MAP = {
+    '15m': Candle15M,
+    '1h': Candle1H,
+    '4h': Candle4H,
+    '1d': Candle1D,
+}
+
+TIMEFRAME_DELTA_MAP = {
+    '15m': timedelta(minutes=15),
+    '1h': timedelta(hours=1),
+    '4h': timedelta(hours=4),
+    '1d': timedelta(days=1),
+}
+
+
+def open_candle_start(timeframe, now=None):
+    """
+    Start time of the candle that is still forming for the given timeframe.
+    Every candle with a timestamp before this one is closed and never changes.
+    """
+    now = now or datetime.now(timezone.utc)
+    seconds = int(TIMEFRAME_DELTA_MAP[timeframe].total_seconds())
+    epoch = int(now.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % seconds, tz=timezone.utc)
+
+
+_TIMEFRAME_UNITS = {'m': 'minutes', 'h': 'hours', 'd': 'days', 'w': 'weeks'}
+
+
+def timeframe_delta(timeframe):
+    """
+    Duration of any timeframe written as <count><m|h|d|w>, e.g. '15m', '2h',
+    '3d' or '1w', stored or not. Raises ValueError for anything else.
+    """
+    match = re.fullmatch(r'([1-9][0-9]*)([mhdw])', timeframe or '')
+    if not match:
+        raise ValueError(f'Invalid timeframe: {timeframe}')
+    return timedelta(**{_TIMEFRAME_UNITS[match.group(2)]: int(match.group(1))})
+
+
+def parse_timestamp(value):
+    """
+    ISO timestamp of a request parameter as an aware datetime, naive values
+    taken as UTC. None when the value is not a datetime.
+    """
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        return None
+    if parsed is not None and parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
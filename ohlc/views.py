@@ -1,143 +1,212 @@
-from django.http import JsonResponse
-from django.utils.dateparse import parse_datetime
+from datetime import datetime, timezone
+from django.conf import settings
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from .models import Candle1D, Candle4H, Candle1H, Candle15M, Asset
+from .utils.cache import make_cache_key, get_or_compute
+from .utils.timeframes import TIMEFRAME_MODEL_MAP, parse_timestamp
+from .utils.hot_window import format_decimal, format_scaled, get_range
+from .utils.stream import get_async_redis, candle_channel, tick_channel
 
 
-
-def get_1d_view(request):
+def _get_candles_view(request, CandleModel, timeframe):
     symbol_name = request.GET.get('symbol')
     min_timestamp = request.GET.get('timestamp')  # ISO format expected, e.g. '2025-05-01T00:00:00Z'
+    max_timestamp = request.GET.get('end')  # Optional, same format
 
     if not symbol_name or not min_timestamp:
         return JsonResponse({'error': 'symbol and timestamp are required.'}, status=400)
 
     try:
         symbol = Asset.objects.get(symbol=symbol_name)
-        parsed_timestamp = parse_datetime(min_timestamp)
+        parsed_timestamp = parse_timestamp(min_timestamp)
         if parsed_timestamp is None:
             raise ValueError
+        parsed_end = None
+        if max_timestamp:
+            parsed_end = parse_timestamp(max_timestamp)
+            if parsed_end is None:
+                raise ValueError
     except Asset.DoesNotExist:
         return JsonResponse({'error': 'Symbol not found.'}, status=404)
     except ValueError:
         return JsonResponse({'error': 'Invalid timestamp format.'}, status=400)
 
-    candles = Candle1D.objects.filter(symbol=symbol, timestamp__gte=parsed_timestamp).order_by('timestamp')
+    def build_content():
+        window = get_range(symbol.symbol, timeframe, parsed_timestamp, parsed_end, exact=True)
+        if window is not None:
+            timestamps, whole, fraction = (part.tolist() for part in window)
+            data = [
+                {
+                    'timestamp': datetime.fromtimestamp(ts, tz=timezone.utc).isoformat(),
+                    'open': format_scaled(w[0], f[0]),
+                    'high': format_scaled(w[1], f[1]),
+                    'low': format_scaled(w[2], f[2]),
+                    'close': format_scaled(w[3], f[3]),
+                    'volume': format_scaled(w[4], f[4])
+                }
+                for ts, w, f in zip(timestamps, whole, fraction)
+            ]
+            return JsonResponse({'candles': data}).content
+
+        candles = CandleModel.objects.filter(symbol=symbol, timestamp__gte=parsed_timestamp)
+        if parsed_end is not None:
+            candles = candles.filter(timestamp__lte=parsed_end)
+        candles = candles.order_by('timestamp')
+
+        data = [
+            {
+                'timestamp': candle.timestamp.isoformat(),
+                'open': format_decimal(candle.open),
+                'high': format_decimal(candle.high),
+                'low': format_decimal(candle.low),
+                'close': format_decimal(candle.close),
+                'volume': format_decimal(candle.volume)
+            }
+            for candle in candles
+        ]
+
+        return JsonResponse({'candles': data}).content
+
+    key, timeout = make_cache_key(symbol.symbol, timeframe, parsed_timestamp, parsed_end, 'json')
+    content = get_or_compute(key, build_content, timeout=timeout)
+
+    return HttpResponse(content, content_type='application/json')
 
-    data = [
-        {
-            'timestamp': candle.timestamp.isoformat(),
-            'open': str(candle.open),
-            'high': str(candle.high),
-            'low': str(candle.low),
-            'close': str(candle.close),
-            'volume': str(candle.volume)
-        }
-        for candle in candles
-    ]
-
-    return JsonResponse({'candles': data})
 
+def get_1d_view(request):
+    return _get_candles_view(request, Candle1D, '1d')
 
 
 def get_4h_view(request):
-    symbol_name = request.GET.get('symbol')
-    min_timestamp = request.GET.get('timestamp')  # ISO format expected, e.g. '2025-05-01T00:00:00Z'
-
-    if not symbol_name or not min_timestamp:
-        return JsonResponse({'error': 'symbol and timestamp are required.'}, status=400)
-
-    try:
-        symbol = Asset.objects.get(symbol=symbol_name)
-        parsed_timestamp = parse_datetime(min_timestamp)
-        if parsed_timestamp is None:
-            raise ValueError
-    except Asset.DoesNotExist:
-        return JsonResponse({'error': 'Symbol not found.'}, status=404)
-    except ValueError:
-        return JsonResponse({'error': 'Invalid timestamp format.'}, status=400)
-
-    candles = Candle4H.objects.filter(symbol=symbol, timestamp__gte=parsed_timestamp).order_by('timestamp')
-
-    data = [
-        {
-            'timestamp': candle.timestamp.isoformat(),
-            'open': str(candle.open),
-            'high': str(candle.high),
-            'low': str(candle.low),
-            'close': str(candle.close),
-            'volume': str(candle.volume)
-        }
-        for candle in candles
-    ]
-
-    return JsonResponse({'candles': data})
-
+    return _get_candles_view(request, Candle4H, '4h')
 
 
 def get_1h_view(request):
-    symbol_name = request.GET.get('symbol')
-    min_timestamp = request.GET.get('timestamp')  # ISO format expected, e.g. '2025-05-01T00:00:00Z'
-
-    if not symbol_name or not min_timestamp:
-        return JsonResponse({'error': 'symbol and timestamp are required.'}, status=400)
-
-    try:
-        symbol = Asset.objects.get(symbol=symbol_name)
-        parsed_timestamp = parse_datetime(min_timestamp)
-        if parsed_timestamp is None:
-            raise ValueError
-    except Asset.DoesNotExist:
-        return JsonResponse({'error': 'Symbol not found.'}, status=404)
-    except ValueError:
-        return JsonResponse({'error': 'Invalid timestamp format.'}, status=400)
-
-    candles = Candle1H.objects.filter(symbol=symbol, timestamp__gte=parsed_timestamp).order_by('timestamp')
-
-    data = [
-        {
-            'timestamp': candle.timestamp.isoformat(),
-            'open': str(candle.open),
-            'high': str(candle.high),
-            'low': str(candle.low),
-            'close': str(candle.close),
-            'volume': str(candle.volume)
-        }
-        for candle in candles
-    ]
-
-    return JsonResponse({'candles': data})
-
+    return _get_candles_view(request, Candle1H, '1h')
 
 
 def get_15m_view(request):
-    symbol_name = request.GET.get('symbol')
-    min_timestamp = request.GET.get('timestamp')  # ISO format expected, e.g. '2025-05-01T00:00:00Z'
-
-    if not symbol_name or not min_timestamp:
-        return JsonResponse({'error': 'symbol and timestamp are required.'}, status=400)
-
-    try:
-        symbol = Asset.objects.get(symbol=symbol_name)
-        parsed_timestamp = parse_datetime(min_timestamp)
-        if parsed_timestamp is None:
-            raise ValueError
-    except Asset.DoesNotExist:
-        return JsonResponse({'error': 'Symbol not found.'}, status=404)
-    except ValueError:
+    return _get_candles_view(request, Candle15M, '15m')
+
+
+def get_candles_batch_view(request):
+    """
+    Candles for many symbols and timeframes in one round trip.
+
+    Query Parameters:
+    - symbols: Comma separated asset symbols (required)
+    - timeframes: Comma separated timeframes, e.g. 15m,1h (required)
+    - timestamp: Start timestamp, ISO format (required)
+    - end: End timestamp, ISO format (optional)
+
+    Runs one asset query plus one candle query per timeframe and returns
+    {'candles': {symbol: {timeframe: [...]}}, 'missing': [...]}.
+    """
+    symbols = [s.strip() for s in request.GET.get('symbols', '').split(',') if s.strip()]
+    timeframes = [t.strip() for t in request.GET.get('timeframes', '').split(',') if t.strip()]
+    min_timestamp = request.GET.get('timestamp')
+    max_timestamp = request.GET.get('end')
+
+    if not symbols or not timeframes or not min_timestamp:
+        return JsonResponse({'error': 'symbols, timeframes and timestamp are required.'}, status=400)
+
+    invalid = [t for t in timeframes if t not in TIMEFRAME_MODEL_MAP]
+    if invalid:
+        return JsonResponse(
+            {'error': f'Invalid timeframe(s): {", ".join(invalid)}. Must be one of: {", ".join(TIMEFRAME_MODEL_MAP.keys())}'},
+            status=400
+        )
+
+    parsed_timestamp = parse_timestamp(min_timestamp)
+    parsed_end = parse_timestamp(max_timestamp) if max_timestamp else None
+    if parsed_timestamp is None or (max_timestamp and parsed_end is None):
         return JsonResponse({'error': 'Invalid timestamp format.'}, status=400)
 
-    candles = Candle15M.objects.filter(symbol=symbol, timestamp__gte=parsed_timestamp).order_by('timestamp')
-
-    data = [
-        {
-            'timestamp': candle.timestamp.isoformat(),
-            'open': str(candle.open),
-            'high': str(candle.high),
-            'low': str(candle.low),
-            'close': str(candle.close),
-            'volume': str(candle.volume)
-        }
-        for candle in candles
-    ]
-
-    return JsonResponse({'candles': data})
+    assets = dict(Asset.objects.filter(symbol__in=symbols).values_list('id', 'symbol'))
+    found = set(assets.values())
+    missing = [s for s in symbols if s not in found]
+
+    data = {symbol: {timeframe: [] for timeframe in timeframes} for symbol in assets.values()}
+
+    for timeframe in timeframes:
+        candles = TIMEFRAME_MODEL_MAP[timeframe].objects.filter(
+            symbol_id__in=assets.keys(),
+            timestamp__gte=parsed_timestamp
+        )
+        if parsed_end is not None:
+            candles = candles.filter(timestamp__lte=parsed_end)
+
+        rows = candles.order_by('symbol_id', 'timestamp').values_list(
+            'symbol_id', 'timestamp', 'open', 'high', 'low', 'close', 'volume'
+        )
+
+        for symbol_id, timestamp, open_, high, low, close, volume in rows:
+            data[assets[symbol_id]][timeframe].append({
+                'timestamp': timestamp.isoformat(),
+                'open': format_decimal(open_),
+                'high': format_decimal(high),
+                'low': format_decimal(low),
+                'close': format_decimal(close),
+                'volume': format_decimal(volume)
+            })
+
+    return JsonResponse({'candles': data, 'missing': missing})
+
+
+async def stream_view(request):
+    """
+    Server-Sent Events stream of closed candles and price ticks.
+
+    Query Parameters:
+    - symbols: Comma separated asset symbols (required)
+    - timeframes: Comma separated timeframes to receive closed candles for (optional)
+    - ticks: 1 to also receive throttled price ticks (optional)
+
+    Events are named 'candle' or 'tick' and carry a JSON payload.
+    """
+    symbols = [s.strip().upper() for s in request.GET.get('symbols', '').split(',') if s.strip()]
+    timeframes = [t.strip() for t in request.GET.get('timeframes', '').split(',') if t.strip()]
+    ticks = request.GET.get('ticks') in ('1', 'true')
+
+    if not symbols or not (timeframes or ticks):
+        return JsonResponse({'error': 'symbols and at least one of timeframes or ticks are required.'}, status=400)
+
+    invalid = [t for t in timeframes if t not in TIMEFRAME_MODEL_MAP]
+    if invalid:
+        return JsonResponse(
+            {'error': f'Invalid timeframe(s): {", ".join(invalid)}. Must be one of: {", ".join(TIMEFRAME_MODEL_MAP.keys())}'},
+            status=400
+        )
+
+    channels = [candle_channel(symbol, timeframe) for symbol in symbols for timeframe in timeframes]
+    if ticks:
+        channels += [tick_channel(symbol) for symbol in symbols]
+
+    async def events():
+        client = get_async_redis()
+        pubsub = client.pubsub()
+        await pubsub.subscribe(*channels)
+        try:
+            yield ': connected\n\n'
+            while True:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=settings.STREAM_HEARTBEAT_INTERVAL
+                )
+                if message is None:
+                    # Keep proxies from closing an idle connection
+                    yield ': heartbeat\n\n'
+                    continue
+
+                channel = message['channel'].decode()
+                event = 'tick' if channel.startswith('ticks:') else 'candle'
+                yield f"event: {event}\ndata: {message['data'].decode()}\n\n"
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+            await client.aclose()
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,58 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from trade.risk import SOURCES, RiskError, analyze, cached_analysis, model_names
+
+
+class Command(BaseCommand):
+    help = (
+        'Monte Carlo risk analysis of closed trades per trading model (or demo account): '
+        'percentile bands of max drawdown and final equity, and the risk of ruin'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', choices=SOURCES, default='live')
+        parser.add_argument('--models', help='Comma separated models, default: every model with closed trades')
+        parser.add_argument('--simulations', type=int, help='Bootstrap paths, default: RISK_SIMULATIONS')
+        parser.add_argument('--horizon', type=int, help='Trades per path, default: as many as the history')
+        parser.add_argument('--balance', type=float, help='Starting equity, default: RISK_BALANCE')
+        parser.add_argument('--ruin', type=float, default=0.5, help='Fraction of the starting equity lost at ruin')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--no-cache', action='store_true', help='Recompute instead of reading the cached results')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        source = options['source']
+        names = [m.strip() for m in options['models'].split(',')] if options['models'] else model_names(source)
+        if not names:
+            raise CommandError(f'No {source} model has closed trades')
+
+        run = analyze if options['no_cache'] else cached_analysis
+        results = []
+        for name in names:
+            try:
+                result = run(
+                    source,
+                    name,
+                    balance=options['balance'],
+                    simulations=options['simulations'],
+                    horizon=options['horizon'],
+                    ruin=options['ruin'],
+                    seed=options['seed'],
+                )
+            except RiskError as e:
+                self.stderr.write(f'{name}: {e}')
+                continue
+            results.append(result)
+
+            drawdown, final = result['max_drawdown'], result['final_equity']
+            self.stdout.write(
+                f"{name:>20}: {result['trades']} trades, {result['simulations']} paths of {result['horizon']} | "
+                f"max drawdown p50 {drawdown['p50']:.2%} p95 {drawdown['p95']:.2%} | "
+                f"final equity p5 {final['p5']:.2f} p50 {final['p50']:.2f} p95 {final['p95']:.2f} | "
+                f"risk of ruin {result['risk_of_ruin']:.2%}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f'Wrote {len(results)} results to {options["output"]}')
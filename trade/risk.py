@@ -0,0 +1,178 @@
+"""
+Monte Carlo risk analysis over realised trade history.
+
+The net PnLs of a model's closed trades (live Positions by trading_model,
+demo positions by account name) are loaded as one array and resampled with
+replacement into many equity paths at once: a (paths, trades) index matrix,
+a cumulative sum and running peaks along the trade axis, in chunks of paths
+bounded by CHUNK_ELEMENTS. Each path yields its max drawdown, final equity
+and whether it fell to the ruin level; results are percentile bands of those
+distributions.
+
+Results are cached per (source, model, parameters) under a history version
+built from the count, last exit and PnL sums of the model's closed trades,
+so an entry goes stale as soon as a trade closes or a commission is booked.
+"""
+import logging
+import time
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+from fake_trade.models import DemoPosition
+from ohlc.utils.cache import get_or_compute
+from trade.models import Position
+
+logger = logging.getLogger(__name__)
+
+SOURCES = ('live', 'demo')
+PERCENTILES = (5, 25, 50, 75, 95)
+CHUNK_ELEMENTS = 4_000_000  # resampled trades per chunk, bounds the path matrices
+
+
+class RiskError(ValueError):
+    pass
+
+
+MODEL_FIELDS = {'live': 'trading_model', 'demo': 'account__name'}
+
+
+def _closed(source):
+    """
+    Closed live Positions or demo positions. Positions closed without an
+    exit (demo resets) are not trades.
+    """
+    if source == 'live':
+        return Position.objects.filter(status='CLOSED', exit_time__isnull=False)
+    if source == 'demo':
+        return DemoPosition.objects.filter(status='CLOSED', exit_time__isnull=False)
+    raise RiskError(f"Unknown source {source}, expected one of {', '.join(SOURCES)}")
+
+
+def closed_trades(source, model):
+    """Closed trades of a model: live Positions by trading_model, demo positions by account name."""
+    return _closed(source).filter(**{MODEL_FIELDS[source]: model})
+
+
+def model_names(source):
+    """Names of the models with closed trades."""
+    names = _closed(source).order_by().values_list(MODEL_FIELDS[source], flat=True).distinct()
+    return sorted(name for name in names if name)
+
+
+def history_version(source, model):
+    """Changes whenever a trade of the model closes or its PnL or commission is updated."""
+    stats = closed_trades(source, model).aggregate(
+        n=Count('id'), last=Max('exit_time'), pnl=Sum('pnl'), fee=Sum('commission')
+    )
+    last = int(stats['last'].timestamp()) if stats['last'] else 0
+    return f"{stats['n']}-{last}-{round(stats['pnl'] or 0, 6)}-{round(stats['fee'] or 0, 6)}"
+
+
+def load_pnls(source, model):
+    """
+    Net PnL of the model's closed trades in exit order. Live commissions
+    are subtracted once reconciled (negative values mark them unknown),
+    demo PnLs are already net.
+    """
+    rows = closed_trades(source, model).order_by('exit_time', 'id').values_list('pnl', 'commission')
+    values = np.array(list(rows), dtype=float).reshape(-1, 2)
+    pnl, commission = values[:, 0], values[:, 1]
+    if source == 'live':
+        return np.where(commission > 0, pnl - commission, pnl)
+    return pnl
+
+
+def _bands(values):
+    return {f'p{p}': round(float(v), 4) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+
+def simulate(pnls, balance, simulations, horizon=None, ruin=0.5, seed=0):
+    """
+    Bootstrap equity paths of `horizon` trades (default: as many as the
+    history) drawn with replacement from `pnls`, starting at `balance`.
+
+    Returns (max drawdowns as fractions of the running peak, final equities,
+    ruined flags) with one entry per path. A path is ruined once its equity
+    reaches balance * (1 - ruin).
+    """
+    horizon = horizon or len(pnls)
+    rng = np.random.default_rng(seed)
+    ruin_level = balance * (1 - ruin)
+    chunk = max(1, CHUNK_ELEMENTS // horizon)
+
+    drawdowns = np.empty(simulations)
+    finals = np.empty(simulations)
+    ruined = np.empty(simulations, dtype=bool)
+    for start in range(0, simulations, chunk):
+        stop = min(start + chunk, simulations)
+        equity = balance + np.cumsum(pnls[rng.integers(0, len(pnls), (stop - start, horizon))], axis=1)
+        # The starting balance is the first peak of every path
+        peak = np.maximum(np.maximum.accumulate(equity, axis=1), balance)
+        drawdowns[start:stop] = ((peak - equity) / peak).max(axis=1)
+        finals[start:stop] = equity[:, -1]
+        ruined[start:stop] = equity.min(axis=1) <= ruin_level
+    return drawdowns, finals, ruined
+
+
+def analyze(source, model, balance=None, simulations=None, horizon=None, ruin=0.5, seed=0):
+    """
+    Monte Carlo risk report of a model's closed trades: percentile bands of
+    max drawdown and final equity, and the risk of ruin.
+    """
+    balance = float(settings.RISK_BALANCE if balance is None else balance)
+    simulations = settings.RISK_SIMULATIONS if simulations is None else simulations
+    if balance <= 0:
+        raise RiskError('balance must be positive')
+    if not 1 <= simulations <= settings.RISK_MAX_SIMULATIONS:
+        raise RiskError(f'simulations must be between 1 and {settings.RISK_MAX_SIMULATIONS}')
+    if horizon is not None and not 1 <= horizon <= settings.RISK_MAX_HORIZON:
+        raise RiskError(f'horizon must be between 1 and {settings.RISK_MAX_HORIZON}')
+    if not 0 < ruin <= 1:
+        raise RiskError('ruin must be in (0, 1]')
+
+    started = time.monotonic()
+    pnls = load_pnls(source, model)
+    if len(pnls) < 2:
+        raise RiskError(f'{model} needs at least 2 closed trades, has {len(pnls)}')
+    horizon = horizon or min(len(pnls), settings.RISK_MAX_HORIZON)
+
+    drawdowns, finals, ruined = simulate(pnls, balance, simulations, horizon, ruin, seed)
+
+    # The realised path, for comparison with the bands
+    equity = balance + np.cumsum(pnls)
+    peak = np.maximum(np.maximum.accumulate(equity), balance)
+    result = {
+        'source': source,
+        'model': model,
+        'trades': len(pnls),
+        'simulations': simulations,
+        'horizon': horizon,
+        'balance': balance,
+        'ruin_level': round(balance * (1 - ruin), 2),
+        'historical': {
+            'net_pnl': round(float(pnls.sum()), 2),
+            'win_rate': round(float((pnls > 0).mean()), 4),
+            'max_drawdown': round(float(((peak - equity) / peak).max()), 4),
+            'final_equity': round(float(equity[-1]), 2),
+        },
+        'max_drawdown': _bands(drawdowns),
+        'final_equity': _bands(finals),
+        'risk_of_ruin': round(float(ruined.mean()), 4),
+    }
+    logger.info(
+        f"Risk analysis of {source} {model}: {simulations} paths of {horizon} trades in {time.monotonic() - started:.2f}s"
+    )
+    return result
+
+
+def cached_analysis(source, model, balance=None, simulations=None, horizon=None, ruin=0.5, seed=0):
+    """analyze() cached under the model's history version."""
+    balance = float(settings.RISK_BALANCE if balance is None else balance)
+    simulations = settings.RISK_SIMULATIONS if simulations is None else simulations
+    version = history_version(source, model)
+    key = f"risk:{source}:{model}:{balance}:{simulations}:{horizon}:{ruin}:{seed}:v{version}"
+    return get_or_compute(
+        key,
+        lambda: analyze(source, model, balance, simulations, horizon, ruin, seed),
+        timeout=settings.RISK_CACHE_TIMEOUT,
+    )
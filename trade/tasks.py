@@ -1,7 +1,8 @@
 from celery import shared_task
-from trade.utils import send_bot_message, get_balance, get_spot_balance, get_position_history_from_binance, create_daily_balance_chart, send_bot_photo, create_weekly_balance_chart
+from trade.utils import send_bot_message, get_balance, get_spot_balance, get_trade_commissions, create_daily_balance_chart, send_bot_photo, create_weekly_balance_chart
 from trade.models import Position, Order
 import logging
+from django.db.models import Prefetch
 from django.utils import timezone
 from datetime import datetime, timedelta
 from .models import BalanceRecord
@@ -54,52 +55,78 @@ def save_balance_record():
         print(f"Error saving balance record: {e}")
 
 
+def _save_commissions(model, rows, field):
+    """Write a commission field of rows: one UPDATE for those not found (-0.1), a bulk update for the others."""
+    unknown = [row.pk for row in rows if getattr(row, field) == -0.1]
+    if unknown:
+        model.objects.filter(pk__in=unknown).update(**{field: -0.1})
+    model.objects.bulk_update([row for row in rows if getattr(row, field) != -0.1], [field], batch_size=500)
+
+
 @shared_task
 def update_order_commission():
     """
     Task to update the commission of an order.
+    Commissions come from an index by order ID of the account trades,
+    fetched incrementally per symbol (get_trade_commissions), and are
+    written with bulk updates: the opening orders of positions, the filled
+    TP/SL orders, then the total of closed positions.
     """
-    try:
-        positions = get_position_history_from_binance()['data']
-    except Exception as e:
-        logger.error(f"Error fetching position history: {e}")
-        return
-    
-    db_positions = Position.objects.filter(order_commission=-1)
-    for position in db_positions:
-        sum_commission = 0
-        for p in positions:
-            if p['orderId'] == position.order_id:
-                sum_commission += float(p['commission'])
-        if sum_commission > 0:
-            position.order_commission = sum_commission
-        else:
-            position.order_commission = -0.1  # Default value if no commission found
-        position.save()
-        logger.info(f"Updated order commission for position {position.order_id} to {position.order_commission}")
-
-    db_orders = Order.objects.filter(status='FILLED', commission=-1)
-    for order in db_orders:
-        sum_commission = 0
-        for p in positions:
-            if p['orderId'] == order.order_id:
-                sum_commission += float(p['commission'])
-        if sum_commission > 0:
-            order.commission = sum_commission
-        else:
-            order.commission = -0.1  # Default value if no commission found
-        order.save()
-        logger.info(f"Updated commission for order {order.order_id} to {order.commission}")
+    positions = list(Position.objects.filter(order_commission=-1).select_related('asset'))
+    orders = list(Order.objects.filter(status='FILLED', commission=-1).select_related('position__asset'))
+
+    if positions or orders:
+        # Orders may be placed on the USDC pair of a USDT asset
+        assets = {position.asset.symbol for position in positions}
+        assets |= {order.position.asset.symbol for order in orders}
+        symbols = sorted(assets | {symbol.replace('USDT', 'USDC') for symbol in assets})
+        commissions, failed = get_trade_commissions(symbols)
+
+        def commission_of(order_id, symbol):
+            """Commission found, -0.1 if none, None to retry when the trades were not fetched."""
+            if order_id in commissions and commissions[order_id] > 0:
+                return commissions[order_id]
+            if symbol in failed or symbol.replace('USDT', 'USDC') in failed:
+                return None
+            return -0.1  # Default value if no commission found
+
+        updated_positions = []
+        for position in positions:
+            commission = commission_of(position.order_id, position.asset.symbol)
+            if commission is not None:
+                position.order_commission = commission
+                updated_positions.append(position)
+        _save_commissions(Position, updated_positions, 'order_commission')
+
+        updated_orders = []
+        for order in orders:
+            commission = commission_of(order.order_id, order.position.asset.symbol)
+            if commission is not None:
+                order.commission = commission
+                updated_orders.append(order)
+        _save_commissions(Order, updated_orders, 'commission')
+        logger.info(
+            f"Updated order commission for {len(updated_positions)} positions and {len(updated_orders)} orders"
+        )
 
-    positions = Position.objects.filter(status='CLOSED',commission=-1)
-    for position in positions:
+    closed = list(Position.objects.filter(status='CLOSED', commission=-1).prefetch_related(
+        Prefetch('orders', queryset=Order.objects.filter(status='FILLED').order_by('id'), to_attr='filled_orders')
+    ))
+    updated = []
+    for position in closed:
+        # Commissions not reconciled yet (closing order not filled in the
+        # database, or trades not fetched) are retried on the next run
+        if position.order_commission == -1:
+            continue
         if position.order_commission > 0:
-            closed_order = position.orders.filter(status='FILLED').first()
-            position.commission = closed_order.commission + position.order_commission
+            if not position.filled_orders or position.filled_orders[0].commission == -1:
+                continue
+            position.commission = position.filled_orders[0].commission + position.order_commission
         else:
             position.commission = -0.1
-        position.save()
-        logger.info(f"Updated commission for position {position.order_id} to {position.commission}")
+        updated.append(position)
+    _save_commissions(Position, updated, 'commission')
+    logger.info(f"Updated commission for {len(updated)} closed positions")
 
 
 def format_change(change):
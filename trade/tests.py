@@ -1,3 +1,244 @@
-from django.test import TestCase
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+import numpy as np
+from binance.exceptions import BinanceAPIException
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from asset.models import Asset
+from fake_trade.models import DemoConfig, DemoPosition
+from trade import risk, tasks, utils
+from trade.models import Order, Position
 
-# Create your tests here.
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class AsyncClientTests(SimpleTestCase):
+    """One AsyncClient per event loop, however many callers race for it."""
+
+    def test_concurrent_first_calls_share_one_client(self):
+        created = []
+
+        async def create(**kwargs):
+            await asyncio.sleep(0.01)
+            created.append(object())
+            return created[-1]
+
+        async def race():
+            return await asyncio.gather(*(utils.get_async_client() for _ in range(5)))
+
+        with mock.patch.object(utils.AsyncClient, 'create', side_effect=create):
+            clients = asyncio.run(race())
+        self.assertEqual(len(created), 1)
+        self.assertTrue(all(c is created[0] for c in clients))
+
+    def test_failed_creation_is_retried(self):
+        calls = []
+
+        async def create(**kwargs):
+            calls.append(1)
+            if len(calls) == 1:
+                raise ConnectionError('down')
+            return 'client'
+
+        async def twice():
+            with self.assertRaises(ConnectionError):
+                await utils.get_async_client()
+            return await utils.get_async_client()
+
+        with mock.patch.object(utils.AsyncClient, 'create', side_effect=create):
+            self.assertEqual(asyncio.run(twice()), 'client')
+
+
+class SimulateTests(SimpleTestCase):
+    """The vectorized bootstrap walks the same paths as a trade-by-trade loop."""
+
+    def test_matches_loop(self):
+        pnls = np.random.default_rng(1).normal(1, 30, 120)
+        drawdowns, finals, ruined = risk.simulate(pnls, 1000.0, 50, 80, ruin=0.1, seed=3)
+
+        paths = np.random.default_rng(3).integers(0, len(pnls), (50, 80))
+        for n, path in enumerate(paths):
+            equity = peak = lowest = 1000.0
+            drawdown = 0.0
+            for i in path:
+                equity += pnls[i]
+                peak = max(peak, equity)
+                drawdown = max(drawdown, (peak - equity) / peak)
+                lowest = min(lowest, equity)
+            self.assertAlmostEqual(drawdowns[n], drawdown)
+            self.assertAlmostEqual(finals[n], equity)
+            self.assertEqual(ruined[n], lowest <= 900.0)
+
+    def test_chunks_do_not_change_paths(self):
+        pnls = np.random.default_rng(2).normal(0, 10, 40)
+        whole = risk.simulate(pnls, 500.0, 30, seed=5)
+        with mock.patch('trade.risk.CHUNK_ELEMENTS', 100):
+            chunked = risk.simulate(pnls, 500.0, 30, seed=5)
+        for a, b in zip(whole, chunked):
+            np.testing.assert_array_equal(a, b)
+
+
+@override_settings(CACHES=LOCAL_CACHE, RISK_BALANCE=10000, RISK_SIMULATIONS=500)
+class RiskAnalysisTests(TestCase):
+    """Risk reports use net PnLs and go stale when a trade closes or a commission is booked."""
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(7)
+        cls.asset = Asset.objects.create(symbol='BTCUSDT')
+        first = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        Position.objects.bulk_create([
+            Position(
+                asset=cls.asset, side='BUY', quantity=1, order_id=str(i), entry_price=100,
+                pnl=round(rng.gauss(2 if i % 2 else -1, 30), 4), trading_model='xgb' if i % 2 else 'lstm',
+                commission=rng.choice([-1, 0.5]), status='CLOSED' if i < 60 else 'OPEN',
+                exit_time=first + timedelta(hours=i) if i < 60 else None
+            )
+            for i in range(64)
+        ])
+        account = DemoConfig.objects.create(name='default', balance=1000, available_balance=1000)
+        DemoPosition.objects.bulk_create([
+            DemoPosition(
+                account=account, asset=cls.asset, side='BUY', quantity=1, entry_price=100, margin_balance=1,
+                status='CLOSED', pnl=round(rng.gauss(1, 10), 4), exit_time=first + timedelta(hours=i)
+            )
+            for i in range(10)
+        ] + [
+            # Closed by a reset, not a trade
+            DemoPosition(account=account, asset=cls.asset, side='BUY', quantity=1, entry_price=100,
+                         margin_balance=1, status='CLOSED')
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_net_pnls(self):
+        self.assertEqual(risk.model_names('live'), ['lstm', 'xgb'])
+        self.assertEqual(risk.model_names('demo'), ['default'])
+        expected = [
+            p.pnl - p.commission if p.commission > 0 else p.pnl
+            for p in Position.objects.filter(trading_model='xgb', status='CLOSED').order_by('exit_time')
+        ]
+        np.testing.assert_allclose(risk.load_pnls('live', 'xgb'), expected)
+        self.assertEqual(len(risk.load_pnls('demo', 'default')), 10)
+
+    def test_cached_until_history_changes(self):
+        with mock.patch('trade.risk.analyze', wraps=risk.analyze) as analyze:
+            first = self.client.get('/risk/', {'model': 'xgb'}).json()['data']
+            self.assertEqual(self.client.get('/risk/', {'model': 'xgb'}).json()['data'], first)
+            self.assertEqual(analyze.call_count, 1)
+
+            Position.objects.filter(order_id='61').update(status='CLOSED', exit_time=datetime.now(timezone.utc))
+            self.assertEqual(self.client.get('/risk/', {'model': 'xgb'}).json()['data']['trades'], first['trades'] + 1)
+            self.assertEqual(analyze.call_count, 2)
+
+            Position.objects.filter(order_id='1').update(commission=5)
+            self.client.get('/risk/', {'model': 'xgb'})
+            self.assertEqual(analyze.call_count, 3)
+
+    def test_every_model(self):
+        data = self.client.get('/risk/', {'source': 'demo'}).json()['data']
+        self.assertEqual([(result['model'], result['trades']) for result in data], [('default', 10)])
+
+    def test_invalid_parameters(self):
+        for params in (
+            {'source': 'nope', 'model': 'xgb'}, {'model': 'xgb', 'simulations': 0}, {'model': 'xgb', 'ruin': 2},
+            {'model': 'xgb', 'balance': 'a'}, {'model': 'nope'},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/risk/', params).status_code, 400)
+
+
+class FakeExchange:
+    """Account trades of the USDC pairs, as futures_account_trades pages them."""
+
+    def __init__(self):
+        self.trades = {}
+        self.calls = []
+
+    def add(self, symbol, order_id, commission):
+        trades = self.trades.setdefault(symbol, [])
+        trades.append({
+            'id': len(trades) + 1, 'symbol': symbol, 'orderId': int(order_id), 'qty': '1',
+            'commission': str(commission), 'time': int(datetime.now().timestamp() * 1000),
+        })
+
+    def futures_account_trades(self, symbol=None, fromId=None, limit=500):
+        self.calls.append((symbol, fromId))
+        if symbol.endswith('USDT'):
+            text = '{"code": -1121, "msg": "Invalid symbol."}'
+            raise BinanceAPIException(mock.Mock(status_code=400, text=text), 400, text)
+        trades = self.trades.get(symbol, [])
+        if fromId is None:
+            return trades[-limit:]
+        return [trade for trade in trades if trade['id'] >= fromId][:limit]
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class CommissionTests(TestCase):
+    """Commissions are matched by order ID from trades fetched once per symbol."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.asset = Asset.objects.create(symbol='BTCUSDT')
+        cls.closed = Position.objects.create(
+            asset=cls.asset, side='BUY', quantity=1, order_id='11', entry_price=1, status='CLOSED'
+        )
+        cls.closing = Order.objects.create(position=cls.closed, order_type='TP', price=1, order_id='12', status='FILLED')
+        cls.open = Position.objects.create(
+            asset=cls.asset, side='BUY', quantity=1, order_id='21', entry_price=1, status='OPEN'
+        )
+        cls.pending = Order.objects.create(position=cls.open, order_type='TP', price=1, order_id='22')
+        cls.unmatched = Position.objects.create(
+            asset=cls.asset, side='BUY', quantity=1, order_id='31', entry_price=1, status='CLOSED'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.exchange = FakeExchange()
+        patcher = mock.patch.object(utils, 'client', self.exchange)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assertCommission(self, row, field, value):
+        row.refresh_from_db()
+        self.assertAlmostEqual(getattr(row, field), value)
+
+    def test_matches_order_ids(self):
+        # Earlier trades of the symbol are never fetched again
+        cache.set(utils._trade_index_key('BTCUSDC'), {'last_id': 0, 'orders': {}}, timeout=None)
+        self.exchange.add('BTCUSDC', '11', 0.25)
+        self.exchange.add('BTCUSDC', '21', 0.4)
+        self.exchange.add('BTCUSDC', '11', 0.5)
+        self.exchange.add('BTCUSDC', '12', 0.125)
+        with mock.patch('trade.utils.TRADES_PAGE_LIMIT', 2):
+            tasks.update_order_commission()
+
+        self.assertEqual(self.exchange.calls, [('BTCUSDC', 1), ('BTCUSDC', 3), ('BTCUSDC', 5), ('BTCUSDT', None)])
+        self.assertCommission(self.closed, 'order_commission', 0.75)
+        self.assertCommission(self.closing, 'commission', 0.125)
+        self.assertCommission(self.closed, 'commission', 0.875)
+        self.assertCommission(self.open, 'order_commission', 0.4)
+        self.assertCommission(self.pending, 'commission', -1)
+        self.assertCommission(self.unmatched, 'order_commission', -0.1)
+        self.assertCommission(self.unmatched, 'commission', -0.1)
+
+    def test_order_filled_after_its_trades_were_fetched(self):
+        self.exchange.add('BTCUSDC', '22', 0.3)
+        tasks.update_order_commission()
+        self.assertCommission(self.pending, 'commission', -1)
+
+        Order.objects.filter(id=self.pending.id).update(status='FILLED')
+        self.exchange.calls.clear()
+        tasks.update_order_commission()
+        self.assertEqual(self.exchange.calls[0], ('BTCUSDC', 2))
+        self.assertCommission(self.pending, 'commission', 0.3)
+
+    def test_outage_is_retried(self):
+        self.exchange.futures_account_trades = mock.Mock(side_effect=ConnectionError('down'))
+        tasks.update_order_commission()
+        self.assertCommission(self.closed, 'order_commission', -1)
+        self.assertCommission(self.closing, 'commission', -1)
+        self.assertCommission(self.closed, 'commission', -1)
@@ -1,13 +1,20 @@
+import asyncio
 import logging
+import weakref
 from binance.client import Client
+from binance.async_client import AsyncClient
+from binance.exceptions import BinanceAPIException
 from binance.enums import *
 from decouple import config
 from asset.models import Asset
+from asset.utils import get_price
 from trade.models import BalanceRecord, Position, Order, OneWayPosition
 import requests
 import json 
 from time import sleep
 from datetime import datetime
+from django.conf import settings
+from django.core.cache import cache
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from io import BytesIO
@@ -19,6 +26,14 @@ api_key = config('BINANCE_API_KEY')
 secret_key = config('BINANCE_SECRET_KEY')
 client = Client(api_key=api_key, api_secret=secret_key)
 
+# Largest page of futures account trades
+TRADES_PAGE_LIMIT = 1000
+# Binance error of a symbol that is not listed
+INVALID_SYMBOL_CODE = -1121
+
+# Creation task of the AsyncClient of each event loop, used by the async views under ASGI
+_async_clients = weakref.WeakKeyDictionary()
+
 BOT_TOKEN = config("BOT_TOKEN")
 CHANNEL_ID = config("CHANNEL_ID")
 HEALTH_CHECK_ID = config("HEALTH_CHECK_ID")
@@ -117,8 +132,10 @@ def open_position(symbol, quantity, side, leverage=1, trading_model=None, probab
         send_bot_message(f"❌❌Failed to place futures order, Asset {symbol} not found.")
         return {"error": f"Asset {symbol} not found.", "code": 404}
 
-    # Get last price
-    last_price = float(asset.last_price)
+    # Get last price from the shared snapshot, the stored one if unavailable
+    last_price = get_price(symbol)
+    if last_price is None:
+        last_price = float(asset.last_price)
 
 
     # Change leverage if needed
@@ -183,38 +200,82 @@ def save_position(order, leverage=1, trading_model=None, probability=-1):
     logger.info(msg)
 
 
-def get_open_positions():
+async def get_async_client():
     """
-    Retrieves the currently open position on Binance.
+    Return the AsyncClient bound to the running event loop, creating it on first use.
     """
+    loop = asyncio.get_running_loop()
+    creating = _async_clients.get(loop)
+    if creating is None:
+        # Concurrent first callers await the same creation instead of each making a client
+        creating = _async_clients[loop] = loop.create_task(
+            AsyncClient.create(api_key=api_key, api_secret=secret_key)
+        )
     try:
-        positions_raw = client.futures_position_information()
-        positions = [
-            {
-            "symbol": p["symbol"],
-            "positionAmt": p["positionAmt"],
-            "unRealizedProfit": p["unRealizedProfit"],
-            "notional": p["notional"],
-            "entryPrice": p["breakEvenPrice"],
-            }
-            for p in positions_raw
-        ]
-        return {"data": positions, "code": 200}
+        # A cancelled caller must not cancel the creation the others wait on
+        return await asyncio.shield(creating)
+    except Exception:
+        if _async_clients.get(loop) is creating:
+            del _async_clients[loop]
+        raise
+
+
+def _format_open_positions(positions_raw):
+    return [
+        {
+        "symbol": p["symbol"],
+        "positionAmt": p["positionAmt"],
+        "unRealizedProfit": p["unRealizedProfit"],
+        "notional": p["notional"],
+        "entryPrice": p["breakEvenPrice"],
+        }
+        for p in positions_raw
+    ]
+
+
+async def aget_open_positions():
+    """
+    Retrieves the currently open positions on Binance without blocking a worker while it answers.
+    """
+    try:
+        async_client = await get_async_client()
+        positions_raw = await async_client.futures_position_information()
+        return {"data": _format_open_positions(positions_raw), "code": 200}
 
     except Exception as e:
         logger.exception(f"Error fetching open position: {e}")
         return {"error": f"Failed to fetch open position. ({str(e)})", "code": 500}
 
 
-def get_position_history_from_binance():
+def fetch_account_trades(symbol=None, from_id=None):
+    """
+    Futures account trades from Binance. With from_id, every trade of the
+    symbol from that trade ID on, page by page; otherwise the most recent
+    ones. Raises Binance and requests exceptions.
+    """
+    params = {'symbol': symbol} if symbol else {}
+    if from_id is None:
+        return client.futures_account_trades(**params)
+
+    trades = []
+    while True:
+        page = client.futures_account_trades(**params, fromId=from_id, limit=TRADES_PAGE_LIMIT)
+        trades += page
+        if len(page) < TRADES_PAGE_LIMIT:
+            return trades
+        from_id = page[-1]["id"] + 1
+
+
+def get_position_history_from_binance(symbol=None, from_id=None):
     """
     Retrieves the position history from Binance.
     """
     try:
-        positions_raw = client.futures_account_trades()
+        positions_raw = fetch_account_trades(symbol, from_id)
 
         positions = [
             {
+                "id": p["id"],
                 "symbol": p["symbol"],
                 "orderId": str(p["orderId"]),
                 "qty": p["qty"],
@@ -230,21 +291,77 @@ def get_position_history_from_binance():
         return {"error": f"Failed to fetch position history. ({str(e)})", "code": 500, "data": []}
 
 
-def get_position_history(start_time=None, symbol=None):
+def _trade_index_key(symbol):
+    return f"commission:trades:{symbol}"
+
+
+def get_trade_commissions(symbols):
     """
-    Retrieves the position history from Binance.
+    Commission paid per order ID over the recent trades of the exchange
+    symbols, as ({orderId: commission}, symbols whose trades could not be
+    fetched).
+
+    Each symbol's trades are fetched incrementally from the last trade ID
+    seen, and its commissions are kept in the cache for
+    COMMISSION_INDEX_RETENTION seconds, so orders whose rows show up after
+    their trades were fetched are still matched. Symbols that are not
+    listed count as having no trades.
     """
+    now_ms = int(datetime.now().timestamp() * 1000)
+    oldest = now_ms - settings.COMMISSION_INDEX_RETENTION * 1000
+    commissions = {}
+    failed = set()
+    for symbol in symbols:
+        key = _trade_index_key(symbol)
+        index = cache.get(key) or {'last_id': None, 'orders': {}}
+        last_id = index['last_id']
+
+        try:
+            trades = fetch_account_trades(symbol, last_id + 1 if last_id is not None else None)
+        except BinanceAPIException as e:
+            if e.code != INVALID_SYMBOL_CODE:
+                logger.error(f"Error fetching account trades of {symbol}: {e}")
+                failed.add(symbol)
+            continue
+        except Exception as e:
+            logger.error(f"Error fetching account trades of {symbol}: {e}")
+            failed.add(symbol)
+            continue
+
+        orders = index['orders']
+        for trade in trades:
+            if last_id is not None and trade['id'] <= last_id:
+                continue
+            order_id = str(trade['orderId'])
+            commission, time_ms = orders.get(order_id, (0.0, trade['time']))
+            orders[order_id] = (commission + float(trade['commission']), max(time_ms, trade['time']))
+            index['last_id'] = max(index['last_id'] or 0, trade['id'])
+
+        index['orders'] = {order_id: entry for order_id, entry in orders.items() if entry[1] >= oldest}
+        cache.set(key, index, timeout=None)
+        commissions.update((order_id, commission) for order_id, (commission, _) in index['orders'].items())
+    return commissions, failed
+
+
+def _position_history_queryset(start_time=None, symbol=None):
     positions = OneWayPosition.objects.all()
     if start_time:
         positions = positions.filter(entry_time__gte=start_time)
     if symbol:
         positions = positions.filter(asset__symbol=symbol)
 
-    result = list(positions.values(
+    return positions.values(
         'id', 'asset__symbol', 'side', 'quantity', 'order_id',
         'entry_price', 'entry_time', 'leverage', 'trading_model', 
         'probability', 'telegram_message_id'
-    ))
+    )
+
+
+async def aget_position_history(start_time=None, symbol=None):
+    """
+    Retrieves the position history using the async ORM.
+    """
+    result = [item async for item in _position_history_queryset(start_time=start_time, symbol=symbol)]
     for item in result:
         item['symbol'] = item.pop('asset__symbol')
     return result
@@ -432,12 +549,23 @@ def save_orders(order, tp_order, sl_order, leverage=1, trading_model=None, proba
         position.save()
 
 
-def get_positions():
+def _positions_queryset():
+    return Position.objects.filter(status='OPEN').values(
+        'id', 'asset__symbol', 'side', 'quantity', 'order_id', 
+        'entry_price', 'entry_time', 'leverage'
+    )
+
+
+def _history_queryset():
+    return Position.objects.filter(status='CLOSED').values(
+        'id', 'asset__symbol', 'side', 'quantity', 'order_id', 
+        'entry_price', 'entry_time', 'leverage', 'exit_price', 'exit_time', 'pnl', 'probability'
+    )
+
+
+async def aget_positions():
     try:
-        positions = list(Position.objects.filter(status='OPEN').values(
-            'id', 'asset__symbol', 'side', 'quantity', 'order_id', 
-            'entry_price', 'entry_time', 'leverage'
-        ))
+        positions = [p async for p in _positions_queryset()]
 
         for p in positions:
             p['symbol'] = p.pop('asset__symbol')
@@ -448,37 +576,48 @@ def get_positions():
         return {"error": f"Failed to fetch futures positions. ({str(e)})", "code": 500}
 
 
-def get_history():
+async def aget_history():
     try:
-        positions = list(Position.objects.filter(status='CLOSED').values(
-            'id', 'asset__symbol', 'side', 'quantity', 'order_id', 
-            'entry_price', 'entry_time', 'leverage', 'exit_price', 'exit_time', 'pnl', 'probability'
-        ))
+        positions = [p async for p in _history_queryset()]
 
         for p in positions:
             p['symbol'] = p.pop('asset__symbol')
-            
+
         return positions
     except Exception as e:
         logger.exception(f"Error fetching futures positions: {e}")
         return {"error": f"Failed to fetch futures positions. ({str(e)})", "code": 500}
 
 
+def _format_futures_balance(balances):
+    balance = next((item for item in balances if item['asset'] == 'USDC'), None)
+
+    if balance is None:
+        logger.error("USDT balance not found in futures account.")
+        return {"error": "USDT balance not found in futures account.", "code": 400}
+
+    return {
+        "balance": float(balance['balance']),
+        "availableBalance": float(balance['availableBalance']),
+        "crossUnPnl": float(balance['crossUnPnl'])
+    }
+
+
 def get_balance():
     try:
         balances = client.futures_account_balance()
-        balance = next((item for item in balances if item['asset'] == 'USDC'), None)
-        
-        if balance is None:
-            logger.error("USDT balance not found in futures account.")
-            return {"error": "USDT balance not found in futures account.", "code": 400}
+        return _format_futures_balance(balances)
 
-        balance = {
-            "balance": float(balance['balance']),
-            "availableBalance": float(balance['availableBalance']),
-            "crossUnPnl": float(balance['crossUnPnl'])
-        }
-        return balance
+    except Exception as e:
+        logger.exception(f"Error fetching futures account balance: {e}")
+        return {"error": f"Failed to fetch futures account balance. ({str(e)})", "code": 500}
+
+
+async def aget_balance():
+    try:
+        async_client = await get_async_client()
+        balances = await async_client.futures_account_balance()
+        return _format_futures_balance(balances)
 
     except Exception as e:
         logger.exception(f"Error fetching futures account balance: {e}")
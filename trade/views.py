@@ -1,11 +1,13 @@
 from django.http import JsonResponse
 import logging
-from .utils import get_positions, futures_order, get_balance, cancel_orders, save_orders, get_history, open_position, get_position_history, get_open_positions
+from .utils import futures_order, cancel_orders, save_orders, open_position, aget_positions, aget_balance, aget_history, aget_position_history, aget_open_positions
 import json
 from django.views.decorators.csrf import csrf_exempt
 from trade.models import Position, OneWayPosition, BalanceRecord
 from datetime import datetime, timedelta
 from asset.models import Asset
+from asset.utils import get_price
+from .risk import cached_analysis, model_names, RiskError
 from django.shortcuts import render
 from django.core.serializers.json import DjangoJSONEncoder
 
@@ -13,21 +15,21 @@ from django.core.serializers.json import DjangoJSONEncoder
 logger = logging.getLogger(__name__)
 
 
-def get_positions_view(request):
-    positions = get_positions()
+async def get_positions_view(request):
+    positions = await aget_positions()
     if 'error' in positions:
         return JsonResponse({'error': positions['error'], 'data': {}}, status=positions.get('code', 500))
     return JsonResponse({'data': positions}, status=200)
 
-def get_trade_history_view(request):
-    positions = get_history()
+async def get_trade_history_view(request):
+    positions = await aget_history()
     if 'error' in positions:
         return JsonResponse({'error': positions['error'], 'data': {}}, status=positions.get('code', 500))
     return JsonResponse({'data': positions}, status=200)
 
 
-def get_balance_view(request):
-    balance = get_balance()
+async def get_balance_view(request):
+    balance = await aget_balance()
     if 'error' in balance:
         return JsonResponse({'error': balance['error'], 'data': {}}, status=balance.get('code', 500))
     return JsonResponse({'data': balance}, status=200)
@@ -51,11 +53,12 @@ def place_futures_order_view(request):
 
         asset = Asset.objects.filter(symbol=symbol.upper()).first()
         if asset:
+            last_price = get_price(asset.symbol)
             OneWayPosition.objects.create(
                 asset=asset,
                 order_id=int(datetime.now().timestamp()),
                 quantity=quantity,
-                entry_price=asset.last_price,
+                entry_price=asset.last_price if last_price is None else last_price,
                 side=side.upper(),
                 leverage=leverage,
                 probability=probability
@@ -154,15 +157,15 @@ def open_position_view(request):
         logger.error("Error in Open Position View")
         return JsonResponse({'error': str(e)}, status=400)
 
-def get_position_history_view(request):
+async def get_position_history_view(request):
     symbol = request.GET.get('symbol')
     start_time = request.GET.get('start_time')
-    positions = get_position_history(start_time=start_time, symbol=symbol)
+    positions = await aget_position_history(start_time=start_time, symbol=symbol)
     return JsonResponse({'data': positions}, status=200)
 
 
-def get_open_positions_view(request):
-    positions = get_open_positions()
+async def get_open_positions_view(request):
+    positions = await aget_open_positions()
     if 'error' in positions:
         return JsonResponse({'error': positions['error'], 'data': {}}, status=positions.get('code', 500))
     return JsonResponse({'data': positions.get('data', [])}, status=200)
@@ -211,6 +214,40 @@ def get_balance_history_view(request):
 
 
 
+def get_risk_view(request):
+    """
+    GET ?model=<trading model>&source=live&simulations=20000&horizon=&balance=10000&ruin=0.5&seed=0
+    Monte Carlo risk analysis of a model's closed trades (trade.risk): percentile
+    bands of max drawdown and final equity, and the risk of ruin. source=demo
+    analyses a demo account's positions; without model, every model of the source.
+    """
+    try:
+        source = request.GET.get('source', 'live')
+        model = request.GET.get('model')
+        params = {
+            'balance': float(request.GET['balance']) if request.GET.get('balance') else None,
+            'simulations': int(request.GET['simulations']) if request.GET.get('simulations') else None,
+            'horizon': int(request.GET['horizon']) if request.GET.get('horizon') else None,
+            'ruin': float(request.GET.get('ruin', 0.5)),
+            'seed': int(request.GET.get('seed', 0)),
+        }
+        if model:
+            return JsonResponse({'data': cached_analysis(source, model, **params)}, status=200)
+
+        data = []
+        for name in model_names(source):
+            try:
+                data.append(cached_analysis(source, name, **params))
+            except RiskError as e:
+                data.append({'source': source, 'model': name, 'error': str(e)})
+        return JsonResponse({'data': data}, status=200)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logger.exception(f"Error running risk analysis: {e}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+
 def get_balance_history_without_start():
     records = list(BalanceRecord.objects.all().order_by('-timestamp'))
     return records